@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""Daily columnar archive of transactions."""
+import argparse
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import OrderedDict
+
+import six
+
+from .logs import iter_records, rotated_log_files, _strip_gz
+from .versions import CatalogVersions
+
+# Item ids of archived rows which are not catalog items
+CUSTOM_ITEM = -1
+DISCOUNT = -2
+
+# NumPy type of each column of an archived day, one row per order line
+COLUMNS = OrderedDict([
+    ('timestamps', 'f8'),
+    ('orders', 'i4'),
+    ('employee_ids', 'i4'),
+    ('versions', 'i4'),
+    ('item_ids', 'i4'),
+    ('quantities', 'i4'),
+    ('cents', 'i8'),
+])
+
+MANIFEST_NAME = 'manifest.json'
+
+_VERSION_LINE = re.compile(r'^Catalog version: (\d+)$')
+_ITEM_LINE = re.compile(r'^#(\d+) x (\d+)$')
+_CUSTOM_LINE = re.compile(r' x (\d+) @ (-?\d+\.\d{2})\$$')
+_DISCOUNT_LINE = re.compile(r' x (\d+): -(\d+\.\d{2})\$$')
+
+
+class TransactionArchiver(object):
+    """Archives rotated transaction logs as daily NumPy columns.
+
+    Each day is a directory named ``YYYY-MM-DD`` holding one ``.npy`` file
+    per column of :data:`COLUMNS` and a :data:`MANIFEST_NAME` file with the
+    day's row, order and sales counts, the names that ``employee_ids``
+    index, and the catalog versions that ``item_ids`` refer to. A day is
+    written under a temporary name and renamed once complete, and is never
+    rewritten.
+
+    Only records referring to a catalog version, see
+    :class:`CatalogVersions`, can be archived; the others are counted as
+    skipped. Custom items and discounts get the :data:`CUSTOM_ITEM` and
+    :data:`DISCOUNT` item ids, discounts having negative cents.
+
+    Parameters
+    ----------
+    archive_path : :class:`str`
+        Directory of the archive. It is created if it does not exist.
+    catalog_versions : :class:`CatalogVersions`
+        Catalog versions the records refer to, giving the items' prices.
+    logger : :class:`logging.Logger`, optional
+        Logger reporting archiving errors. Defaults to ``None``.
+
+    Raises
+    ------
+    ImportError
+        If NumPy is not installed.
+
+    """
+    def __init__(self, archive_path, catalog_versions, logger=None):
+        self._numpy = _import_numpy('archiving transactions')
+        if not os.path.isdir(archive_path):
+            os.makedirs(archive_path)
+        self.archive_path = archive_path
+        self.catalog_versions = catalog_versions
+        self.logger = logger
+        self._prices = {}
+
+    def is_archived(self, date):
+        """Returns whether a day, as ``'YYYY-MM-DD'``, is archived."""
+        return os.path.isdir(os.path.join(self.archive_path, date))
+
+    def archive_file(self, file_path):
+        """Archives the days of a rotated log file which are not archived.
+
+        Meant to be added to a log handler's ``rollover_callbacks``.
+
+        Returns
+        -------
+        dates : :class:`list`
+            Days archived.
+
+        """
+        try:
+            days = OrderedDict()
+            for record in iter_records([file_path]):
+                date = record.asctime[:10]
+                if not self.is_archived(date):
+                    days.setdefault(date, []).append(record)
+            for date, records in days.items():
+                self._write_day(date, records)
+            return list(days)
+        except Exception:
+            if self.logger is not None:
+                self.logger.exception('unable to archive {}'.format(
+                    os.path.basename(file_path)))
+            raise
+
+    def archive_log(self, file_path):
+        """Archives the rotated files of a log which are not archived yet.
+
+        Returns
+        -------
+        dates : :class:`list`
+            Days archived.
+
+        """
+        dates = []
+        for path in rotated_log_files(file_path):
+            # A rotated file holds records up to the day in its suffix
+            suffix = _strip_gz(path)[len(os.path.abspath(file_path)) + 1:]
+            if not self.is_archived(suffix[:10]):
+                dates.extend(self.archive_file(path))
+        return dates
+
+    def _write_day(self, date, records):
+        """Writes the columns and manifest of a day."""
+        columns = dict((name, []) for name in COLUMNS)
+        employees = []
+        employee_ids = {}
+        orders = skipped = 0
+        for record in records:
+            lines = record.message.split('\n')
+            match = None
+            if len(lines) > 1:
+                match = _VERSION_LINE.match(lines[1])
+            if match is None:
+                skipped += 1
+                continue
+            version = int(match.group(1))
+            if lines[0] not in employee_ids:
+                employee_ids[lines[0]] = len(employees)
+                employees.append(lines[0])
+            row = (_timestamp(record.asctime), orders, employee_ids[lines[0]],
+                   version)
+            # The last line is the order total
+            for line in lines[2:-1]:
+                values = row + self._parse(version, line)
+                for name, value in zip(COLUMNS, values):
+                    columns[name].append(value)
+            orders += 1
+
+        path = os.path.join(self.archive_path, date)
+        tmp_path = path + '.tmp'
+        if os.path.isdir(tmp_path):
+            # Left over by an interrupted run
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        numpy = self._numpy
+        for name, dtype in COLUMNS.items():
+            numpy.save(os.path.join(tmp_path, name + '.npy'),
+                       numpy.array(columns[name], dtype=dtype))
+        manifest = OrderedDict([
+            ('date', date),
+            ('rows', len(columns['timestamps'])),
+            ('orders', orders),
+            ('skipped', skipped),
+            ('cents', sum(columns['cents'])),
+            ('employees', employees),
+            ('catalog_versions', sorted(set(columns['versions']))),
+            ('columns', COLUMNS),
+        ])
+        with io.open(os.path.join(tmp_path, MANIFEST_NAME), 'w',
+                     encoding='utf-8') as f:
+            f.write(six.text_type(json.dumps(manifest, indent=1)) + u'\n')
+        os.rename(tmp_path, path)
+
+    def _parse(self, version, line):
+        """Returns the item id, quantity and cents of an order line."""
+        match = _ITEM_LINE.match(line)
+        if match is not None:
+            item_id, quantity = int(match.group(1)), int(match.group(2))
+            key = (version, item_id)
+            cents = self._prices.get(key)
+            if cents is None:
+                price = self.catalog_versions.item(version, item_id).price
+                cents = self._prices[key] = _cents(price)
+            return item_id, quantity, cents * quantity
+        match = _CUSTOM_LINE.search(line)
+        if match is not None:
+            quantity = int(match.group(1))
+            return (CUSTOM_ITEM, quantity,
+                    _cents(float(match.group(2))) * quantity)
+        match = _DISCOUNT_LINE.search(line)
+        if match is not None:
+            return (DISCOUNT, int(match.group(1)),
+                    -_cents(float(match.group(2))))
+        raise ValueError("invalid order line '{}'".format(line))
+
+
+class ArchivedDay(object):
+    """Day of archived transactions, whose columns are memory-mapped.
+
+    Columns are mapped when first accessed, as ``day['cents']``, so opening
+    many days reads nothing but their manifests.
+
+    Parameters
+    ----------
+    path : :class:`str`
+        Directory of the day.
+
+    Attributes
+    ----------
+    manifest : :class:`dict`
+        Contents of the day's manifest.
+
+    """
+    def __init__(self, path):
+        self._numpy = _import_numpy('reading archived transactions')
+        self.path = path
+        with io.open(os.path.join(path, MANIFEST_NAME),
+                     encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._columns = {}
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def __getitem__(self, name):
+        if name not in COLUMNS:
+            raise KeyError(name)
+        column = self._columns.get(name)
+        if column is None:
+            # Empty files cannot be mapped
+            mmap_mode = 'r' if len(self) else None
+            column = self._numpy.load(
+                os.path.join(self.path, name + '.npy'), mmap_mode=mmap_mode)
+            self._columns[name] = column
+        return column
+
+    @property
+    def date(self):
+        return self.manifest['date']
+
+    @property
+    def employees(self):
+        """Employee names, indexed by the ``employee_ids`` column."""
+        return self.manifest['employees']
+
+
+def load_archive(archive_path, start=None, end=None):
+    """Opens the archived days between two dates.
+
+    Parameters
+    ----------
+    archive_path : :class:`str`
+        Directory of the archive.
+    start : :class:`str`, optional
+        First day, as ``'YYYY-MM-DD'``. Defaults to ``None``, meaning the
+        first archived day.
+    end : :class:`str`, optional
+        Last day, as ``'YYYY-MM-DD'``. Defaults to ``None``, meaning the
+        last archived day.
+
+    Returns
+    -------
+    days : :class:`list`
+        :class:`ArchivedDay` instances, by date.
+
+    """
+    days = []
+    for name in sorted(os.listdir(archive_path)):
+        path = os.path.join(archive_path, name)
+        if not os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+            continue
+        if start is not None and name < start:
+            continue
+        if end is not None and name > end:
+            continue
+        days.append(ArchivedDay(path))
+    return days
+
+
+def _import_numpy(purpose):
+    """Imports NumPy when first needed, as it would slow down startup."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('{} requires NumPy'.format(purpose))
+    return numpy
+
+
+def _timestamp(asctime):
+    """Converts a record's ``asctime`` to seconds since the epoch."""
+    seconds, _, milliseconds = asctime.partition(',')
+    return (time.mktime(time.strptime(seconds, '%Y-%m-%d %H:%M:%S')) +
+            int(milliseconds) / 1000.0)
+
+
+def _cents(amount):
+    """Converts an amount of dollars to integer cents."""
+    return int(round(amount * 100))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="archive the rotated transaction logs as daily NumPy " +
+                    "columns")
+    parser.add_argument("-l", "--log_path", help="path to the " +
+                        "directory of log files", type=str,
+                        default="./")
+    parser.add_argument("-C", "--catalog_versions_path", help="path to " +
+                        "the catalog versions database", type=str,
+                        required=True)
+    parser.add_argument("-a", "--archive_path", help="path to the " +
+                        "archive directory", type=str, required=True)
+    args = parser.parse_args()
+
+    versions = CatalogVersions(args.catalog_versions_path)
+    archiver = TransactionArchiver(args.archive_path, versions)
+    for date in archiver.archive_log(os.path.join(args.log_path,
+                                                  'transactions.log')):
+        sys.stdout.write('archived {}\n'.format(date))
+    versions.close()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Catalog-related classes."""
+import hashlib
+from array import array
+
+from .immutables import Item
+
+
+class Catalog(object):
+    """Compact, column-wise store for menu items.
+
+    Items are referred to by an integer item id, which is their position in
+    the store. Ids are assigned in insertion order and never reused, so
+    loading the same menu file always yields the same ids. Category names
+    are stored once and referenced by index.
+
+    :class:`Item` instances are only built on demand, through :meth:`item`
+    or by iterating over the catalog.
+
+    """
+    __slots__ = ('names', 'prices', 'barcodes', 'shortcuts', 'category_ids',
+                 'categories', '_category_index', '_tokens', '_custom_rows',
+                 '_custom_ids', '_digest')
+
+    def __init__(self):
+        self.names = []
+        self.prices = array('d')
+        self.barcodes = []
+        self.shortcuts = []
+        self.category_ids = array('i')
+        self.categories = []
+        self._category_index = {}
+        self._tokens = {}
+        self._custom_rows = {}
+        self._custom_ids = set()
+        self._digest = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return (self.item(item_id) for item_id in self.indexed_ids())
+
+    def __contains__(self, token):
+        return token in self._tokens
+
+    def add(self, name, price, barcode, category='General', shortcut=None):
+        """Adds a menu item and returns its id.
+
+        The item can then be found by its barcode or its shortcut. If either
+        token is already used by another item, that item keeps it.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Item name.
+        price : :class:`float`
+            Item price.
+        barcode : :class:`str`
+            Item barcode.
+        category : :class:`str`, optional
+            Item category. Defaults to ``'General'``.
+        shortcut : :class:`str`, optional
+            Item shortcut. Defaults to ``None``.
+
+        """
+        item_id = self._append(name, price, barcode, category, shortcut)
+        self._digest = None
+        self._tokens.setdefault(barcode, item_id)
+        if shortcut is not None:
+            self._tokens.setdefault(shortcut, item_id)
+        return item_id
+
+    def add_custom(self, name, price, barcode, category, shortcut=None):
+        """Adds an item that cannot be found by token and returns its id.
+
+        Adding the same custom item twice returns the same id.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Item name.
+        price : :class:`float`
+            Item price.
+        barcode : :class:`str`
+            Item barcode.
+        category : :class:`str`
+            Item category.
+        shortcut : :class:`str`, optional
+            Item shortcut. Defaults to ``None``.
+
+        """
+        row = (name, price, barcode, category, shortcut)
+        item_id = self._custom_rows.get(row)
+        if item_id is None:
+            item_id = self._append(*row)
+            self._custom_rows[row] = item_id
+            self._custom_ids.add(item_id)
+        return item_id
+
+    def find(self, token):
+        """Finds an item id by a token.
+
+        The token can either be the item's barcode or its shortcut.
+
+        Parameters
+        ----------
+        token : :class:`str`
+            Token by which to search the item.
+
+        Raises
+        ------
+        ValueError
+            If the token corresponds to no item in the catalog.
+
+        """
+        try:
+            return self._tokens[token]
+        except KeyError:
+            raise ValueError("item not found with token '{}'".format(token))
+
+    def is_custom(self, item_id):
+        """Returns whether an item was added with :meth:`add_custom`."""
+        return item_id in self._custom_ids
+
+    def row(self, item_id):
+        """Returns the fields of an item as a tuple."""
+        return (self.names[item_id], self.prices[item_id],
+                self.barcodes[item_id], self.category(item_id),
+                self.shortcuts[item_id])
+
+    def matches(self, item_id, token):
+        """Returns whether ``token`` is the barcode or shortcut of an item."""
+        return token in (self.shortcuts[item_id], self.barcodes[item_id])
+
+    def item(self, item_id):
+        """Returns the :class:`Item` corresponding to an item id."""
+        return Item(*self.row(item_id))
+
+    def category(self, item_id):
+        """Returns the category name of an item."""
+        return self.categories[self.category_ids[item_id]]
+
+    def indexed_ids(self):
+        """Returns the ids of all items that can be found by token."""
+        return [item_id for item_id in range(len(self))
+                if item_id not in self._custom_ids]
+
+    def digest(self):
+        """Returns a hash of the items that can be found by token.
+
+        Two catalogs with the same digest assign the same ids to the same
+        menu items, which makes item ids safe to persist alongside it.
+
+        """
+        if self._digest is None:
+            digest = hashlib.sha1()
+            for item_id in self.indexed_ids():
+                name, price, barcode, category, shortcut = self.row(item_id)
+                row = u'\x1f'.join([name, repr(price), barcode, category,
+                                    shortcut or u''])
+                digest.update(row.encode('utf-8') + b'\x1e')
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def _append(self, name, price, barcode, category, shortcut):
+        """Appends an item to the columns and returns its id."""
+        category_id = self._category_index.get(category)
+        if category_id is None:
+            category_id = len(self.categories)
+            self.categories.append(category)
+            self._category_index[category] = category_id
+        self.names.append(name)
+        self.prices.append(price)
+        self.barcodes.append(barcode)
+        self.shortcuts.append(shortcut)
+        self.category_ids.append(category_id)
+        return len(self.names) - 1
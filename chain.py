@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""Tamper-evident hash-chained logs."""
+import argparse
+import hashlib
+import hmac
+import io
+import os
+import sys
+from collections import namedtuple
+
+import six
+
+from .logs import (CHAIN_TAG, RECORD_START,
+                   CompressingTimedRotatingFileHandler, open_log,
+                   rotated_log_files, _strip_gz)
+
+# Hash preceding the first record of a log
+GENESIS = '0' * 64
+
+Checkpoint = namedtuple('Checkpoint', 'suffix first last count mac')
+
+
+def record_hash(previous, text):
+    """Returns the hash of a record chained to the previous record's hash.
+
+    Parameters
+    ----------
+    previous : :class:`str`
+        Hexadecimal hash of the previous record.
+    text : :class:`str`
+        Formatted record, without its hash.
+
+    """
+    if not isinstance(text, six.text_type):
+        text = text.decode('utf-8')
+    return hashlib.sha256(previous.encode('ascii') +
+                          text.encode('utf-8')).hexdigest()
+
+
+def checkpoint_mac(key, suffix, first, last, count):
+    """Returns the signature of a checkpoint."""
+    message = u'{}|{}|{}|{}'.format(suffix, first, last, count)
+    return hmac.new(key, message.encode('utf-8'),
+                    hashlib.sha256).hexdigest()
+
+
+def checkpoints_file_path(file_path):
+    """Returns the path of the checkpoints file of a log."""
+    return file_path + '.checkpoints'
+
+
+def load_checkpoints(file_path):
+    """Loads the checkpoints of a log's rotated files, from oldest to newest.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the log file.
+
+    Returns
+    -------
+    checkpoints : :class:`list`
+        :class:`Checkpoint` instances. Malformed lines are ignored.
+
+    """
+    checkpoints = []
+    path = checkpoints_file_path(file_path)
+    if not os.path.isfile(path):
+        return checkpoints
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            tokens = line.strip().split(u'|')
+            if len(tokens) != 5 or not tokens[3].isdigit():
+                continue
+            checkpoints.append(Checkpoint(tokens[0], tokens[1], tokens[2],
+                                          int(tokens[3]), tokens[4]))
+    return checkpoints
+
+
+def read_key(file_path):
+    """Reads a signing key from a file."""
+    with io.open(file_path, 'rb') as f:
+        return f.read().strip()
+
+
+class HashChainHandler(CompressingTimedRotatingFileHandler):
+    """Rotating file handler chaining each record to the previous one.
+
+    The first line of each record ends with `` #`` followed by the SHA-256
+    hash of the previous record's hash and of the formatted record, so that
+    editing, removing or reordering records breaks the chain. The format's
+    first line must start with the record's ``asctime``.
+
+    When the log rotates, a checkpoint holding the rotated file's first
+    previous hash, last hash and record count, signed with HMAC-SHA256, is
+    appended to the log's checkpoints file. The next file continues the
+    chain, so files can be verified independently and then linked through
+    their checkpoints, see :func:`verify_log`.
+
+    Only one handler, in one process, may write to a log. With ``delay``,
+    the log is only read to continue its chain when the first record is
+    emitted.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Path to the log file.
+    key : :class:`bytes`
+        Key signing the checkpoints.
+
+    Other arguments are passed to
+    :class:`CompressingTimedRotatingFileHandler`.
+
+    """
+    def __init__(self, filename, key, when='midnight', backup_count=0,
+                 compress=True, delay=False):
+        CompressingTimedRotatingFileHandler.__init__(
+            self, filename, when, backup_count, compress, delay)
+        self.key = key
+        self._resumed = False
+        if not delay:
+            self._resume()
+
+    def _resume(self):
+        """Continues the chain of records written before a restart."""
+        if self._resumed:
+            return
+        checkpoints = load_checkpoints(self.baseFilename)
+        self._first = checkpoints[-1].last if checkpoints else GENESIS
+        self._previous = self._first
+        self._count = 0
+        if os.path.isfile(self.baseFilename):
+            for _, tag, _ in iter_chained_records(self.baseFilename):
+                if tag is not None:
+                    self._previous = tag
+                self._count += 1
+        self._resumed = True
+
+    def emit(self, record):
+        # Before a rollover, which checkpoints the chain
+        self._resume()
+        CompressingTimedRotatingFileHandler.emit(self, record)
+
+    def format(self, record):
+        text = CompressingTimedRotatingFileHandler.format(self, record)
+        self._previous = record_hash(self._previous, text)
+        self._count += 1
+        first_line, newline, rest = text.partition('\n')
+        return first_line + ' #' + self._previous + newline + rest
+
+    def doRollover(self):
+        self._resume()
+        rotated = set(_strip_gz(path)
+                      for path in rotated_log_files(self.baseFilename))
+        CompressingTimedRotatingFileHandler.doRollover(self)
+        new = [_strip_gz(path)
+               for path in rotated_log_files(self.baseFilename)
+               if _strip_gz(path) not in rotated]
+        if not new:
+            return
+        suffix = new[-1][len(self.baseFilename) + 1:]
+        mac = checkpoint_mac(self.key, suffix, self._first, self._previous,
+                             self._count)
+        with io.open(checkpoints_file_path(self.baseFilename), 'a',
+                     encoding='utf-8') as f:
+            f.write(u'{}|{}|{}|{}|{}\n'.format(
+                suffix, self._first, self._previous, self._count, mac))
+        self._first = self._previous
+        self._count = 0
+
+
+def iter_chained_records(file_path):
+    """Iterates over the records of a log file as they were hashed.
+
+    Yields
+    ------
+    asctime : :class:`str`
+    tag : :class:`str`
+        Hash written with the record, ``None`` if it has none.
+    text : :class:`str`
+        Formatted record, without its hash.
+
+    """
+    with open_log(file_path) as f:
+        asctime = tag = None
+        lines = []
+        for line in f:
+            line = line.rstrip(u'\n')
+            match = RECORD_START.match(line)
+            if match:
+                if asctime is not None:
+                    yield asctime, tag, u'\n'.join(lines)
+                asctime = match.group(0)
+                tag_match = CHAIN_TAG.search(line, match.end())
+                tag = None
+                if tag_match is not None:
+                    tag = tag_match.group(1)
+                    line = line[:tag_match.start()]
+                lines = [line]
+            elif asctime is not None:
+                lines.append(line)
+        if asctime is not None:
+            yield asctime, tag, u'\n'.join(lines)
+
+
+def verify_file(file_path, first, last=None, count=None):
+    """Verifies the chain of a log file.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the log file.
+    first : :class:`str`
+        Hash preceding the file's first record.
+    last : :class:`str`, optional
+        Expected hash of the file's last record. Defaults to ``None``,
+        meaning it is not checked.
+    count : :class:`int`, optional
+        Expected number of records. Defaults to ``None``, meaning it is not
+        checked.
+
+    Returns
+    -------
+    errors : :class:`list`
+        Descriptions of the problems found, empty if the chain is intact.
+
+    """
+    name = os.path.basename(file_path)
+    errors = []
+    previous = first
+    records = 0
+    for asctime, tag, text in iter_chained_records(file_path):
+        records += 1
+        expected = record_hash(previous, text)
+        if tag != expected:
+            errors.append('{}: record {} ({}) does not match its hash'.format(
+                name, records, asctime))
+        # Keep checking the records following an edit against their tags
+        previous = tag if tag is not None else expected
+    if last is not None and previous != last:
+        errors.append('{}: last record does not match checkpoint'.format(
+            name))
+    if count is not None and records != count:
+        errors.append('{}: {} records instead of {}'.format(
+            name, records, count))
+    return errors
+
+
+def verify_log(file_path, key, processes=None):
+    """Verifies a hash-chained log and its rotated files.
+
+    Each file is verified by its own worker process, starting from the
+    previous file's last hash as recorded in the checkpoints, while the
+    checkpoints' signatures and links are checked by the calling process.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the log file.
+    key : :class:`bytes`
+        Key the checkpoints were signed with.
+    processes : :class:`int`, optional
+        Number of worker processes. Defaults to ``None``, meaning the number
+        of CPUs.
+
+    Returns
+    -------
+    errors : :class:`list`
+        Descriptions of the problems found, empty if the log is intact.
+
+    """
+    errors = []
+    checkpoints = load_checkpoints(file_path)
+    previous = GENESIS
+    for checkpoint in checkpoints:
+        mac = checkpoint_mac(key, checkpoint.suffix, checkpoint.first,
+                             checkpoint.last, checkpoint.count)
+        if not hmac.compare_digest(mac.encode('ascii'),
+                                   checkpoint.mac.encode('ascii')):
+            errors.append('checkpoint {} has an invalid signature'.format(
+                checkpoint.suffix))
+        if checkpoint.first != previous:
+            errors.append('checkpoint {} does not follow the previous '
+                          'one'.format(checkpoint.suffix))
+        previous = checkpoint.last
+    by_suffix = dict((checkpoint.suffix, checkpoint)
+                     for checkpoint in checkpoints)
+
+    tasks = []
+    for path in rotated_log_files(file_path):
+        suffix = _strip_gz(path)[len(os.path.abspath(file_path)) + 1:]
+        checkpoint = by_suffix.get(suffix)
+        if checkpoint is None:
+            errors.append('{} has no checkpoint'.format(
+                os.path.basename(path)))
+            continue
+        tasks.append((path, checkpoint.first, checkpoint.last,
+                      checkpoint.count))
+    if os.path.isfile(file_path):
+        # The current file is not sealed by a checkpoint yet
+        tasks.append((file_path, previous, None, None))
+    if len(tasks) > 1 and processes != 1:
+        # Only the verifier needs worker processes, not the register
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_verify_task, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_verify_task(task) for task in tasks]
+    for file_errors in results:
+        errors.extend(file_errors)
+    return errors
+
+
+def _verify_task(task):
+    """Verifies a file in a worker process."""
+    return verify_file(*task)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="verify the hash chains of the transaction and count " +
+                    "logs")
+    parser.add_argument("-l", "--log_path", help="path to the " +
+                        "directory of log files", type=str,
+                        default="./")
+    parser.add_argument("-k", "--log_key_path", help="path to the key " +
+                        "signing log checkpoints", type=str, required=True)
+    parser.add_argument("-j", "--processes", help="number of worker " +
+                        "processes", type=int, default=None)
+    args = parser.parse_args()
+
+    key = read_key(args.log_key_path)
+    intact = True
+    for name in ('transactions.log', 'counts.log'):
+        log_errors = verify_log(os.path.join(args.log_path, name), key,
+                                args.processes)
+        for error in log_errors:
+            sys.stdout.write('{}: {}\n'.format(name, error))
+        intact = intact and not log_errors
+    sys.exit(0 if intact else 1)
@@ -2,8 +2,13 @@
 """Command-line interface for the register."""
 
 import argparse
+import threading
+import time
 
+from .dashboard import summaries_to_string
 from .register import Register
+from .scanner import BarcodeScanner
+from .startup import startup_times_to_string
 from .exceptions import CredentialException, ItemNotFoundException
 
 
@@ -79,6 +84,117 @@ class CLI(object):
         except CredentialException:
             self.logger.warning("insufficient privileges to checkout order")
 
+    def park(self, name):
+        try:
+            self.register.park_order(name)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to park an order")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def resume(self, name):
+        try:
+            self.register.resume_order(name)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to resume an order")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def discard(self, name):
+        try:
+            self.register.discard_order(name)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to discard an order")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def print_parked(self):
+        print "\n".join(self.register.parked_orders.names)
+
+    def close_out(self, date=None):
+        try:
+            print self.register.close_out(date).to_string()
+        except CredentialException:
+            self.logger.warning("insufficient privileges to close out")
+
+    def print_memory(self):
+        try:
+            print self.register.memory_report().to_string()
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print memory " +
+                                "usage")
+
+    def print_startup_times(self):
+        print startup_times_to_string(self.register.startup_times)
+
+    def print_shifts(self, date=None, employee=None):
+        # Imported here, as it imports SQLite
+        from .shifts import shifts_to_string
+        try:
+            print shifts_to_string(self.register.shift_report(employee, date))
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print shifts")
+
+    def print_on_shift(self, moment):
+        from .shifts import shifts_to_string
+        try:
+            timestamp = time.mktime(time.strptime(moment, "%Y-%m-%d %H:%M"))
+            print shifts_to_string(self.register.on_shift(timestamp))
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print shifts")
+        except ValueError:
+            self.logger.warning("invalid time, expected YYYY-MM-DD HH:MM")
+
+    def print_price_at(self, barcode, moment):
+        try:
+            timestamp = time.mktime(time.strptime(moment, "%Y-%m-%d %H:%M"))
+        except ValueError:
+            self.logger.warning("invalid time, expected YYYY-MM-DD HH:MM")
+            return
+        try:
+            price = self.register.price_at(barcode, timestamp)
+            if price is None:
+                print "not on the menu"
+            else:
+                print "{:.2f}$".format(price)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print prices")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def switch_menu(self, name):
+        try:
+            self.register.switch_menu(name)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to switch menus")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def print_dashboard(self):
+        try:
+            print summaries_to_string(self.register.sales_dashboard())
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print sales " +
+                                "dashboard")
+
+    def restock(self, file_path):
+        try:
+            self.register.restock(file_path)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to restock")
+        except ValueError as e:
+            self.logger.warning(str(e))
+
+    def print_low_stock(self, threshold_string="0"):
+        try:
+            low = self.register.low_stock(int(threshold_string))
+            print "\n".join("{} x {}".format(barcode, level)
+                            for level, barcode in low)
+        except CredentialException:
+            self.logger.warning("insufficient privileges to print low stock")
+        except ValueError:
+            self.logger.warning("invalid stock threshold")
+
     def count(self, count_string):
         try:
             count = float(count_string)
@@ -93,59 +209,128 @@ class CLI(object):
         'login': login,
     }
 
-    def __init__(self, register, default_prompt="caisse-planck > "):
+    def __init__(self, register, default_prompt="caisse-planck > ",
+                 scanner=None):
         self.register = register
+        self.scanner = scanner
+        self.lock = threading.Lock()
         self.logger = register.events_logger
         self.default_prompt = default_prompt
         self.prompt = self.default_prompt
         self.end = False
 
     def start(self):
+        if self.scanner is not None:
+            feeder = threading.Thread(target=self.feed_scans,
+                                      name='pyplanck-scan-feeder')
+            feeder.daemon = True
+            feeder.start()
         while not self.end:
             command = raw_input(self.prompt).strip()
-            tokens = command.split(" ")
-            if tokens[0] == "q":
-                self.quit()
-            elif tokens[0] == "login":
-                if len(tokens) < 2:
-                    self.logger.warning("need a login token")
-                    continue
-                self.login(tokens[1])
-            elif tokens[0] == "logout":
-                self.logout()
-            elif tokens[0] == "print_count":
-                self.print_count()
-            elif tokens[0] == "print_order":
-                self.print_order()
-            elif tokens[0] == "remove":
-                if len(tokens) < 2:
-                    self.logger.warning("need an item to remove")
-                    continue
-                self.remove(tokens[1])
-            elif tokens[0] == "adjust_count":
-                if len(tokens) < 2:
-                    self.logger.warning("need an adjustment amount")
-                    continue
-                self.adjust(tokens[1])
-            elif tokens[0] == "custom":
-                if len(tokens) < 3:
-                    self.logger.warning("need an name and a price")
-                    continue
-                try:
-                    self.add_custom(tokens[1], float(tokens[2]))
-                except ValueError:
-                    self.logger.warning("price is not valid")
-            elif tokens[0] == "checkout":
-                self.checkout()
-            elif tokens[0] == "count":
-                if len(tokens) < 2:
-                    self.logger.warning("need an register count")
-                    continue
-                else:
-                    self.count(tokens[1])
+            with self.lock:
+                self.execute(command)
+
+    def feed_scans(self):
+        while not self.end:
+            # Wait outside the lock so that commands are not held up
+            codes = self.scanner.get_batch(timeout=0.5)
+            with self.lock:
+                for code in codes:
+                    self.add(code)
+
+    def execute(self, command):
+        tokens = command.split(" ")
+        if tokens[0] == "q":
+            self.quit()
+        elif tokens[0] == "login":
+            if len(tokens) < 2:
+                self.logger.warning("need a login token")
+                return
+            self.login(tokens[1])
+        elif tokens[0] == "logout":
+            self.logout()
+        elif tokens[0] == "print_count":
+            self.print_count()
+        elif tokens[0] == "print_order":
+            self.print_order()
+        elif tokens[0] == "remove":
+            if len(tokens) < 2:
+                self.logger.warning("need an item to remove")
+                return
+            self.remove(tokens[1])
+        elif tokens[0] == "adjust_count":
+            if len(tokens) < 2:
+                self.logger.warning("need an adjustment amount")
+                return
+            self.adjust(tokens[1])
+        elif tokens[0] == "custom":
+            if len(tokens) < 3:
+                self.logger.warning("need an name and a price")
+                return
+            try:
+                self.add_custom(tokens[1], float(tokens[2]))
+            except ValueError:
+                self.logger.warning("price is not valid")
+        elif tokens[0] == "checkout":
+            self.checkout()
+        elif tokens[0] == "park":
+            if len(tokens) < 2:
+                self.logger.warning("need a name for the parked order")
+                return
+            self.park(tokens[1])
+        elif tokens[0] == "resume":
+            if len(tokens) < 2:
+                self.logger.warning("need the name of a parked order")
+                return
+            self.resume(tokens[1])
+        elif tokens[0] == "discard":
+            if len(tokens) < 2:
+                self.logger.warning("need the name of a parked order")
+                return
+            self.discard(tokens[1])
+        elif tokens[0] == "print_parked":
+            self.print_parked()
+        elif tokens[0] == "closeout":
+            self.close_out(tokens[1] if len(tokens) > 1 else None)
+        elif tokens[0] == "mem":
+            self.print_memory()
+        elif tokens[0] == "startup":
+            self.print_startup_times()
+        elif tokens[0] == "shifts":
+            self.print_shifts(*tokens[1:3])
+        elif tokens[0] == "on_shift":
+            if len(tokens) < 3:
+                self.logger.warning("need a date and a time")
+                return
+            self.print_on_shift(" ".join(tokens[1:3]))
+        elif tokens[0] == "price":
+            if len(tokens) < 4:
+                self.logger.warning("need a barcode, a date and a time")
+                return
+            self.print_price_at(tokens[1], " ".join(tokens[2:4]))
+        elif tokens[0] == "menu":
+            if len(tokens) < 2:
+                print self.register.menu_profile
+                return
+            self.switch_menu(tokens[1])
+        elif tokens[0] == "dashboard":
+            self.print_dashboard()
+        elif tokens[0] == "restock":
+            if len(tokens) < 2:
+                self.logger.warning("need the path of a stock file")
+                return
+            self.restock(tokens[1])
+        elif tokens[0] == "low_stock":
+            self.print_low_stock(*tokens[1:2])
+        elif tokens[0] == "count":
+            if len(tokens) < 2:
+                self.logger.warning("need an register count")
+                return
             else:
-                if tokens[0] != "":
-                    self.add(tokens[0])
+                self.count(tokens[1])
+        else:
+            if tokens[0] != "":
+                self.add(tokens[0])
 
 
 if __name__ == "__main__":
@@ -161,17 +346,82 @@ if __name__ == "__main__":
     parser.add_argument("-l", "--log_path", help="path to the " +
                         "directory of log files", type=str,
                         default="./")
+    parser.add_argument("-o", "--order_log_path", help="path to the " +
+                        "write-ahead log of the current order, used to " +
+                        "restore it after a crash", type=str, default=None)
+    parser.add_argument("-b", "--log_backup_count", help="number of " +
+                        "rotated files to keep for each log, 0 to keep " +
+                        "them all", type=int, default=0)
+    parser.add_argument("-z", "--compress_logs", help="gzip rotated log " +
+                        "files", action="store_true")
+    parser.add_argument("-p", "--policy_path", help="path to the " +
+                        "permission policy file", type=str, default=None)
+    parser.add_argument("-L", "--lazy", help="start right away and load " +
+                        "the menu in the background", action="store_true")
+    parser.add_argument("-d", "--pricing_path", help="path to the " +
+                        "pricing rules file", type=str, default=None)
+    parser.add_argument("-i", "--inventory_path", help="path to the " +
+                        "stock levels file", type=str, default=None)
+    parser.add_argument("-s", "--scanner_path", help="path to a " +
+                        "barcode scanner device", type=str, default=None)
+    parser.add_argument("-P", "--menu_profile", help="menu profile the " +
+                        "register can switch to, as NAME=PATH; can be " +
+                        "repeated", action="append", default=[])
+    parser.add_argument("-S", "--menu_schedule_path", help="path to the " +
+                        "menu profile schedule file", type=str, default=None)
+    parser.add_argument("-k", "--log_key_path", help="path to the key " +
+                        "signing the hash-chained transaction and count " +
+                        "logs", type=str, default=None)
+    parser.add_argument("-D", "--display_socket_path", help="path of the " +
+                        "socket serving the order to customer displays",
+                        type=str, default=None)
+    parser.add_argument("-C", "--catalog_versions_path", help="path to " +
+                        "the catalog versions database", type=str,
+                        default=None)
+    parser.add_argument("-A", "--archive_path", help="path to the " +
+                        "directory archiving rotated transaction logs",
+                        type=str, default=None)
+    parser.add_argument("-R", "--receipt_printer_path", help="path to an " +
+                        "ESC/POS receipt printer", type=str, default=None)
+    parser.add_argument("-t", "--trace_memory", help="trace the memory " +
+                        "allocated while loading the menu",
+                        action="store_true")
     args = parser.parse_args()
 
     menu_path = args.menu_path
     employees_path = args.employees_path
     register_count_path = args.register_count_path
     log_path = args.log_path
+    menu_profiles = dict(profile.split("=", 1)
+                         for profile in args.menu_profile)
 
     register = Register(menu_file_path=menu_path,
                         employees_file_path=employees_path,
                         register_count_file_path=register_count_path,
-                        log_path=log_path)
+                        log_path=log_path,
+                        order_log_file_path=args.order_log_path,
+                        log_backup_count=args.log_backup_count,
+                        compress_logs=args.compress_logs,
+                        policy_file_path=args.policy_path,
+                        lazy=args.lazy,
+                        pricing_file_path=args.pricing_path,
+                        inventory_file_path=args.inventory_path,
+                        trace_memory=args.trace_memory,
+                        menu_profiles=menu_profiles,
+                        menu_schedule_file_path=args.menu_schedule_path,
+                        log_key_file_path=args.log_key_path,
+                        display_socket_path=args.display_socket_path,
+                        catalog_versions_file_path=args.catalog_versions_path,
+                        archive_path=args.archive_path,
+                        receipt_printer_path=args.receipt_printer_path)
+
+    scanner = None
+    if args.scanner_path is not None:
+        scanner = BarcodeScanner(args.scanner_path)
+        scanner.start()
 
-    cli = CLI(register=register)
+    cli = CLI(register=register, scanner=scanner)
     cli.start()
+    if scanner is not None:
+        scanner.close()
+    register.close()
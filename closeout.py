@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""End-of-day close-out report."""
+import heapq
+import os
+from collections import OrderedDict, namedtuple
+
+from .logs import iter_records, log_files
+
+Discrepancy = namedtuple('Discrepancy', 'asctime employee kind amount')
+
+# Amounts closer than this are considered equal
+TOLERANCE = 0.005
+
+
+class EmployeeSummary(object):
+    """Activity of an employee over a day."""
+    def __init__(self):
+        self.transactions = 0
+        self.sales = 0.0
+        self.adjustments = 0.0
+        self.counts = 0
+        self.count_mismatch = 0.0
+
+
+class CloseOutReport(object):
+    """Reconciliation of a day's transactions with its register counts.
+
+    Starting from the first register count logged during the day, the
+    register count expected after each sale and adjustment is compared to
+    the one logged by the next count or adjustment. Differences are
+    reported as ``'unexplained change'`` discrepancies. Differences between
+    an employee's count and the register count are reported as ``'count
+    mismatch'`` discrepancies.
+
+    Parameters
+    ----------
+    date : :class:`str`
+        Day of the report, as ``'YYYY-MM-DD'``.
+
+    """
+    def __init__(self, date):
+        self.date = date
+        self.transactions = 0
+        self.sales = 0.0
+        self.untotaled_transactions = 0
+        self.adjustments = 0.0
+        self.counts = 0
+        self.opening_count = None
+        self.closing_count = None
+        self.discrepancies = []
+        self.employees = OrderedDict()
+        self._expected_count = None
+
+    def employee(self, name):
+        """Returns the summary of an employee, creating it if needed."""
+        if name not in self.employees:
+            self.employees[name] = EmployeeSummary()
+        return self.employees[name]
+
+    def add_transaction(self, asctime, message):
+        """Accounts for a transaction log record."""
+        lines = message.split('\n')
+        summary = self.employee(lines[0])
+        summary.transactions += 1
+        self.transactions += 1
+        total = _amount(lines[-1], 'Total:')
+        if total is None:
+            # Records logged before totals were added to the log
+            self.untotaled_transactions += 1
+            self._expected_count = None
+            return
+        summary.sales += total
+        self.sales += total
+        if self._expected_count is not None:
+            self._expected_count += total
+
+    def add_count(self, asctime, message):
+        """Accounts for a count log record."""
+        lines = message.split('\n')
+        if len(lines) < 4:
+            return
+        if lines[0].startswith('Adjustment by '):
+            name = lines[0][len('Adjustment by '):]
+            old_count = _amount(lines[1], 'Old count:')
+            new_count = _amount(lines[2], 'New count:')
+            amount = _amount(lines[3], 'Difference:')
+            if None in (old_count, new_count, amount):
+                return
+            self._check_count(asctime, name, old_count)
+            self.employee(name).adjustments += amount
+            self.adjustments += amount
+            self._expected_count = new_count
+        elif lines[0].startswith('Count by '):
+            name = lines[0][len('Count by '):]
+            employee_count = _amount(lines[1], 'Employee count:')
+            register_count = _amount(lines[2], 'Register count:')
+            if None in (employee_count, register_count):
+                return
+            self._check_count(asctime, name, register_count)
+            summary = self.employee(name)
+            summary.counts += 1
+            self.counts += 1
+            mismatch = employee_count - register_count
+            if abs(mismatch) >= TOLERANCE:
+                summary.count_mismatch += mismatch
+                self.discrepancies.append(
+                    Discrepancy(asctime, name, 'count mismatch', mismatch))
+            self._expected_count = register_count
+
+    def close(self):
+        """Records the register count expected at the end of the day."""
+        self.closing_count = self._expected_count
+
+    def to_string(self):
+        """Returns a printable version of the report."""
+        lines = ['Close-out for {}'.format(self.date),
+                 '       Transactions: {}'.format(self.transactions),
+                 '              Sales: {:.2f}$'.format(self.sales),
+                 '        Adjustments: {:.2f}$'.format(self.adjustments),
+                 '             Counts: {}'.format(self.counts)]
+        if self.opening_count is not None:
+            lines.append('      Opening count: {:.2f}$'.format(
+                self.opening_count))
+        if self.closing_count is not None:
+            lines.append('      Closing count: {:.2f}$'.format(
+                self.closing_count))
+        if self.untotaled_transactions:
+            lines.append('Untotaled transactions: {}'.format(
+                self.untotaled_transactions))
+        lines.append('Discrepancies: {}'.format(len(self.discrepancies)))
+        for discrepancy in self.discrepancies:
+            lines.append('  {} {} ({}): {:.2f}$'.format(
+                discrepancy.asctime, discrepancy.kind, discrepancy.employee,
+                discrepancy.amount))
+        lines.append('Employees:')
+        for name, summary in self.employees.items():
+            lines.append(
+                '  {}: {} transactions, {:.2f}$ sales, '.format(
+                    name, summary.transactions, summary.sales) +
+                '{:.2f}$ adjustments, {} counts, '.format(
+                    summary.adjustments, summary.counts) +
+                '{:.2f}$ count mismatch'.format(summary.count_mismatch))
+        return '\n'.join(lines)
+
+    def _check_count(self, asctime, name, register_count):
+        """Compares a logged register count with the expected one."""
+        if self.opening_count is None:
+            self.opening_count = register_count
+        if self._expected_count is not None:
+            difference = register_count - self._expected_count
+            if abs(difference) >= TOLERANCE:
+                self.discrepancies.append(Discrepancy(
+                    asctime, name, 'unexplained change', difference))
+
+
+def close_out_report(log_path, date):
+    """Builds the close-out report of a day.
+
+    The transactions and counts logs are streamed once, in timestamp order,
+    and only the files which can hold records of that day are read.
+
+    Parameters
+    ----------
+    log_path : :class:`str`
+        Directory of the register's logs.
+    date : :class:`str`
+        Day of the report, as ``'YYYY-MM-DD'``.
+
+    """
+    report = CloseOutReport(date)
+    streams = [
+        _day_records(os.path.join(log_path, 'transactions.log'), date, 0),
+        _day_records(os.path.join(log_path, 'counts.log'), date, 1)]
+    for asctime, stream, message in heapq.merge(*streams):
+        if stream == 0:
+            report.add_transaction(asctime, message)
+        else:
+            report.add_count(asctime, message)
+    report.close()
+    return report
+
+
+def _day_records(file_path, date, stream):
+    """Yields ``(asctime, stream, message)`` for the records of a day."""
+    # A rotated file only holds records up to the day in its suffix
+    files = [path for path in log_files(file_path)
+             if path == file_path or
+             os.path.basename(path)[len(os.path.basename(file_path)) + 1:] >=
+             date]
+    for asctime, message in iter_records(files):
+        day = asctime[:10]
+        if day < date:
+            continue
+        if day > date:
+            break
+        yield asctime, stream, message
+
+
+def _amount(line, label):
+    """Parses an amount formatted as ``'<label> <amount>$'``."""
+    line = line.strip()
+    if not line.startswith(label) or not line.endswith('$'):
+        return None
+    try:
+        return float(line[len(label):-1])
+    except ValueError:
+        return None
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Rolling sales aggregates."""
+import datetime
+import heapq
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+WindowSummary = namedtuple('WindowSummary', 'orders revenue items top_items')
+
+
+class SalesTotals(object):
+    """Sales totals of a period.
+
+    Revenue is kept in cents, so that totals removed from a window leave no
+    rounding error behind.
+
+    """
+    __slots__ = ('orders', 'cents', 'items', 'item_counts')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.orders = 0
+        self.cents = 0
+        self.items = 0
+        self.item_counts = {}
+
+    def add_sale(self, cents, lines):
+        """Adds a sale of ``(name, quantity)`` lines."""
+        self.orders += 1
+        self.cents += cents
+        for name, quantity in lines:
+            self.items += quantity
+            self.item_counts[name] = self.item_counts.get(name, 0) + quantity
+
+    def subtract(self, other):
+        self.orders -= other.orders
+        self.cents -= other.cents
+        self.items -= other.items
+        for name, quantity in other.item_counts.items():
+            count = self.item_counts[name] - quantity
+            if count:
+                self.item_counts[name] = count
+            else:
+                del self.item_counts[name]
+
+    def summary(self, top=3):
+        """Returns a :class:`WindowSummary` with the ``top`` best sellers.
+
+        Unlike the totals, the best sellers are selected when summarizing,
+        which takes time proportional to the number of distinct items sold.
+
+        """
+        top_items = heapq.nlargest(top, self.item_counts.items(),
+                                   key=lambda name_count: name_count[1])
+        return WindowSummary(self.orders, self.cents / 100.0, self.items,
+                             top_items)
+
+
+class RollingWindow(object):
+    """Sales totals of the last ``span`` seconds.
+
+    Sales go in buckets of ``span / bucket_count`` seconds each. The window
+    holds the current, partial bucket and the ``bucket_count`` buckets
+    before it, so it covers at least ``span`` seconds and at most one bucket
+    more. Running totals of the window are updated when a sale is added and
+    when a bucket expires, so reading them does not depend on the number of
+    sales; selecting the best sellers depends on the number of distinct
+    items, see :meth:`SalesTotals.summary`.
+
+    Parameters
+    ----------
+    span : :class:`float`
+        Length of the window in seconds.
+    bucket_count : :class:`int`, optional
+        Number of buckets. Defaults to 60.
+
+    """
+    def __init__(self, span, bucket_count=60):
+        self.span = span
+        self.bucket_width = float(span) / bucket_count
+        # The current bucket is partial, hence the extra one
+        self.buckets = [SalesTotals() for _ in range(bucket_count + 1)]
+        self.totals = SalesTotals()
+        self._current = None
+
+    def add_sale(self, timestamp, cents, lines):
+        """Adds a sale to the bucket of its time.
+
+        Sales older than the window are ignored.
+
+        """
+        index = self._advance(timestamp)
+        if index <= self._current - len(self.buckets):
+            return
+        bucket = self.buckets[index % len(self.buckets)]
+        bucket.add_sale(cents, lines)
+        self.totals.add_sale(cents, lines)
+
+    def summary(self, now, top=3):
+        """Returns the :class:`WindowSummary` of the window ending now."""
+        self._advance(now)
+        return self.totals.summary(top)
+
+    def _advance(self, timestamp):
+        """Expires the buckets older than a time and returns its index."""
+        index = int(timestamp // self.bucket_width)
+        if self._current is None:
+            self._current = index
+        elif index > self._current:
+            if index - self._current >= len(self.buckets):
+                for bucket in self.buckets:
+                    bucket.clear()
+                self.totals.clear()
+            else:
+                for expired in range(self._current + 1, index + 1):
+                    bucket = self.buckets[expired % len(self.buckets)]
+                    self.totals.subtract(bucket)
+                    bucket.clear()
+            self._current = index
+        return index
+
+
+class DailyTotals(object):
+    """Sales totals of the current day, reset at midnight."""
+    def __init__(self):
+        self.totals = SalesTotals()
+        self._date = None
+
+    def add_sale(self, timestamp, cents, lines):
+        """Adds a sale, ignoring it if it is from a past day."""
+        date = datetime.date.fromtimestamp(timestamp)
+        if self._roll(date):
+            self.totals.add_sale(cents, lines)
+
+    def summary(self, now, top=3):
+        """Returns the :class:`WindowSummary` of the day of ``now``."""
+        self._roll(datetime.date.fromtimestamp(now))
+        return self.totals.summary(top)
+
+    def _roll(self, date):
+        """Starts a new day if needed; returns whether ``date`` is today."""
+        if self._date is None or date > self._date:
+            self._date = date
+            self.totals.clear()
+        return date == self._date
+
+
+class Dashboard(object):
+    """Live sales over the last 15 minutes, the last hour and today.
+
+    Parameters
+    ----------
+    windows : :class:`OrderedDict`, optional
+        Window name to :class:`RollingWindow` or :class:`DailyTotals`
+        mapping. Defaults to ``None``, meaning ``'15 min'`` and ``'1 h'``
+        windows of one-minute buckets and ``'today'``.
+
+    """
+    def __init__(self, windows=None):
+        if windows is None:
+            windows = OrderedDict([('15 min', RollingWindow(15 * 60, 15)),
+                                   ('1 h', RollingWindow(60 * 60, 60)),
+                                   ('today', DailyTotals())])
+        self.windows = windows
+        self._lock = threading.Lock()
+
+    def record_checkout(self, event):
+        """Adds a checked out order, from an :class:`OrderCheckedOut` event.
+
+        Meant to be subscribed to a register's :class:`EventBus`.
+
+        """
+        lines = [(item.name, quantity) for item, quantity in event.order]
+        self.add_sale(event.time, event.total, lines)
+
+    def add_sale(self, timestamp, total, lines):
+        """Adds a sale to all windows.
+
+        Parameters
+        ----------
+        timestamp : :class:`float`
+            Time of the sale, in seconds since the epoch.
+        total : :class:`float`
+            Amount of the sale.
+        lines : :class:`list`
+            ``(name, quantity)`` tuples of the items sold.
+
+        """
+        cents = int(round(total * 100))
+        with self._lock:
+            for window in self.windows.values():
+                window.add_sale(timestamp, cents, lines)
+
+    def summaries(self, now=None, top=3):
+        """Returns the summary of each window.
+
+        Parameters
+        ----------
+        now : :class:`float`, optional
+            Time at which windows end. Defaults to ``None``, meaning the
+            current time.
+        top : :class:`int`, optional
+            Number of best selling items listed. Defaults to 3.
+
+        Returns
+        -------
+        summaries : :class:`OrderedDict`
+            Window name to :class:`WindowSummary` mapping.
+
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            return OrderedDict((name, window.summary(now, top))
+                               for name, window in self.windows.items())
+
+    def to_string(self, now=None, top=3):
+        """Returns a printable version of the window summaries."""
+        return summaries_to_string(self.summaries(now, top))
+
+
+def summaries_to_string(summaries):
+    """Returns a printable version of window summaries.
+
+    Parameters
+    ----------
+    summaries : :class:`OrderedDict`
+        Window name to :class:`WindowSummary` mapping.
+
+    """
+    lines = []
+    for name, summary in summaries.items():
+        lines.append('{:>8}: {:.2f}$, {} orders, {} items'.format(
+            name, summary.revenue, summary.orders, summary.items))
+        if summary.top_items:
+            lines.append('          ' + ', '.join(
+                '{} x {}'.format(item_name, count)
+                for item_name, count in summary.top_items))
+    return '\n'.join(lines)
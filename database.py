@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""SQLite storage backend."""
+import argparse
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from .catalog import Catalog
+from .immutables import Employee
+from .loaders import load_employees, load_menu, load_register_count
+from .register import Register
+from .shared_count import Count
+from .utils import validate_file_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    barcode TEXT NOT NULL,
+    category TEXT NOT NULL,
+    shortcut TEXT
+);
+CREATE INDEX IF NOT EXISTS items_barcode ON items (barcode);
+CREATE INDEX IF NOT EXISTS items_shortcut ON items (shortcut);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    barcode TEXT NOT NULL,
+    code TEXT NOT NULL,
+    level INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS employees_barcode ON employees (barcode);
+CREATE INDEX IF NOT EXISTS employees_code ON employees (code);
+
+CREATE TABLE IF NOT EXISTS count_journal (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    kind TEXT NOT NULL,
+    employee TEXT,
+    amount REAL NOT NULL,
+    balance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS count_journal_timestamp
+    ON count_journal (timestamp);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    employee TEXT NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_timestamp ON transactions (timestamp);
+CREATE INDEX IF NOT EXISTS transactions_employee
+    ON transactions (employee, timestamp);
+
+CREATE TABLE IF NOT EXISTS transaction_lines (
+    transaction_id INTEGER NOT NULL REFERENCES transactions (id),
+    name TEXT NOT NULL,
+    barcode TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transaction_lines_transaction
+    ON transaction_lines (transaction_id);
+CREATE INDEX IF NOT EXISTS transaction_lines_barcode
+    ON transaction_lines (barcode);
+"""
+
+
+class Database(object):
+    """SQLite database holding the register's state.
+
+    The database is opened in WAL mode, so reports can read it while a
+    register writes to it. The register count is kept as a journal of
+    changes whose last balance is the current count.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the database file. It is created if it does not exist.
+
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # Transactions are managed explicitly by `transaction`
+        self.connection = sqlite3.connect(file_path, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Runs a block of statements as a single atomic transaction."""
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+
+    def close(self):
+        """Closes the database."""
+        self.connection.close()
+
+    def import_files(self, menu_file_path, employees_file_path,
+                     register_count=None):
+        """Replaces the menu and employees with the content of files.
+
+        Parameters
+        ----------
+        menu_file_path : :class:`str`
+            Path to the menu file.
+        employees_file_path : :class:`str`
+            Path to the employees file.
+        register_count : :class:`float`, optional
+            If given, the register count is set to this value.
+
+        Returns
+        -------
+        errors_detected : :class:`bool`
+            Whether some lines of the files contained errors and were
+            ignored.
+
+        """
+        menu, menu_errors = load_menu(menu_file_path)
+        employees, employees_errors = load_employees(employees_file_path)
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM items')
+            cursor.executemany(
+                'INSERT INTO items (name, price, barcode, category, shortcut) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (menu.row(item_id) for item_id in menu.indexed_ids()))
+            cursor.execute('DELETE FROM employees')
+            cursor.executemany(
+                'INSERT INTO employees (name, barcode, code, level) '
+                'VALUES (?, ?, ?, ?)', employees)
+            if register_count is not None:
+                self._journal(cursor, 'import', None, register_count,
+                              register_count)
+        return bool(menu_errors) or employees_errors
+
+    def catalog(self):
+        """Returns the menu as a :class:`Catalog`."""
+        catalog = Catalog()
+        for row in self.connection.execute(
+                'SELECT name, price, barcode, category, shortcut FROM items '
+                'ORDER BY id'):
+            catalog.add(*row)
+        return catalog
+
+    def employees(self):
+        """Returns the employees list."""
+        return [Employee(*row) for row in self.connection.execute(
+            'SELECT name, barcode, code, level FROM employees ORDER BY id')]
+
+    def register_count(self):
+        """Returns the current register count."""
+        return self._balance(self.connection.cursor())
+
+    def record_checkout(self, employee_name, lines, total):
+        """Records a transaction and adds its total to the register count.
+
+        Parameters
+        ----------
+        employee_name : :class:`str`
+            Name of the employee checking out the order.
+        lines : :class:`list`
+            ``(name, barcode, price, quantity)`` tuples.
+        total : :class:`float`
+            Transaction total.
+
+        Returns
+        -------
+        register_count : :class:`float`
+            New register count.
+
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                'INSERT INTO transactions (timestamp, employee, total) '
+                'VALUES (?, ?, ?)', (time.time(), employee_name, total))
+            transaction_id = cursor.lastrowid
+            cursor.executemany(
+                'INSERT INTO transaction_lines '
+                '(transaction_id, name, barcode, price, quantity) '
+                'VALUES (?, ?, ?, ?, ?)',
+                ((transaction_id, ) + tuple(line) for line in lines))
+            balance = self._balance(cursor) + total
+            self._journal(cursor, 'sale', employee_name, total, balance)
+        return balance
+
+    def record_adjustment(self, employee_name, amount):
+        """Adjusts the register count.
+
+        Parameters
+        ----------
+        employee_name : :class:`str`
+            Name of the employee adjusting the count.
+        amount : :class:`float`
+            Adjustment amount.
+
+        Returns
+        -------
+        register_count : :class:`float`
+            New register count.
+
+        Raises
+        ------
+        ValueError
+            If the adjustment would make the register count negative.
+
+        """
+        with self.transaction() as cursor:
+            count = self._balance(cursor)
+            if count + amount < 0:
+                raise ValueError(
+                    'cannot substract amount ({:.2f}) '.format(abs(amount)) +
+                    'greater than register count ({:.2f})'.format(count))
+            self._journal(cursor, 'adjustment', employee_name, amount,
+                          count + amount)
+        return count + amount
+
+    def record_count(self, employee_name, count):
+        """Records an employee's count of the register.
+
+        Parameters
+        ----------
+        employee_name : :class:`str`
+            Name of the employee counting the register.
+        count : :class:`float`
+            Employee register count.
+
+        """
+        with self.transaction() as cursor:
+            self._journal(cursor, 'count', employee_name, count,
+                          self._balance(cursor))
+
+    def set_register_count(self, register_count):
+        """Overwrites the register count."""
+        with self.transaction() as cursor:
+            self._journal(cursor, 'set', None, register_count, register_count)
+
+    def sales_by_item(self, start, end):
+        """Returns the quantity sold and revenue of each item over a period.
+
+        Parameters
+        ----------
+        start : :class:`float`
+            Start of the period, as a UNIX timestamp.
+        end : :class:`float`
+            End of the period (excluded), as a UNIX timestamp.
+
+        """
+        return self.connection.execute(
+            'SELECT l.barcode, l.name, SUM(l.quantity), '
+            'SUM(l.quantity * l.price) '
+            'FROM transactions t '
+            'JOIN transaction_lines l ON l.transaction_id = t.id '
+            'WHERE t.timestamp >= ? AND t.timestamp < ? '
+            'GROUP BY l.barcode, l.name ORDER BY l.barcode',
+            (start, end)).fetchall()
+
+    def sales_by_employee(self, start, end):
+        """Returns the transaction count and revenue of each employee.
+
+        Parameters
+        ----------
+        start : :class:`float`
+            Start of the period, as a UNIX timestamp.
+        end : :class:`float`
+            End of the period (excluded), as a UNIX timestamp.
+
+        """
+        return self.connection.execute(
+            'SELECT employee, COUNT(*), SUM(total) FROM transactions '
+            'WHERE timestamp >= ? AND timestamp < ? '
+            'GROUP BY employee ORDER BY employee', (start, end)).fetchall()
+
+    @staticmethod
+    def _balance(cursor):
+        """Returns the last register count of the journal."""
+        row = cursor.execute(
+            'SELECT balance FROM count_journal ORDER BY id DESC LIMIT 1'
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    @staticmethod
+    def _journal(cursor, kind, employee_name, amount, balance):
+        """Appends an entry to the count journal."""
+        cursor.execute(
+            'INSERT INTO count_journal '
+            '(timestamp, kind, employee, amount, balance) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (time.time(), kind, employee_name, amount, balance))
+
+
+class SQLiteRegister(Register):
+    """Register storing its state in a SQLite database.
+
+    The menu, employees and register count are read from the database
+    instead of files, and a checkout records the transaction and updates the
+    register count in a single atomic transaction. Logs are still written
+    to ``log_path``.
+
+    Parameters
+    ----------
+    database_file_path : :class:`str`
+        Path to the database file, e.g. created with
+        :meth:`Database.import_files`.
+    log_path : :class:`str`
+        Where to save logs.
+
+    Other keyword arguments are passed to :class:`Register`.
+
+    """
+    def __init__(self, database_file_path, log_path, **kwargs):
+        validate_file_path(database_file_path, 'database')
+        self.database = Database(database_file_path)
+        super(SQLiteRegister, self).__init__(
+            database_file_path, database_file_path, database_file_path,
+            log_path, **kwargs)
+
+    def checkout_order(self):
+        """Records the transaction and adds order total to register count."""
+        self._authorize('checkout_order')
+        catalog = self.catalog
+        lines = [(catalog.names[item_id], catalog.barcodes[item_id],
+                  catalog.prices[item_id], quantity)
+                 for item_id, quantity in self.order_dict.items()]
+        # Discounts are recorded as negative lines without a barcode
+        lines.extend((rule.name, '', -discount, 1)
+                     for rule, _, discount in self.pricing.discounts())
+        self._mark_checkout()
+        self._register_count = self.database.record_checkout(
+            self.employee_name, lines, self.order_total)
+        self._log_order()
+        self._publish_checkout()
+        self._update_inventory()
+        self.clear_order()
+
+    def close(self):
+        """Releases the register's files, handlers and database."""
+        super(SQLiteRegister, self).close()
+        self.database.close()
+
+    def _load_menu(self, file_path):
+        """Loads and returns the menu from the database."""
+        self.menu_errors = []
+        # In lazy mode this runs on the loading thread, which cannot share
+        # the register's connection
+        database = Database(self.database.file_path)
+        try:
+            return database.catalog()
+        finally:
+            database.close()
+
+    def _load_employees(self, file_path):
+        """Loads and returns the employees list from the database."""
+        return self.database.employees()
+
+    def _open_register_count(self, file_path):
+        """Returns the register count read from the database.
+
+        The database is shared between processes, so the count is only
+        cached in memory.
+
+        """
+        return Count(self.database.register_count())
+
+    def _adjust_register_count(self, amount):
+        """Adjusts the register count.
+
+        Parameters
+        ----------
+        amount : number
+            Adjustment amount.
+
+        """
+        old_register_count = self._register_count
+        self._register_count = self.database.record_adjustment(
+            self.employee_name, amount)
+        self._log_adjustment(old_register_count, amount)
+
+    def _log_count(self, count):
+        """Logs and records a register count."""
+        super(SQLiteRegister, self)._log_count(count)
+        self.database.record_count(self.employee_name, count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="import menu, employees and register count files into " +
+                    "a register database")
+    parser.add_argument("-m", "--menu_path", help="path to the menu file",
+                        type=str, default="sample_menu.txt")
+    parser.add_argument("-e", "--employees_path", help="path to the " +
+                        "employees file", type=str,
+                        default="sample_employees.txt")
+    parser.add_argument("-r", "--register_count_path", help="path to the " +
+                        "register count file", type=str, default=None)
+    parser.add_argument("-d", "--database_path", help="path to the " +
+                        "database file", type=str, default="register.db")
+    args = parser.parse_args()
+
+    register_count = None
+    if args.register_count_path is not None:
+        register_count = load_register_count(args.register_count_path)
+
+    database = Database(args.database_path)
+    if database.import_files(args.menu_path, args.employees_path,
+                             register_count):
+        print("Some lines of the input files contained errors and were " +
+              "ignored")
+    database.close()
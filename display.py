@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""Customer-facing display of the current order."""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+from collections import OrderedDict
+
+from .events import ItemAdded, ItemRemoved, OrderCheckedOut, OrderCleared
+
+
+class DisplayServer(object):
+    """Streams changes to a register's order to customer displays.
+
+    Displays connect to a Unix socket and receive newline-delimited JSON
+    messages:
+
+    * ``["snapshot", [[key, name, quantity, price], ...], total]``, the
+      whole order, sent first;
+    * ``["set", key, name, quantity, price]``, a line added or changed;
+    * ``["del", key]``, a line removed;
+    * ``["total", total]``, the order total after a change;
+    * ``["checkout", total]``, the order being paid;
+    * ``["clear"]``, the order being emptied.
+
+    Lines are keyed by item id, as custom items may share a barcode.
+    Messages are computed on the thread changing the order and written by
+    one thread per display, which sends all pending messages at once, so a
+    burst of scans costs one write. A display falling more than
+    ``max_pending`` messages behind is sent a new snapshot instead.
+
+    Parameters
+    ----------
+    register : :class:`Register`
+        Register whose order is displayed.
+    socket_path : :class:`str`
+        Path of the Unix socket to listen on. An existing file at that path
+        is replaced.
+    max_pending : :class:`int`, optional
+        Largest number of messages queued for a display. Defaults to 256.
+
+    """
+    def __init__(self, register, socket_path, max_pending=256):
+        self.register = register
+        self.socket_path = socket_path
+        self.max_pending = max_pending
+        self.lines = OrderedDict()
+        self.total = 0.0
+        self._lock = threading.Lock()
+        self._connections = []
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(socket_path)
+        self._socket.listen(4)
+        self._closed = False
+        self._acceptor = threading.Thread(target=self._accept,
+                                          name='pyplanck-display-acceptor')
+        self._acceptor.daemon = True
+        self._acceptor.start()
+        self._subscription = register.events.subscribe(
+            self.record_event,
+            event_types=[ItemAdded, ItemRemoved, OrderCheckedOut,
+                         OrderCleared])
+
+    @property
+    def display_count(self):
+        """Number of connected displays."""
+        with self._lock:
+            return len(self._connections)
+
+    def record_event(self, event):
+        """Turns an order event into messages for the displays.
+
+        Meant to be subscribed to a register's :class:`EventBus`.
+
+        """
+        with self._lock:
+            if isinstance(event, (ItemAdded, ItemRemoved)):
+                item = event.item
+                if event.quantity:
+                    self.lines[event.item_id] = [item.name, event.quantity,
+                                                 item.price]
+                    message = ['set', event.item_id, item.name,
+                               event.quantity, item.price]
+                else:
+                    self.lines.pop(event.item_id, None)
+                    message = ['del', event.item_id]
+                self.total = self.register.order_total
+                messages = [message, ['total', self.total]]
+            elif isinstance(event, OrderCheckedOut):
+                messages = [['checkout', event.total]]
+            else:
+                self.lines.clear()
+                self.total = 0.0
+                messages = [['clear']]
+            for connection in self._connections:
+                connection.send(messages, self._snapshot)
+
+    def reset(self, order_dict, catalog, total):
+        """Replaces the displayed order, e.g. with a resumed order.
+
+        Parameters
+        ----------
+        order_dict : :class:`OrderedDict`
+            Mapping from item id to quantity.
+        catalog : :class:`Catalog`
+            Catalog the item ids refer to.
+        total : :class:`float`
+            Order total.
+
+        """
+        names = catalog.names
+        prices = catalog.prices
+        with self._lock:
+            self.lines = OrderedDict(
+                (item_id, [names[item_id], quantity, prices[item_id]])
+                for item_id, quantity in order_dict.items())
+            self.total = total
+            snapshot = self._snapshot()
+            for connection in self._connections:
+                connection.send_snapshot(snapshot)
+
+    def close(self):
+        """Stops streaming and disconnects the displays."""
+        self.register.events.unsubscribe(self._subscription)
+        self._closed = True
+        # Wake up the acceptor
+        try:
+            waker = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            waker.connect(self.socket_path)
+            waker.close()
+        except socket.error:
+            pass
+        self._acceptor.join()
+        self._socket.close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _snapshot(self):
+        """Returns a snapshot message of the order; the lock must be held."""
+        return ['snapshot', [[key] + line for key, line in self.lines.items()],
+                self.total]
+
+    def _accept(self):
+        """Accepts displays until closed."""
+        while True:
+            try:
+                sock, _ = self._socket.accept()
+            except socket.error:
+                return
+            if self._closed:
+                sock.close()
+                return
+            with self._lock:
+                self._connections = [connection for connection
+                                     in self._connections
+                                     if not connection.closed]
+                self._connections.append(
+                    _Connection(sock, self._snapshot(), self.max_pending))
+
+
+class _Connection(object):
+    """Display connected to a :class:`DisplayServer`."""
+    def __init__(self, sock, snapshot, max_pending):
+        self.sock = sock
+        self.max_pending = max_pending
+        self.closed = False
+        self._pending = [snapshot]
+        self._condition = threading.Condition()
+        self._writer = threading.Thread(target=self._write,
+                                        name='pyplanck-display-writer')
+        self._writer.daemon = True
+        self._writer.start()
+
+    def send(self, messages, snapshot):
+        """Queues messages, or a snapshot if too many are pending."""
+        with self._condition:
+            if len(self._pending) + len(messages) > self.max_pending:
+                self._pending = [snapshot()]
+            else:
+                self._pending.extend(messages)
+            self._condition.notify()
+
+    def send_snapshot(self, snapshot):
+        """Replaces the pending messages with a snapshot."""
+        with self._condition:
+            self._pending = [snapshot]
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+        self._writer.join()
+
+    def _write(self):
+        """Sends pending messages until closed or disconnected."""
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self.closed:
+                        self._condition.wait()
+                    if self.closed:
+                        return
+                    pending, self._pending = self._pending, []
+                data = ''.join(json.dumps(message) + '\n'
+                               for message in pending)
+                self.sock.sendall(data.encode('utf-8'))
+        except socket.error:
+            # The display reconnects and gets a new snapshot
+            pass
+        finally:
+            self.closed = True
+            self.sock.close()
+
+
+class DisplayClient(object):
+    """Mirror of a register's order, kept up to date by a
+    :class:`DisplayServer`.
+
+    Parameters
+    ----------
+    socket_path : :class:`str`
+        Path of the server's Unix socket.
+    on_change : callable, optional
+        Called without arguments after each batch of messages. Defaults to
+        ``None``.
+
+    Attributes
+    ----------
+    lines : :class:`OrderedDict`
+        Item id to ``[name, quantity, price]`` mapping of the order's lines.
+    total : :class:`float`
+        Order total.
+    paid : :class:`float`
+        Total of the order just checked out, ``None`` once a new order
+        starts.
+
+    """
+    def __init__(self, socket_path, on_change=None):
+        self.socket_path = socket_path
+        self.on_change = on_change
+        self.lines = OrderedDict()
+        self.total = 0.0
+        self.paid = None
+        self._sock = None
+        self._buffer = b''
+
+    def connect(self):
+        """Connects to the server, which then sends a snapshot."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        self._sock = sock
+        self._buffer = b''
+
+    def receive(self):
+        """Applies the messages received in one read.
+
+        Raises
+        ------
+        IOError
+            If the connection is lost.
+
+        """
+        try:
+            data = self._sock.recv(65536)
+        except socket.error as e:
+            raise IOError(str(e))
+        if not data:
+            raise IOError('display server closed the connection')
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        for line in lines:
+            self.apply(json.loads(line.decode('utf-8')))
+        if lines and self.on_change is not None:
+            self.on_change()
+
+    def apply(self, message):
+        """Applies a message to the mirrored order."""
+        kind = message[0]
+        if kind == 'snapshot':
+            self.lines = OrderedDict((line[0], line[1:])
+                                     for line in message[1])
+            self.total = message[2]
+        elif kind == 'set':
+            self.lines[message[1]] = message[2:]
+            self.paid = None
+        elif kind == 'del':
+            self.lines.pop(message[1], None)
+        elif kind == 'total':
+            self.total = message[1]
+        elif kind == 'checkout':
+            self.paid = message[1]
+        elif kind == 'clear':
+            self.lines.clear()
+            self.total = 0.0
+
+    def run(self, stop=None, retry_interval=1.0):
+        """Mirrors the order until ``stop`` is set, reconnecting as needed.
+
+        Parameters
+        ----------
+        stop : :class:`threading.Event`, optional
+            Event stopping the loop once set, checked between reads.
+            Defaults to ``None``, meaning the loop never stops.
+        retry_interval : :class:`float`, optional
+            Seconds between reconnection attempts. Defaults to 1.
+
+        """
+        if stop is None:
+            stop = threading.Event()
+        while not stop.is_set():
+            try:
+                if self._sock is None:
+                    self.connect()
+                self.receive()
+            except (IOError, socket.error):
+                self.close()
+                stop.wait(retry_interval)
+        self.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def to_string(self):
+        """Returns a printable version of the mirrored order."""
+        lines = ['{} x {}  {:.2f}$'.format(name, quantity, price * quantity)
+                 for name, quantity, price in self.lines.values()]
+        lines.append('Total: {:.2f}$'.format(self.total))
+        if self.paid is not None:
+            lines.append('Paid: {:.2f}$ - Thank you!'.format(self.paid))
+        return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="show the order of a register to the customer")
+    parser.add_argument("socket_path", help="path to the register's " +
+                        "display socket", type=str)
+    args = parser.parse_args()
+
+    def redraw():
+        # Clear the terminal before drawing the order
+        sys.stdout.write('\x1b[2J\x1b[H' + client.to_string() + '\n')
+        sys.stdout.flush()
+
+    client = DisplayClient(args.socket_path, on_change=redraw)
+    try:
+        client.run()
+    except KeyboardInterrupt:
+        client.close()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""In-process event bus."""
+import threading
+from collections import namedtuple
+
+from six.moves import queue
+
+ItemAdded = namedtuple('ItemAdded', 'time employee item quantity item_id')
+ItemRemoved = namedtuple('ItemRemoved',
+                         'time employee item quantity item_id')
+OrderCleared = namedtuple('OrderCleared', 'time employee')
+OrderCheckedOut = namedtuple('OrderCheckedOut', 'time employee order total')
+EmployeeLoggedIn = namedtuple('EmployeeLoggedIn', 'time employee')
+EmployeeLoggedOut = namedtuple('EmployeeLoggedOut', 'time employee')
+RegisterCounted = namedtuple('RegisterCounted',
+                             'time employee count register_count')
+RegisterAdjusted = namedtuple('RegisterAdjusted',
+                              'time employee amount register_count')
+StockOversold = namedtuple('StockOversold', 'time employee item level')
+
+EVENT_TYPES = (ItemAdded, ItemRemoved, OrderCleared, OrderCheckedOut,
+               EmployeeLoggedIn, EmployeeLoggedOut, RegisterCounted,
+               RegisterAdjusted, StockOversold)
+
+# What an asynchronous subscriber's full queue does with a new event
+POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+_STOP = object()
+
+
+class Subscription(object):
+    """Subscriber of an :class:`EventBus`.
+
+    Attributes
+    ----------
+    dropped : :class:`int`
+        Number of events dropped because the subscriber's queue was full.
+
+    """
+    def __init__(self, callback, event_types, asynchronous, max_queue_size,
+                 policy, logger):
+        if policy not in POLICIES:
+            raise ValueError("unknown queue policy '{}'".format(policy))
+        self.callback = callback
+        self.event_types = event_types
+        self.policy = policy
+        self.dropped = 0
+        self._logger = logger
+        self._queue = None
+        self._worker = None
+        if asynchronous:
+            self._queue = queue.Queue(max_queue_size)
+            self._worker = threading.Thread(target=self._work,
+                                            name='pyplanck-event-subscriber')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def deliver(self, event):
+        """Calls the subscriber or queues the event for its worker."""
+        if self._queue is None:
+            self._call(event)
+        elif self.policy == 'block':
+            self._queue.put(event)
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(event)
+                    return
+                except queue.Full:
+                    if self.policy == 'drop_newest':
+                        self.dropped += 1
+                        return
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def join(self):
+        """Blocks until all queued events are processed."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Processes the queued events and stops the worker."""
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            self._worker.join()
+            self._worker = None
+
+    def _call(self, event):
+        """Calls the subscriber, which must not break the publisher."""
+        try:
+            self.callback(event)
+        except Exception:
+            if self._logger is not None:
+                self._logger.exception(
+                    'event subscriber failed on {}'.format(
+                        type(event).__name__))
+
+    def _work(self):
+        """Calls the subscriber on queued events."""
+        while True:
+            event = self._queue.get()
+            try:
+                if event is _STOP:
+                    return
+                self._call(event)
+            finally:
+                self._queue.task_done()
+
+
+class EventBus(object):
+    """Dispatches events to subscribers within a process.
+
+    Synchronous subscribers are called by the publishing thread. Each
+    asynchronous subscriber is called by its own worker thread, through a
+    bounded queue whose policy decides what happens when it is full:
+    ``'block'`` makes the publisher wait, ``'drop_newest'`` drops the new
+    event and ``'drop_oldest'`` drops the oldest queued event.
+
+    Publishing an event no one subscribed to only costs a dictionary
+    lookup.
+
+    Parameters
+    ----------
+    logger : :class:`logging.Logger`, optional
+        Logger to which failing subscribers are reported. Defaults to
+        ``None``, meaning failures are silently ignored.
+
+    """
+    def __init__(self, logger=None):
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._subscriptions = []
+        # Subscriptions of each event type, replaced rather than mutated so
+        # that publishing needs no lock
+        self._dispatch = {}
+
+    def subscribe(self, callback, event_types=None, asynchronous=False,
+                  max_queue_size=1000, policy='block'):
+        """Subscribes a callback to events.
+
+        Parameters
+        ----------
+        callback : callable
+            Called with each event.
+        event_types : :class:`list`, optional
+            Event types to receive. Defaults to ``None``, meaning all types
+            defined in this module.
+        asynchronous : :class:`bool`, optional
+            Whether to call ``callback`` on a worker thread. Defaults to
+            ``False``.
+        max_queue_size : :class:`int`, optional
+            Capacity of an asynchronous subscriber's queue. Defaults to
+            1000.
+        policy : :class:`str`, optional
+            What to do when an asynchronous subscriber's queue is full, one
+            of :data:`POLICIES`. Defaults to ``'block'``.
+
+        Returns
+        -------
+        subscription : :class:`Subscription`
+
+        """
+        if event_types is None:
+            event_types = EVENT_TYPES
+        subscription = Subscription(callback, tuple(event_types),
+                                    asynchronous, max_queue_size, policy,
+                                    self.logger)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._rebuild()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stops delivering events to a subscriber."""
+        with self._lock:
+            self._subscriptions.remove(subscription)
+            self._rebuild()
+        subscription.close()
+
+    def wants(self, event_type):
+        """Returns whether any subscriber receives an event type."""
+        return event_type in self._dispatch
+
+    def publish(self, event):
+        """Delivers an event to its subscribers."""
+        for subscription in self._dispatch.get(type(event), ()):
+            subscription.deliver(event)
+
+    def join(self):
+        """Blocks until asynchronous subscribers processed all events."""
+        for subscription in list(self._subscriptions):
+            subscription.join()
+
+    def close(self):
+        """Unsubscribes everyone after processing the queued events."""
+        for subscription in list(self._subscriptions):
+            self.unsubscribe(subscription)
+
+    def _rebuild(self):
+        """Rebuilds the subscriptions of each event type."""
+        dispatch = {}
+        for subscription in self._subscriptions:
+            for event_type in subscription.event_types:
+                dispatch.setdefault(event_type, []).append(subscription)
+        self._dispatch = dict((event_type, tuple(subscriptions))
+                              for event_type, subscriptions
+                              in dispatch.items())
+
@@ -13,20 +13,26 @@ import argparse
 from Tkinter import Tk, N, S, E, W, StringVar, Listbox
 from tkSimpleDialog import askstring, askfloat
 from ttk import Frame, Button, Entry, Label
+from pyplanck.dashboard import summaries_to_string
 from pyplanck.register import Register
+from pyplanck.scanner import BarcodeScanner
 from pyplanck.exceptions import CredentialException, ItemNotFoundException
 
 
 class GUI(Frame):
-    def __init__(self, parent, register):
+    def __init__(self, parent, register, scanner=None):
         Frame.__init__(self, parent, padding=(3, 3, 3, 3))
         self.parent = parent
         self.register = register
+        self.scanner = scanner
         self.logger = register.get_events_logger()
         self.init_ui()
 
         self.login()
         self.update_order()
+        if self.scanner is not None:
+            self.poll_scanner()
+        self.update_dashboard()
 
     def login(self):
         logged_in = False
@@ -189,6 +195,25 @@ class GUI(Frame):
         # Put focus in barcode field
         self.barcode_field.focus()
 
+    def poll_scanner(self):
+        # Scans are read on the scanner's thread and added in batches here,
+        # between UI events
+        if not self.scanner.codes.empty():
+            for code, error in self.scanner.feed(self.register):
+                self.logger.warning("unable to add scanned code '" + code +
+                                    "': " + str(error))
+            self.update_order()
+        self.after(50, self.poll_scanner)
+
+    def update_dashboard(self):
+        # Totals are kept in memory by the register, so refreshing is cheap
+        try:
+            self.dashboard_var.set(
+                summaries_to_string(self.register.sales_dashboard()))
+        except CredentialException:
+            self.dashboard_var.set("")
+        self.after(5000, self.update_dashboard)
+
     def update_order(self):
         self.items_var.set(tuple(
             item.get_name() + " x " + str(quantity) for
@@ -257,6 +282,12 @@ class GUI(Frame):
         self.custom_item_button.grid(row=4, column=1, columnspan=2,
                                      sticky=(E, W))
 
+        self.dashboard_var = StringVar(self)
+        self.dashboard_label = Label(self, textvar=self.dashboard_var,
+                                     justify="left")
+        self.dashboard_label.grid(row=5, column=1, columnspan=2,
+                                  rowspan=2, sticky=(N, E, W))
+
         self.total_var = StringVar(self, value="Total: 0.00$")
         self.total_label = Label(self, textvar=self.total_var)
         self.total_label.grid(row=7, column=1, columnspan=2, sticky=(S, E, W))
@@ -284,18 +315,79 @@ if __name__ == "__main__":
     parser.add_argument("-l", "--log_path", help="path to the " +
                         "directory of log files", type=str,
                         default="./")
+    parser.add_argument("-o", "--order_log_path", help="path to the " +
+                        "write-ahead log of the current order, used to " +
+                        "restore it after a crash", type=str, default=None)
+    parser.add_argument("-b", "--log_backup_count", help="number of " +
+                        "rotated files to keep for each log, 0 to keep " +
+                        "them all", type=int, default=0)
+    parser.add_argument("-z", "--compress_logs", help="gzip rotated log " +
+                        "files", action="store_true")
+    parser.add_argument("-p", "--policy_path", help="path to the " +
+                        "permission policy file", type=str, default=None)
+    parser.add_argument("-L", "--lazy", help="start right away and load " +
+                        "the menu in the background", action="store_true")
+    parser.add_argument("-d", "--pricing_path", help="path to the " +
+                        "pricing rules file", type=str, default=None)
+    parser.add_argument("-i", "--inventory_path", help="path to the " +
+                        "stock levels file", type=str, default=None)
+    parser.add_argument("-s", "--scanner_path", help="path to a " +
+                        "barcode scanner device", type=str, default=None)
+    parser.add_argument("-P", "--menu_profile", help="menu profile the " +
+                        "register can switch to, as NAME=PATH; can be " +
+                        "repeated", action="append", default=[])
+    parser.add_argument("-S", "--menu_schedule_path", help="path to the " +
+                        "menu profile schedule file", type=str, default=None)
+    parser.add_argument("-k", "--log_key_path", help="path to the key " +
+                        "signing the hash-chained transaction and count " +
+                        "logs", type=str, default=None)
+    parser.add_argument("-D", "--display_socket_path", help="path of the " +
+                        "socket serving the order to customer displays",
+                        type=str, default=None)
+    parser.add_argument("-C", "--catalog_versions_path", help="path to " +
+                        "the catalog versions database", type=str,
+                        default=None)
+    parser.add_argument("-A", "--archive_path", help="path to the " +
+                        "directory archiving rotated transaction logs",
+                        type=str, default=None)
+    parser.add_argument("-R", "--receipt_printer_path", help="path to an " +
+                        "ESC/POS receipt printer", type=str, default=None)
     args = parser.parse_args()
 
     menu_path = args.menu_path
     employees_path = args.employees_path
     register_count_path = args.register_count_path
     log_path = args.log_path
+    menu_profiles = dict(profile.split("=", 1)
+                         for profile in args.menu_profile)
 
     register = Register(menu_file_path=menu_path,
                         employees_file_path=employees_path,
                         register_count_file_path=register_count_path,
-                        log_path=log_path)
+                        log_path=log_path,
+                        order_log_file_path=args.order_log_path,
+                        log_backup_count=args.log_backup_count,
+                        compress_logs=args.compress_logs,
+                        policy_file_path=args.policy_path,
+                        lazy=args.lazy,
+                        pricing_file_path=args.pricing_path,
+                        inventory_file_path=args.inventory_path,
+                        menu_profiles=menu_profiles,
+                        menu_schedule_file_path=args.menu_schedule_path,
+                        log_key_file_path=args.log_key_path,
+                        display_socket_path=args.display_socket_path,
+                        catalog_versions_file_path=args.catalog_versions_path,
+                        archive_path=args.archive_path,
+                        receipt_printer_path=args.receipt_printer_path)
+
+    scanner = None
+    if args.scanner_path is not None:
+        scanner = BarcodeScanner(args.scanner_path)
+        scanner.start()
 
     root = Tk()
-    gui = GUI(root, register)
+    gui = GUI(root, register, scanner)
     root.mainloop()
+    if scanner is not None:
+        scanner.close()
+    register.close()
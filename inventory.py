@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Stock levels of menu items."""
+import heapq
+import io
+import os
+import threading
+import time
+
+
+def load_stock(file_path):
+    """Loads stock quantities from a file.
+
+    Each line of the file is ``barcode|quantity``, where ``quantity`` is an
+    integer.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the stock file.
+
+    Returns
+    -------
+    quantities : :class:`dict`
+        Barcode to quantity mapping. A barcode listed several times has the
+        sum of its quantities.
+
+    Raises
+    ------
+    ValueError
+        If a line of the file is invalid.
+
+    """
+    quantities = {}
+    with io.open(file_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line == '':
+                continue
+            tokens = [token.strip() for token in line.split('|')]
+            try:
+                if len(tokens) != 2 or not tokens[0]:
+                    raise ValueError('expected 2 fields')
+                barcode, quantity = tokens[0], int(tokens[1])
+            except ValueError as e:
+                raise ValueError('invalid stock line {}: {}'.format(
+                    line_number, e))
+            quantities[barcode] = quantities.get(barcode, 0) + quantity
+    return quantities
+
+
+class Inventory(object):
+    """Stock levels of menu items, by barcode.
+
+    Only items listed in the stock file are tracked. Changes are kept in
+    memory and the stock file is rewritten once ``batch_size`` changes are
+    pending or ``flush_interval`` seconds after the first pending change,
+    whichever comes first, as well as on :meth:`flush`.
+
+    Low stock is found through a heap of ``(level, barcode)`` entries.
+    Changing a level pushes a new entry and leaves the old one in the heap,
+    where it is recognized as stale and discarded when it is reached.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the stock file, see :func:`load_stock`. It is created when
+        first flushed if it does not exist.
+    batch_size : :class:`int`, optional
+        Number of pending changes triggering a flush. Defaults to 100.
+    flush_interval : :class:`float`, optional
+        Longest time in seconds a change stays pending, as checked when
+        levels change. Defaults to 60.
+
+    """
+    def __init__(self, file_path, batch_size=100, flush_interval=60.0):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.levels = {}
+        if os.path.isfile(file_path):
+            self.levels = load_stock(file_path)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._first_pending_time = None
+        self._heap = [(level, barcode)
+                      for barcode, level in self.levels.items()]
+        heapq.heapify(self._heap)
+
+    def __contains__(self, barcode):
+        return barcode in self.levels
+
+    def __len__(self):
+        return len(self.levels)
+
+    def level(self, barcode):
+        """Returns the stock level of an item, ``None`` if not tracked."""
+        return self.levels.get(barcode)
+
+    def remove(self, barcode, quantity):
+        """Removes units of an item from stock and returns its new level.
+
+        Untracked items are ignored and ``None`` is returned. The level may
+        go negative, meaning the item was oversold.
+
+        """
+        with self._lock:
+            if barcode not in self.levels:
+                return None
+            level = self._set_level(barcode, self.levels[barcode] - quantity)
+        self._maybe_flush()
+        return level
+
+    def restock(self, quantities):
+        """Adds units of items to stock, starting to track new items.
+
+        Parameters
+        ----------
+        quantities : :class:`dict`
+            Barcode to quantity mapping, e.g. from :func:`load_stock`.
+
+        """
+        with self._lock:
+            for barcode, quantity in quantities.items():
+                self._set_level(barcode,
+                                self.levels.get(barcode, 0) + quantity)
+        self._maybe_flush()
+
+    def restock_from_file(self, file_path):
+        """Adds the units listed in a stock file to stock.
+
+        The file is fully parsed before any level changes.
+
+        """
+        self.restock(load_stock(file_path))
+
+    def low_stock(self, threshold):
+        """Returns the items whose level is at most a threshold.
+
+        Parameters
+        ----------
+        threshold : :class:`int`
+            Highest level considered low.
+
+        Returns
+        -------
+        low : :class:`list`
+            ``(level, barcode)`` tuples, from the lowest level.
+
+        """
+        with self._lock:
+            low = []
+            while self._heap and self._heap[0][0] <= threshold:
+                level, barcode = heapq.heappop(self._heap)
+                # Only the entry of the current level is kept
+                if self.levels.get(barcode) == level and (
+                        not low or low[-1] != (level, barcode)):
+                    low.append((level, barcode))
+            for entry in low:
+                heapq.heappush(self._heap, entry)
+            return low
+
+    def flush(self):
+        """Writes pending changes to the stock file."""
+        with self._lock:
+            if self._pending == 0:
+                return
+            levels = sorted(self.levels.items())
+            self._pending = 0
+            self._first_pending_time = None
+        tmp_path = self.file_path + '.tmp'
+        with io.open(tmp_path, 'w', encoding='utf-8') as f:
+            for barcode, level in levels:
+                f.write(u'{}|{}\n'.format(barcode, level))
+        # Readers never see a partially written file
+        os.rename(tmp_path, self.file_path)
+
+    def _set_level(self, barcode, level):
+        """Records a new level; the lock must be held."""
+        self.levels[barcode] = level
+        heapq.heappush(self._heap, (level, barcode))
+        # Drop stale entries once they outnumber the current ones
+        if len(self._heap) > 2 * len(self.levels) + 64:
+            self._heap = [(current_level, current_barcode)
+                          for current_barcode, current_level
+                          in self.levels.items()]
+            heapq.heapify(self._heap)
+        self._pending += 1
+        if self._first_pending_time is None:
+            self._first_pending_time = time.time()
+        return level
+
+    def _maybe_flush(self):
+        """Flushes if enough changes are pending or they are old enough."""
+        first_pending_time = self._first_pending_time
+        if self._pending >= self.batch_size or (
+                first_pending_time is not None and
+                time.time() - first_pending_time >= self.flush_interval):
+            self.flush()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Functions loading register data from files."""
+import io
+import struct
+from collections import namedtuple
+
+from .catalog import Catalog
+from .immutables import Employee, validate_employee, validate_item
+
+
+MenuError = namedtuple('MenuError', 'line_number line reason')
+
+
+def load_menu(file_path, processes=None, chunk_size=50000):
+    """Loads the menu.
+
+    Large menu files are split into chunks of lines which are parsed and
+    validated in a process pool, then merged in file order, so item ids do
+    not depend on the number of processes.
+
+    Returns a tuple made of the menu :class:`Catalog` and the list of
+    :class:`MenuError` describing the lines that contained errors and were
+    ignored.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the menu file.
+    processes : :class:`int`, optional
+        Number of worker processes. Defaults to ``None``, meaning the number
+        of CPUs.
+    chunk_size : :class:`int`, optional
+        Number of lines parsed per task. Files with fewer lines are parsed
+        in the current process. Defaults to 50000.
+
+    """
+    with io.open(file_path, encoding='utf-8') as f:
+        # Read all lines in the file
+        lines = f.readlines()
+
+    # Every chunk starts with the category in effect at its first line,
+    # which is found by replaying the category commands of earlier chunks.
+    chunks = []
+    current_category = 'General'
+    current_default_price = None
+    for start in range(0, len(lines), chunk_size):
+        chunk = lines[start:start + chunk_size]
+        chunks.append((chunk, start + 1, current_category,
+                       current_default_price))
+        for line in chunk:
+            if not line.lstrip().startswith('#'):
+                continue
+            item = [token.strip() for token in line.strip().split('|')]
+            current_category, current_default_price, _ = _parse_category(
+                item, current_category, current_default_price)
+
+    if len(chunks) > 1 and processes != 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_parse_menu_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_parse_menu_chunk(chunk) for chunk in chunks]
+
+    menu = Catalog()
+    errors = []
+    for rows, chunk_errors in results:
+        errors.extend(chunk_errors)
+        for row in rows:
+            # Lines repeating an item already in the menu are skipped
+            barcode = row[2]
+            if barcode in menu and menu.item(menu.find(barcode)) == row:
+                continue
+            menu.add(*row)
+
+    return menu, errors
+
+
+def _parse_category(item, current_category, current_default_price):
+    """Applies a category command to the current category.
+
+    Returns the new category, the new default price and the reason why the
+    command is invalid, or ``None``.
+
+    """
+    # Category commands must have the same number of tokens as items
+    if not len(item) in (2, 3, 4):
+        return current_category, current_default_price, None
+    current_category = item[0][1:].strip()
+    try:
+        current_default_price = float(item[1])
+    except ValueError:
+        return (current_category, current_default_price,
+                'invalid category default price')
+    return current_category, current_default_price, None
+
+
+def _parse_menu_chunk(args):
+    """Parses and validates a chunk of menu lines.
+
+    Returns a tuple made of the list of valid ``(name, price, barcode,
+    category, shortcut)`` rows and the list of :class:`MenuError`.
+
+    Parameters
+    ----------
+    args : :class:`tuple`
+        Lines of the chunk, line number of its first line, and category and
+        default price in effect before its first line.
+
+    """
+    lines, first_line_number, current_category, current_default_price = args
+    rows = []
+    errors = []
+
+    # Loop over lines and try to parse them as items. If errors occur,
+    # faulty lines are reported and ignored.
+    for line_number, line in enumerate(lines, first_line_number):
+        # Strip the line from trailing white space and carriage returns
+        line = line.strip()
+        # Skip empty lines
+        if line == '':
+            continue
+        # Split the line into tokens separated by '|' and strip all tokens
+        # from leading and trailing white space
+        item = [token.strip() for token in line.split('|')]
+        # Items must have at least two tokens (name and barcode) and at
+        # most four (name, barcode, price and shortcut)
+        if not len(item) in (2, 3, 4):
+            errors.append(MenuError(
+                line_number, line,
+                'expected 2 to 4 fields, got {}'.format(len(item))))
+            continue
+        # If '#' is the first character of the line, this is a category
+        # command to set a new category and a new default price.
+        if item[0].startswith('#'):
+            current_category, current_default_price, reason = \
+                _parse_category(item, current_category,
+                                current_default_price)
+            if reason is not None:
+                errors.append(MenuError(line_number, line, reason))
+            continue
+        # The third token is always considered as the custom price, and
+        # the fourth one is the shortcut. Items with a shortcut must
+        # therefore have a price set. Items without a custom price must
+        # belong to a category which sets a default price.
+        if len(item) == 2 and current_default_price is None:
+            errors.append(MenuError(
+                line_number, line,
+                'no price given and no category default price'))
+            continue
+        # Parse the actual item
+        barcode = item[0]
+        name = item[1]
+        category = current_category
+        if len(item) == 2:
+            price = current_default_price
+        else:
+            try:
+                price = float(item[2])
+            except ValueError:
+                errors.append(MenuError(line_number, line, 'invalid price'))
+                continue
+        shortcut = item[3] if len(item) == 4 else None
+        try:
+            validate_item(name, price, barcode, category, shortcut)
+        except ValueError as e:
+            errors.append(MenuError(line_number, line, str(e)))
+            continue
+        rows.append((name, price, barcode, category, shortcut))
+
+    return rows, errors
+
+
+def load_employees(file_path):
+    """Loads the employees list.
+
+    Returns a tuple made of the employees list and a flag telling whether
+    some lines of the file contained errors and were ignored.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the employees file.
+
+    """
+    employees_list = []
+
+    with io.open(file_path, encoding='utf-8') as f:
+        # Read all lines in the file
+        lines = f.readlines()
+        # Strip all lines from trailing white space and carriage returns
+        lines = [line.strip() for line in lines]
+        # Remove empty lines
+        lines = [line for line in lines if line != '']
+        # Split lines into lists of tokens separated by '|' (employees)
+        employees = [line.split('|') for line in lines]
+
+        # This flag tells whether the file contains errors
+        errors_detected = False
+
+        # Loop over employees and try to add them to the menu as Employee
+        # instances. If errors occur, faulty lines are ignored and the
+        # `errors_detected` flag is raised.
+        for employee in employees:
+            # Strip all tokens from leading and trailing white space
+            employee = [token.strip() for token in employee]
+            # Employees must have four tokens (name, barcode, permanent
+            # code and employee level)
+            if len(employee) != 4:
+                errors_detected = True
+                continue
+            else:
+                name = employee[0]
+                barcode = employee[1]
+                code = employee[2]
+                try:
+                    level = int(employee[3])
+                    validate_employee(name, barcode, code, level)
+                except ValueError:
+                    errors_detected = True
+                    continue
+            employees_list.append(Employee(name, barcode, code, level))
+
+    return list(set(employees_list)), errors_detected
+
+
+def load_register_count(file_path):
+    """Loads and returns the register count.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the register count file.
+
+    """
+    with io.open(file_path, 'rb') as f:
+        (register_count, ) = struct.unpack('d', f.read(8))
+    return register_count
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""Log rotation, compression and reading."""
+import gzip
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import namedtuple
+from logging.handlers import TimedRotatingFileHandler
+
+from six.moves import queue
+
+LogRecord = namedtuple('LogRecord', 'asctime message')
+
+# Lines starting a record begin with the default `asctime` format
+RECORD_START = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}')
+
+# Hash ending the first line of a record of a hash-chained log
+CHAIN_TAG = re.compile(r' #([0-9a-f]{64})$')
+
+# Suffixes added to rotated files by `TimedRotatingFileHandler`
+ROTATED_SUFFIX = re.compile(r'^\d{4}-\d{2}-\d{2}[\d_-]*(\.gz)?$')
+
+_tasks = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+class CompressingTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotating file handler which compresses and prunes rotated files.
+
+    Rotated files are gzipped and old ones are deleted by a background
+    thread, so that rotation does not delay the record that triggers it.
+    That thread then calls the handler's :attr:`rollover_callbacks` with the
+    path of the newest rotated file.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Path to the log file.
+    when : :class:`str`, optional
+        When to rotate, see :class:`TimedRotatingFileHandler`. Defaults to
+        ``'midnight'``.
+    backup_count : :class:`int`, optional
+        Number of rotated files to keep. Defaults to 0, meaning all rotated
+        files are kept.
+    compress : :class:`bool`, optional
+        Whether to gzip rotated files. Defaults to ``True``.
+    delay : :class:`bool`, optional
+        Whether to open the log file only when the first record is emitted.
+        Defaults to ``False``.
+
+    Attributes
+    ----------
+    rollover_callbacks : :class:`list`
+        Callables processing rotated files, e.g. archiving them. Their
+        exceptions are ignored.
+
+    """
+    def __init__(self, filename, when='midnight', backup_count=0,
+                 compress=True, delay=False):
+        # Rotated files are pruned by the background thread, which unlike
+        # the base class also recognizes compressed files.
+        TimedRotatingFileHandler.__init__(self, filename, when, delay=delay)
+        self.backup_count = backup_count
+        self.compress = compress
+        self.rollover_callbacks = []
+
+    def doRollover(self):
+        TimedRotatingFileHandler.doRollover(self)
+        if self.compress or self.backup_count > 0 or self.rollover_callbacks:
+            _submit((self.baseFilename, self.backup_count, self.compress,
+                     list(self.rollover_callbacks)))
+
+
+class LoggerManager(object):
+    """Shares log handlers between the loggers of a process.
+
+    A single handler is created for each log file, however many loggers
+    write to it, and is closed when the last logger using it is released.
+    Attaching a handler to a logger which already has it does not attach it
+    again, so records are never written twice.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Path -> [handler, number of loggers using it]
+        self._handlers = {}
+        # (logger name, path) -> number of acquisitions
+        self._attachments = {}
+
+    def acquire(self, name, file_path, log_format, backup_count=0,
+                compress=False, delay=False, key=None):
+        """Returns a logger writing to a file at the INFO level.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Logger name.
+        file_path : :class:`str`
+            Log file. If a handler already writes to it, that handler is
+            used and the other parameters are ignored.
+        log_format : :class:`str`
+            Logging format.
+        backup_count : :class:`int`, optional
+            Number of rotated files to keep. Defaults to 0, meaning all
+            rotated files are kept.
+        compress : :class:`bool`, optional
+            Whether to gzip rotated files. Defaults to ``False``.
+        delay : :class:`bool`, optional
+            Whether to open the log file only when the first record is
+            emitted. Defaults to ``False``.
+        key : :class:`bytes`, optional
+            Key signing the checkpoints of a hash-chained log, see
+            :class:`HashChainHandler`. Defaults to ``None``, meaning records
+            are not chained.
+
+        """
+        file_path = os.path.abspath(file_path)
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        with self._lock:
+            attachment = (name, file_path)
+            if attachment not in self._attachments:
+                if file_path not in self._handlers:
+                    if key is None:
+                        handler = CompressingTimedRotatingFileHandler(
+                            file_path, 'midnight', backup_count=backup_count,
+                            compress=compress, delay=delay)
+                    else:
+                        from .chain import HashChainHandler
+                        handler = HashChainHandler(
+                            file_path, key, 'midnight',
+                            backup_count=backup_count, compress=compress,
+                            delay=delay)
+                    handler.setLevel(logging.INFO)
+                    handler.setFormatter(logging.Formatter(log_format))
+                    self._handlers[file_path] = [handler, 0]
+                entry = self._handlers[file_path]
+                entry[1] += 1
+                logger.addHandler(entry[0])
+                self._attachments[attachment] = 0
+            self._attachments[attachment] += 1
+        return logger
+
+    def release(self, name, file_path):
+        """Releases a logger acquired with :meth:`acquire`.
+
+        Once released as many times as it was acquired, the logger stops
+        writing to the file, whose handler is closed if no other logger
+        uses it.
+
+        """
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            key = (name, file_path)
+            if key not in self._attachments:
+                return
+            self._attachments[key] -= 1
+            if self._attachments[key] > 0:
+                return
+            del self._attachments[key]
+            entry = self._handlers[file_path]
+            logging.getLogger(name).removeHandler(entry[0])
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._handlers[file_path]
+                entry[0].close()
+
+    def handler(self, file_path):
+        """Returns the handler writing to a file, ``None`` if none does."""
+        with self._lock:
+            entry = self._handlers.get(os.path.abspath(file_path))
+            return None if entry is None else entry[0]
+
+    def handler_count(self):
+        """Returns the number of open handlers."""
+        with self._lock:
+            return len(self._handlers)
+
+
+# Manager shared by the registers of the process
+logger_manager = LoggerManager()
+
+
+def rotated_log_files(file_path):
+    """Returns the rotated files of a log, from oldest to newest.
+
+    A file being compressed is only listed once.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the log file.
+
+    """
+    directory, prefix = os.path.split(os.path.abspath(file_path))
+    prefix += '.'
+    names = set(name for name in os.listdir(directory)
+                if name.startswith(prefix) and
+                ROTATED_SUFFIX.match(name[len(prefix):]))
+    # Skip compressed files whose uncompressed version still exists
+    names = [name for name in names
+             if not (name.endswith('.gz') and name[:-3] in names)]
+    return [os.path.join(directory, name)
+            for name in sorted(names, key=_strip_gz)]
+
+
+def log_files(file_path):
+    """Returns the rotated files of a log followed by the current file."""
+    files = rotated_log_files(file_path)
+    if os.path.isfile(file_path):
+        files.append(file_path)
+    return files
+
+
+def open_log(file_path):
+    """Opens a log file for reading, whether it is compressed or not."""
+    if file_path.endswith('.gz'):
+        return io.TextIOWrapper(io.BufferedReader(gzip.GzipFile(file_path)),
+                                encoding='utf-8')
+    return io.open(file_path, encoding='utf-8')
+
+
+def iter_records(file_paths):
+    """Iterates over the records of log files.
+
+    Records are read as a stream and yielded as :class:`LogRecord`, whose
+    message is everything following the record's ``asctime``, except the
+    hash of hash-chained logs.
+
+    Parameters
+    ----------
+    file_paths : :class:`list`
+        Log files to read, e.g. the output of :func:`log_files`.
+
+    """
+    for file_path in file_paths:
+        with open_log(file_path) as f:
+            asctime = None
+            lines = []
+            for line in f:
+                line = line.rstrip('\r\n')
+                match = RECORD_START.match(line)
+                if match:
+                    if asctime is not None:
+                        yield LogRecord(asctime, '\n'.join(lines))
+                    asctime = match.group(0)
+                    rest = CHAIN_TAG.sub('', line[match.end():]).strip()
+                    lines = [rest] if rest else []
+                elif asctime is not None:
+                    lines.append(line)
+            if asctime is not None:
+                yield LogRecord(asctime, '\n'.join(lines))
+
+
+def wait_for_compression():
+    """Blocks until all rotated files submitted so far are processed."""
+    _tasks.join()
+
+
+def compress_log(file_path):
+    """Gzips a file and deletes the original.
+
+    The compressed file is written under a temporary name and renamed once
+    complete, so that readers never see a partial file.
+
+    """
+    tmp_path = file_path + '.gz.tmp'
+    with io.open(file_path, 'rb') as f_in:
+        with gzip.open(tmp_path, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    os.rename(tmp_path, file_path + '.gz')
+    os.remove(file_path)
+
+
+def _strip_gz(file_path):
+    """Returns a path without its '.gz' extension."""
+    return file_path[:-3] if file_path.endswith('.gz') else file_path
+
+
+def _submit(task):
+    """Submits a rotated log to the background thread."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_work,
+                                       name='pyplanck-log-compression')
+            _worker.daemon = True
+            _worker.start()
+    _tasks.put(task)
+
+
+def _work():
+    """Compresses, prunes and hands over rotated logs from the queue."""
+    while True:
+        file_path, backup_count, compress, callbacks = _tasks.get()
+        files = []
+        try:
+            files = rotated_log_files(file_path)
+            if backup_count > 0:
+                for old_file_path in files[:-backup_count]:
+                    os.remove(old_file_path)
+                files = files[-backup_count:]
+            if compress:
+                for rotated_file_path in files:
+                    if not rotated_file_path.endswith('.gz'):
+                        compress_log(rotated_file_path)
+                files = rotated_log_files(file_path)
+        except (IOError, OSError):
+            # Files left as they are will be handled at the next rotation
+            pass
+        try:
+            for callback in callbacks:
+                if not files:
+                    break
+                try:
+                    callback(files[-1])
+                except Exception:
+                    # Callbacks report their own errors
+                    pass
+        finally:
+            _tasks.task_done()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Memory footprint reports."""
+import logging
+import sys
+import threading
+import types
+from array import array
+from collections import OrderedDict, namedtuple
+
+import six
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+LoadTrace = namedtuple('LoadTrace', 'peak retained top_allocations')
+
+# Objects shared with the rest of the process, which are not counted
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.MethodType,
+                 logging.Logger, logging.Manager, type(threading.Lock()))
+
+# Objects which reference nothing worth following
+_LEAF_TYPES = (array, bytearray, six.binary_type, six.text_type, float) + \
+    six.integer_types
+
+
+def deep_size(obj, seen=None):
+    """Returns the size in bytes of an object and of what it references.
+
+    Containers, instance dictionaries and slots are followed. Modules,
+    classes, functions, loggers and locks are shared with the rest of the
+    process and are not counted.
+
+    Parameters
+    ----------
+    obj : object
+        Object to measure.
+    seen : :class:`set`, optional
+        Ids of objects already counted, which are skipped. Passing the same
+        set to several calls counts shared objects once.
+
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, _LEAF_TYPES):
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+    return size
+
+
+def trace_load(load):
+    """Calls a loading function while tracing its memory allocations.
+
+    Parameters
+    ----------
+    load : callable
+        Function to call without arguments.
+
+    Returns
+    -------
+    result : object
+        What ``load`` returned.
+    trace : :class:`LoadTrace`
+        Peak memory allocated during the call and memory still allocated
+        after it, in bytes, and the ten source lines whose allocations grew
+        the most, as :class:`tracemalloc.StatisticDiff` instances. ``None``
+        if :mod:`tracemalloc` is not available.
+
+    """
+    if tracemalloc is None:
+        return load(), None
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    try:
+        before = tracemalloc.take_snapshot()
+        current_before, _ = tracemalloc.get_traced_memory()
+        result = load()
+        current_after, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    # Leave out the snapshots themselves
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    top_allocations = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), 'lineno')[:10]
+    trace = LoadTrace(peak - current_before, current_after - current_before,
+                      top_allocations)
+    return result, trace
+
+
+class MemoryReport(object):
+    """Memory used by the subsystems of a register.
+
+    Parameters
+    ----------
+    subsystems : :class:`OrderedDict`
+        Subsystem name to size in bytes mapping.
+    catalog_load : :class:`LoadTrace`, optional
+        Trace of the catalog's load. Defaults to ``None``.
+
+    """
+    def __init__(self, subsystems, catalog_load=None):
+        self.subsystems = subsystems
+        self.catalog_load = catalog_load
+
+    @property
+    def total(self):
+        return sum(self.subsystems.values())
+
+    def to_string(self):
+        """Returns a printable version of the report."""
+        lines = ['Memory usage:']
+        for name, size in self.subsystems.items():
+            lines.append('{:>12}: {}'.format(name, _format_size(size)))
+        lines.append('{:>12}: {}'.format('total', _format_size(self.total)))
+        if self.catalog_load is not None:
+            lines.append('Catalog load:')
+            lines.append('{:>12}: {}'.format(
+                'peak', _format_size(self.catalog_load.peak)))
+            lines.append('{:>12}: {}'.format(
+                'retained', _format_size(self.catalog_load.retained)))
+            for statistic in self.catalog_load.top_allocations:
+                frame = statistic.traceback[0]
+                lines.append('  {}:{}: {}'.format(
+                    frame.filename, frame.lineno,
+                    _format_size(statistic.size_diff)))
+        return '\n'.join(lines)
+
+
+def register_memory(register):
+    """Measures the memory used by the subsystems of a register.
+
+    The catalog subsystem includes all menu profiles. Objects referenced by
+    several subsystems are counted in the first one, in the order catalog,
+    employees, order, loggers, other.
+
+    Parameters
+    ----------
+    register : :class:`Register`
+
+    Returns
+    -------
+    subsystems : :class:`OrderedDict`
+        Subsystem name to size in bytes mapping.
+
+    """
+    seen = set()
+
+    def size(*objects):
+        return sum(deep_size(obj, seen) for obj in objects)
+    subsystems = OrderedDict()
+    subsystems['catalog'] = size(register.catalog, register._profiles)
+    subsystems['employees'] = size(register._employees,
+                                   register._employee_index)
+    subsystems['order'] = size(register.order_dict, register.pricing,
+                               register.order_log)
+    subsystems['loggers'] = size(register.transaction_logger.handlers,
+                                 register.count_logger.handlers,
+                                 register.logger.handlers)
+    subsystems['other'] = size(register.policy, register.events,
+                               register.dashboard, register.shifts,
+                               register.catalog_versions, register.display,
+                               register.inventory, register.parked_orders)
+    return subsystems
+
+
+def _format_size(size):
+    """Formats a size in bytes."""
+    return '{:.1f} KiB'.format(size / 1024.0)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Write-ahead log of the current order."""
+import io
+import os
+import re
+from collections import OrderedDict
+
+# Characters of custom item fields that would break the log's records
+_ESCAPES = {u'\\': u'\\\\', u'\t': u'\\t', u'\n': u'\\n', u'\r': u'\\r'}
+_UNESCAPES = dict((value[1], key) for key, value in _ESCAPES.items())
+_ESCAPED = re.compile(u'[\\\\\t\n\r]')
+_UNESCAPED = re.compile(u'\\\\(.)')
+
+
+class OrderLog(object):
+    """Write-ahead log of the current order's mutations.
+
+    Every mutation is appended to the log as a short text record and flushed
+    to the operating system, so that the order survives a crash of the
+    register's process. The log is synced to disk when the order is checked
+    out, cleared or replaced, and after every record if ``sync`` is set. The
+    log is truncated whenever the order is cleared, which includes
+    checkouts, so it never grows larger than one order.
+
+    A checkout is marked in the log before the register count is updated,
+    so that an order whose checkout was interrupted by a crash is not
+    restored and counted twice.
+
+    The log starts with the digest of the catalog its item ids refer to.
+    Custom items have no stable id and are defined by value in the log the
+    first time they are referenced, with tabs, line breaks and backslashes
+    in their fields escaped.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the log file.
+    sync : :class:`bool`, optional
+        Whether to sync the log to disk after every record. Defaults to
+        ``False``.
+
+    """
+    def __init__(self, file_path, sync=False):
+        self.file_path = file_path
+        self.sync = sync
+        self._file = None
+        self._custom_ids = set()
+
+    def restore(self, catalog):
+        """Replays the log and returns the order it describes.
+
+        Malformed records, such as a record interrupted by a crash, are
+        ignored.
+
+        Parameters
+        ----------
+        catalog : :class:`Catalog`
+            Catalog the order's item ids should refer to.
+
+        Raises
+        ------
+        ValueError
+            If the log was written with a different menu.
+
+        """
+        order_dict = OrderedDict()
+        if not os.path.isfile(self.file_path):
+            return order_dict
+        # Custom item ids in the log may differ from their id in `catalog`
+        custom_ids = {}
+        with io.open(self.file_path, encoding='utf-8') as f:
+            for line in f:
+                # A record interrupted by a crash has no line ending
+                if not line.endswith(u'\n'):
+                    break
+                tokens = line.rstrip(u'\n').split(u'\t')
+                if tokens[0] == u'C':
+                    # The order was checked out before the crash
+                    order_dict.clear()
+                    continue
+                if tokens[0] == u'D':
+                    if tokens[1:] != [catalog.digest()]:
+                        raise ValueError('order log was written with a ' +
+                                         'different menu')
+                    continue
+                try:
+                    self._replay(tokens, order_dict, custom_ids, catalog)
+                except (IndexError, ValueError):
+                    continue
+        return order_dict
+
+    def add(self, item_id, catalog):
+        """Logs the addition of an item to the order."""
+        self._define(item_id, catalog)
+        self._write(u'+\t{}\n'.format(item_id))
+
+    def remove(self, item_id):
+        """Logs the removal of an item from the order."""
+        self._write(u'-\t{}\n'.format(item_id))
+
+    def write_order(self, order_dict, catalog):
+        """Replaces the log with a snapshot of an order."""
+        self.truncate(catalog)
+        for item_id, quantity in order_dict.items():
+            self._define(item_id, catalog)
+            self._write(u'=\t{}\t{}\n'.format(item_id, quantity))
+        self._sync()
+
+    def checkout(self):
+        """Logs the checkout of the order, which is then not restored."""
+        self._write(u'C\n')
+        self._sync()
+
+    def truncate(self, catalog):
+        """Empties the log."""
+        f = self._open()
+        f.seek(0)
+        f.truncate()
+        self._custom_ids = set()
+        self._write(u'D\t{}\n'.format(catalog.digest()))
+        self._sync()
+
+    def close(self):
+        """Closes the log file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _replay(tokens, order_dict, custom_ids, catalog):
+        """Applies a record to an order."""
+        if tokens[0] == u'N':
+            name, price, barcode, category = [_unescape(token)
+                                              for token in tokens[2:]]
+            custom_ids[int(tokens[1])] = catalog.add_custom(
+                name, float(price), barcode, category)
+            return
+        item_id = int(tokens[1])
+        item_id = custom_ids.get(item_id, item_id)
+        if item_id >= len(catalog):
+            raise ValueError('unknown item id')
+        quantity = order_dict.get(item_id, 0)
+        if tokens[0] == u'+':
+            quantity += 1
+        elif tokens[0] == u'-':
+            quantity -= 1
+        elif tokens[0] == u'=':
+            quantity = int(tokens[2])
+        if quantity > 0:
+            order_dict[item_id] = quantity
+        else:
+            order_dict.pop(item_id, None)
+
+    def _define(self, item_id, catalog):
+        """Logs the definition of a custom item the first time it is used."""
+        if item_id in self._custom_ids or not catalog.is_custom(item_id):
+            return
+        name, price, barcode, category, _ = catalog.row(item_id)
+        self._custom_ids.add(item_id)
+        self._write(u'N\t{}\t{}\t{!r}\t{}\t{}\n'.format(
+            item_id, _escape(name), price, _escape(barcode),
+            _escape(category)))
+
+    def _open(self):
+        """Returns the log file, opening it if needed."""
+        if self._file is None:
+            self._file = io.open(self.file_path, 'a', encoding='utf-8')
+        return self._file
+
+    def _write(self, record):
+        """Appends a record to the log and flushes it."""
+        f = self._open()
+        f.write(record)
+        f.flush()
+        if self.sync:
+            os.fsync(f.fileno())
+
+    def _sync(self):
+        """Syncs the log to disk, unless every record already is."""
+        if not self.sync:
+            os.fsync(self._open().fileno())
+
+
+def _escape(field):
+    """Escapes a field of a record."""
+    return _ESCAPED.sub(lambda match: _ESCAPES[match.group()], field)
+
+
+def _unescape(field):
+    """Reverts :func:`_escape`."""
+    return _UNESCAPED.sub(lambda match: _UNESCAPES.get(match.group(1),
+                                                       match.group(1)),
+                          field)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Parked orders."""
+from collections import OrderedDict
+
+import six
+
+
+class ParkedOrders(object):
+    """On-disk store of named parked orders.
+
+    Orders are stored in a dbm database keyed by name, so parking and
+    resuming an order only touch that order's record. Each record holds the
+    order's ``(barcode, quantity)`` pairs and the fields of any custom item,
+    which custom items reference by a negative index instead of a barcode.
+    Item ids are resolved again when an order is resumed, so that orders
+    survive menu edits and menu profile switches.
+
+    The database is only opened when first needed.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the parked orders database.
+
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._shelf = None
+
+    def __contains__(self, name):
+        return self._key(name) in self.shelf
+
+    def __len__(self):
+        return len(self.shelf)
+
+    @property
+    def shelf(self):
+        if self._shelf is None:
+            # Only imported once an order is parked or resumed
+            import shelve
+            self._shelf = shelve.open(self.file_path)
+        return self._shelf
+
+    @property
+    def names(self):
+        return sorted(self.shelf.keys())
+
+    def park(self, name, order_dict, catalog):
+        """Saves an order under a name.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Name of the parked order.
+        order_dict : :class:`OrderedDict`
+            Mapping from item id to quantity.
+        catalog : :class:`Catalog`
+            Catalog the item ids refer to.
+
+        Raises
+        ------
+        ValueError
+            If an order is already parked under that name.
+
+        """
+        key = self._key(name)
+        if key in self.shelf:
+            raise ValueError("an order named '{}' is already parked".format(
+                name))
+        lines = []
+        custom_rows = []
+        for item_id, quantity in order_dict.items():
+            if catalog.is_custom(item_id):
+                custom_rows.append(catalog.row(item_id))
+                lines.append((-len(custom_rows), quantity))
+            else:
+                lines.append((catalog.barcodes[item_id], quantity))
+        self.shelf[key] = (tuple(lines), tuple(custom_rows))
+        self.shelf.sync()
+
+    def resume(self, name, catalog):
+        """Removes a parked order and returns it.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Name of the parked order.
+        catalog : :class:`Catalog`
+            Catalog in which to find the order's items.
+
+        Raises
+        ------
+        ValueError
+            If no order is parked under that name, or if some of its items
+            are no longer on the menu, in which case the order stays parked.
+
+        """
+        key = self._key(name)
+        try:
+            lines, custom_rows = self.shelf[key]
+        except KeyError:
+            raise ValueError("no order named '{}' is parked".format(name))
+        missing = [token for token, _ in lines
+                   if not isinstance(token, int) and token not in catalog]
+        if missing:
+            raise ValueError(
+                "order '{}' holds items no longer on the menu: {}".format(
+                    name, ', '.join(missing)))
+        order_dict = OrderedDict()
+        for token, quantity in lines:
+            if isinstance(token, int):
+                item_id = catalog.add_custom(*custom_rows[-token - 1])
+            else:
+                item_id = catalog.find(token)
+            order_dict[item_id] = order_dict.get(item_id, 0) + quantity
+        del self.shelf[key]
+        self.shelf.sync()
+        return order_dict
+
+    def discard(self, name):
+        """Removes a parked order without resuming it.
+
+        Raises
+        ------
+        ValueError
+            If no order is parked under that name.
+
+        """
+        key = self._key(name)
+        if key not in self.shelf:
+            raise ValueError("no order named '{}' is parked".format(name))
+        del self.shelf[key]
+        self.shelf.sync()
+
+    def close(self):
+        """Closes the database."""
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+    @staticmethod
+    def _key(name):
+        """Returns the database key of an order name."""
+        if six.PY2 and isinstance(name, six.text_type):
+            return name.encode('utf-8')
+        return name
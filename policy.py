@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Permission policy."""
+import io
+from collections import OrderedDict
+
+# Minimum employee level of each operation when no policy file overrides it
+DEFAULT_LEVELS = OrderedDict([
+    ('add', 0),
+    ('remove', 0),
+    ('clear_order', 0),
+    ('order_to_string', 0),
+    ('park_order', 0),
+    ('resume_order', 0),
+    ('add_custom', 1),
+    ('checkout_order', 1),
+    ('discard_order', 1),
+    ('count_register', 1),
+    ('low_stock', 1),
+    ('restock', 1),
+    ('adjust', 2),
+    ('register_count', 2),
+    ('close_out', 2),
+    ('memory_report', 2),
+    ('sales_dashboard', 2),
+    ('switch_menu', 2),
+    ('shift_report', 2),
+    ('price_history', 2),
+])
+
+
+class Policy(object):
+    """Permission policy mapping operations to minimum employee levels.
+
+    Each operation is assigned a bit, and the operations allowed for an
+    employee level are compiled into a capability bitmask, so that checking
+    a permission is a single bit test.
+
+    Parameters
+    ----------
+    levels : :class:`dict`, optional
+        Minimum level of operations, overriding :data:`DEFAULT_LEVELS`.
+
+    """
+    def __init__(self, levels=None):
+        self.levels = OrderedDict(DEFAULT_LEVELS)
+        if levels is not None:
+            self.levels.update(levels)
+        self.bits = dict((operation, 1 << i)
+                         for i, operation in enumerate(self.levels))
+        self._capabilities = {}
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Loads a policy from a file.
+
+        Each line of the file is either a role definition, ``@role|level``,
+        or an operation's minimum level, ``operation|level``, where
+        ``level`` is a non-negative integer or a role defined above.
+        Operations must be among :data:`DEFAULT_LEVELS`, so that a misspelled
+        operation does not silently leave the default level in place.
+
+        Parameters
+        ----------
+        file_path : :class:`str`
+            Path to the policy file.
+
+        Raises
+        ------
+        ValueError
+            If a line of the file is invalid or names an unknown operation.
+            Unlike menu files, a faulty policy is never partially applied.
+
+        """
+        roles = {}
+        levels = OrderedDict()
+        with io.open(file_path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if line == '':
+                    continue
+                tokens = [token.strip() for token in line.split('|')]
+                try:
+                    if len(tokens) != 2 or not tokens[0].lstrip('@'):
+                        raise ValueError('expected 2 fields')
+                    name, level = tokens
+                    level = roles[level] if level in roles else int(level)
+                    if level < 0:
+                        raise ValueError('level must be positive')
+                    if (not name.startswith('@') and
+                            name not in DEFAULT_LEVELS):
+                        raise ValueError("unknown operation '{}'".format(
+                            name))
+                except ValueError as e:
+                    raise ValueError('invalid policy line {}: {}'.format(
+                        line_number, e))
+                if name.startswith('@'):
+                    roles[name[1:]] = level
+                else:
+                    levels[name] = level
+        return cls(levels)
+
+    def capabilities(self, level):
+        """Returns the capability bitmask of an employee level."""
+        if level not in self._capabilities:
+            mask = 0
+            for operation, minimum_level in self.levels.items():
+                if level >= minimum_level:
+                    mask |= self.bits[operation]
+            self._capabilities[level] = mask
+        return self._capabilities[level]
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""Promotion and combo pricing rules."""
+import io
+from collections import namedtuple
+
+PricingRule = namedtuple('PricingRule', 'kind name quantity price tokens')
+
+KINDS = ('bundle', 'combo')
+
+
+def load_pricing_rules(file_path):
+    """Loads pricing rules from a file.
+
+    Each line of the file is either a bundle,
+    ``bundle|name|quantity|price|token|...``, meaning any ``quantity`` units
+    of the items matching the tokens cost ``price``, or a combo,
+    ``combo|name|price|token|...``, meaning one unit of an item matching
+    each token costs ``price``. A token is an item barcode or shortcut, or
+    a category name preceded by ``#``.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the pricing rules file.
+
+    Raises
+    ------
+    ValueError
+        If a line of the file is invalid.
+
+    """
+    rules = []
+    with io.open(file_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line == '':
+                continue
+            tokens = [token.strip() for token in line.split('|')]
+            try:
+                rules.append(_parse_rule(tokens))
+            except (IndexError, ValueError) as e:
+                raise ValueError('invalid pricing rule line {}: {}'.format(
+                    line_number, e))
+    return rules
+
+
+class PricingEngine(object):
+    """Computes the discounts of pricing rules on an order.
+
+    The units of the order are assigned to the rules in the order in which
+    they were loaded, each unit counting towards a single rule and a single
+    combo component. A bundle's units are taken from the most expensive
+    matching items, as are a combo's components, the components matching
+    the fewest items being filled first. A rule which would make the order
+    more expensive is not applied, and leaves its units to the next rules.
+
+    Rules are indexed by the item ids and category ids their tokens match,
+    and each rule keeps the quantities of its matching items in the order
+    and the units it took. Rules which can match a common item are grouped
+    together, since only they compete for units. Updating the quantity of
+    an item thus only re-evaluates the first rule matching it and the later
+    rules of its group, the others keeping their results.
+
+    Parameters
+    ----------
+    rules : :class:`list`
+        :class:`PricingRule` instances, e.g. from
+        :func:`load_pricing_rules`.
+    catalog : :class:`Catalog`
+        Catalog whose item ids the order refers to.
+
+    Attributes
+    ----------
+    unresolved : :class:`list`
+        Tokens which matched no item or category, and which are ignored.
+        Combos with such a token are never applied.
+
+    """
+    def __init__(self, rules, catalog):
+        self.rules = list(rules)
+        self.catalog = catalog
+        self.unresolved = []
+        self._by_item = {}
+        self._by_category = {}
+        self._counts = []
+        self._taken = [{} for _ in self.rules]
+        self._discounts = {}
+        category_ids = dict((category, category_id) for category_id, category
+                            in enumerate(catalog.categories))
+        for rule_index, rule in enumerate(self.rules):
+            slots = [] if rule.kind == 'combo' else [{}]
+            for token in rule.tokens:
+                slot = len(slots) if rule.kind == 'combo' else 0
+                if rule.kind == 'combo':
+                    slots.append({})
+                if token.startswith('#') and token[1:] in category_ids:
+                    self._by_category.setdefault(
+                        category_ids[token[1:]], []).append((rule_index, slot))
+                elif not token.startswith('#') and token in catalog:
+                    self._by_item.setdefault(
+                        catalog.find(token), []).append((rule_index, slot))
+                else:
+                    self.unresolved.append(token)
+            self._counts.append(slots)
+        self._groups = self._group_rules()
+        self._group_of = {}
+        for group in self._groups:
+            for position, rule_index in enumerate(group):
+                self._group_of[rule_index] = (group, position)
+
+    def update(self, item_id, quantity):
+        """Updates the quantity of an item in the order.
+
+        Parameters
+        ----------
+        item_id : :class:`int`
+            Catalog id of the item.
+        quantity : :class:`int`
+            New quantity of the item, 0 if it left the order.
+
+        """
+        matches = self._set(item_id, quantity)
+        if matches:
+            self._evaluate(item_id, set(rule_index
+                                        for rule_index, _ in matches))
+
+    def reset(self, order_dict=None):
+        """Replaces the order whose discounts are computed.
+
+        Parameters
+        ----------
+        order_dict : :class:`dict`, optional
+            Item id to quantity mapping. Defaults to ``None``, meaning an
+            empty order.
+
+        """
+        for slots in self._counts:
+            for counts in slots:
+                counts.clear()
+        for taken in self._taken:
+            taken.clear()
+        self._discounts = {}
+        if order_dict:
+            for item_id, quantity in order_dict.items():
+                self._set(item_id, quantity)
+            pool = {}
+            for slots in self._counts:
+                for counts in slots:
+                    pool.update(counts)
+            for rule_index in range(len(self.rules)):
+                self._apply(rule_index, pool)
+
+    @property
+    def total_discount(self):
+        return sum(discount for _, _, discount in self.discounts())
+
+    def discounts(self):
+        """Returns the applied rules as ``(rule, times, discount)`` tuples.
+
+        Rules are listed in the order in which they were loaded.
+
+        """
+        discounts = []
+        for rule_index in sorted(self._discounts):
+            times, discount = self._discounts[rule_index]
+            discounts.append((self.rules[rule_index], times, discount))
+        return discounts
+
+    def _set(self, item_id, quantity):
+        """Updates the quantity of an item in the rules matching it.
+
+        Returns
+        -------
+        matches : :class:`list`
+            ``(rule index, slot)`` pairs matching the item.
+
+        """
+        matches = self._matches(item_id)
+        for rule_index, slot in matches:
+            counts = self._counts[rule_index][slot]
+            if quantity > 0:
+                counts[item_id] = quantity
+            else:
+                counts.pop(item_id, None)
+        return matches
+
+    def _matches(self, item_id):
+        """Returns the ``(rule index, slot)`` pairs matching an item."""
+        by_item = self._by_item.get(item_id, ())
+        by_category = self._by_category.get(
+            self.catalog.category_ids[item_id], ())
+        if not by_category:
+            return by_item
+        return list(by_item) + list(by_category)
+
+    def _group_rules(self):
+        """Returns the rule indexes of each group of competing rules.
+
+        Two rules compete when an item can match both, either directly or
+        through its category.
+
+        """
+        parents = {}
+
+        def find(node):
+            while parents.setdefault(node, node) != node:
+                node = parents[node]
+            return node
+
+        category_ids = self.catalog.category_ids
+        for item_id, matches in self._by_item.items():
+            # An item is linked to its category
+            for rule_index, _ in matches:
+                parents[find(('rule', rule_index))] = find(
+                    ('category', category_ids[item_id]))
+        for category_id, matches in self._by_category.items():
+            for rule_index, _ in matches:
+                parents[find(('rule', rule_index))] = find(
+                    ('category', category_id))
+        groups = {}
+        for rule_index in range(len(self.rules)):
+            groups.setdefault(find(('rule', rule_index)), []).append(
+                rule_index)
+        return sorted(groups.values())
+
+    def _evaluate(self, item_id, rule_indexes):
+        """Re-evaluates the rules affected by a change of an item.
+
+        Parameters
+        ----------
+        item_id : :class:`int`
+            Catalog id of the changed item.
+        rule_indexes : :class:`set`
+            Indexes of the rules matching the item.
+
+        """
+        group, start = self._group_of[min(rule_indexes)]
+        # Remaining units of each item matched by the group
+        pool = {}
+        for rule_index in group:
+            for counts in self._counts[rule_index]:
+                pool.update(counts)
+        for rule_index in group[:start]:
+            _take_back(self._taken[rule_index], pool)
+        # Items whose units left to the next rules may have changed
+        changed = set([item_id])
+        for rule_index in group[start:]:
+            taken = self._taken[rule_index]
+            if (rule_index not in rule_indexes and
+                    not any(changed.intersection(counts)
+                            for counts in self._counts[rule_index])):
+                _take_back(taken, pool)
+                continue
+            previous = dict(taken)
+            self._apply(rule_index, pool)
+            changed.update(item for item in set(previous) | set(taken)
+                           if previous.get(item) != taken.get(item))
+
+    def _apply(self, rule_index, pool):
+        """Evaluates a rule, taking its units from the pool."""
+        rule = self.rules[rule_index]
+        slots = self._counts[rule_index]
+        taken = self._taken[rule_index]
+        taken.clear()
+        self._discounts.pop(rule_index, None)
+        if not all(slots):
+            return
+        if rule.kind == 'bundle':
+            times = (sum(pool[item_id] for item_id in slots[0]) //
+                     rule.quantity)
+            regular_price = self._take(slots[0], times * rule.quantity,
+                                       pool, taken)
+        else:
+            times, regular_price = self._take_combos(slots, pool, taken)
+        discount = regular_price - times * rule.price
+        if times > 0 and discount > 0:
+            self._discounts[rule_index] = (times, discount)
+        else:
+            _give_back(taken, pool)
+            taken.clear()
+
+    def _take_combos(self, slots, pool, taken):
+        """Takes units for as many combos as possible.
+
+        Returns
+        -------
+        times : :class:`int`
+            Number of combos.
+        regular_price : :class:`float`
+            Price of the units taken.
+
+        """
+        slots = sorted(slots, key=len)
+        times = 0
+        regular_price = 0.0
+        while True:
+            combo = {}
+            price = 0.0
+            for counts in slots:
+                if not any(pool[item_id] for item_id in counts):
+                    _give_back(combo, pool)
+                    return times, regular_price
+                price += self._take(counts, 1, pool, combo)
+            _give_back(combo, taken)
+            times += 1
+            regular_price += price
+
+    def _take(self, counts, units, pool, taken):
+        """Takes the most expensive units of some items from the pool.
+
+        Returns
+        -------
+        regular_price : :class:`float`
+            Price of the units taken.
+
+        """
+        prices = self.catalog.prices
+        total = 0.0
+        for item_id in sorted(counts, key=lambda i: -prices[i]):
+            if units == 0:
+                break
+            quantity = min(pool[item_id], units)
+            if quantity > 0:
+                pool[item_id] -= quantity
+                taken[item_id] = taken.get(item_id, 0) + quantity
+                total += quantity * prices[item_id]
+                units -= quantity
+        return total
+
+
+def _take_back(taken, pool):
+    """Removes units taken by a rule from a pool."""
+    for item_id, quantity in taken.items():
+        pool[item_id] -= quantity
+
+
+def _give_back(taken, pool):
+    """Adds units taken from a pool to another pool."""
+    for item_id, quantity in taken.items():
+        pool[item_id] = pool.get(item_id, 0) + quantity
+
+
+def _parse_rule(tokens):
+    """Parses the fields of a pricing rule line."""
+    kind, name = tokens[0], tokens[1]
+    if kind not in KINDS:
+        raise ValueError("unknown rule kind '{}'".format(kind))
+    if kind == 'bundle':
+        quantity, price, item_tokens = int(tokens[2]), tokens[3], tokens[4:]
+        if quantity < 1:
+            raise ValueError('quantity must be positive')
+    else:
+        price, item_tokens = tokens[2], tokens[3:]
+        quantity = len(item_tokens)
+    price = float(price)
+    if price < 0:
+        raise ValueError('price must be positive')
+    if not name or not item_tokens or '' in item_tokens:
+        raise ValueError('missing field')
+    return PricingRule(kind, name, quantity, price, tuple(item_tokens))
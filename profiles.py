@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Menu profiles and their schedule."""
+import bisect
+import datetime
+import io
+from collections import namedtuple
+
+# Name of the profile of the register's main menu file
+DEFAULT_PROFILE = 'default'
+
+MenuProfile = namedtuple('MenuProfile', 'name catalog pricing version')
+
+
+def load_menu_schedule(file_path):
+    """Loads a menu schedule from a file.
+
+    Each line of the file is ``HH:MM|profile``, meaning the profile is used
+    from that time of day until the next line's time.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the schedule file.
+
+    Returns
+    -------
+    schedule : :class:`MenuSchedule`
+
+    Raises
+    ------
+    ValueError
+        If a line of the file is invalid or if the file schedules no
+        profile.
+
+    """
+    entries = []
+    with io.open(file_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line == '':
+                continue
+            tokens = [token.strip() for token in line.split('|')]
+            try:
+                if len(tokens) != 2 or not tokens[1]:
+                    raise ValueError('expected 2 fields')
+                start = datetime.datetime.strptime(tokens[0], '%H:%M')
+            except ValueError as e:
+                raise ValueError('invalid schedule line {}: {}'.format(
+                    line_number, e))
+            entries.append((start.hour * 60 + start.minute, tokens[1]))
+    if not entries:
+        raise ValueError('empty menu schedule')
+    return MenuSchedule(entries)
+
+
+class MenuSchedule(object):
+    """Daily schedule of menu profiles.
+
+    Parameters
+    ----------
+    entries : :class:`list`
+        ``(minute, profile)`` tuples, where ``minute`` is the minute of the
+        day from which ``profile`` is used. Before the earliest entry, the
+        latest entry of the previous day still applies.
+
+    """
+    def __init__(self, entries):
+        entries = sorted(entries)
+        self._starts = [minute for minute, _ in entries]
+        self._profiles = [profile for _, profile in entries]
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def profiles(self):
+        """Names of the scheduled profiles."""
+        return set(self._profiles)
+
+    def profile_at(self, timestamp):
+        """Returns the name of the profile scheduled at a time.
+
+        Parameters
+        ----------
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+
+        Returns
+        -------
+        profile : :class:`str`
+            Profile name, ``None`` if the schedule is empty.
+
+        """
+        if not self._starts:
+            return None
+        moment = datetime.datetime.fromtimestamp(timestamp)
+        minute = moment.hour * 60 + moment.minute
+        # Index -1 wraps around to the previous day's last entry
+        return self._profiles[bisect.bisect_right(self._starts, minute) - 1]
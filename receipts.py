@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Receipt rendering and printing."""
+import os
+import threading
+import time
+
+from six.moves import queue
+
+# ESC/POS commands
+INITIALIZE = b'\x1b@'
+ALIGN_LEFT = b'\x1ba\x00'
+ALIGN_CENTER = b'\x1ba\x01'
+BOLD_ON = b'\x1bE\x01'
+BOLD_OFF = b'\x1bE\x00'
+# Feeds the paper past the cutter, then cuts it partially
+FEED_AND_CUT = b'\x1dVB\x03'
+
+_STOP = object()
+
+
+class ReceiptRenderer(object):
+    """Renders checked out orders as ESC/POS receipts.
+
+    The header and footer are rendered once, and so is the column of each
+    item, holding its name and unit price, so that rendering a line only
+    formats its quantity and amount.
+
+    Parameters
+    ----------
+    header : :class:`list`, optional
+        Lines printed centered in bold at the top. Defaults to
+        ``['PyPlanck']``.
+    footer : :class:`list`, optional
+        Lines printed centered at the bottom. Defaults to
+        ``['Thank you!']``.
+    width : :class:`int`, optional
+        Characters per line of the printer. Defaults to 42.
+    encoding : :class:`str`, optional
+        Code page of the printer. Defaults to ``'cp437'``.
+    max_cached_items : :class:`int`, optional
+        Number of item columns beyond which the cache is cleared, since
+        custom items add to it. Defaults to 4096.
+
+    """
+    def __init__(self, header=None, footer=None, width=42, encoding='cp437',
+                 max_cached_items=4096):
+        if header is None:
+            header = ['PyPlanck']
+        if footer is None:
+            footer = ['Thank you!']
+        self.width = width
+        self.encoding = encoding
+        self.max_cached_items = max_cached_items
+        self._name_width = width - 19
+        self._separator = self._encode(u'-' * width + u'\n')
+        self._header = (INITIALIZE + ALIGN_CENTER + BOLD_ON +
+                        self._encode(u''.join(line + u'\n'
+                                              for line in header)) +
+                        BOLD_OFF + ALIGN_LEFT)
+        self._footer = (ALIGN_CENTER +
+                        self._encode(u''.join(line + u'\n'
+                                              for line in footer)) +
+                        ALIGN_LEFT + FEED_AND_CUT)
+        self._columns = {}
+
+    def render(self, order, total, employee=None, timestamp=None):
+        """Returns the ESC/POS bytes of a receipt.
+
+        Parameters
+        ----------
+        order : :class:`tuple`
+            ``(item, quantity)`` pairs, as :attr:`Register.order`.
+        total : :class:`float`
+            Order total. Any difference with the items' sum is printed as
+            discounts.
+        employee : :class:`str`, optional
+            Name of the employee. Defaults to ``None``.
+        timestamp : :class:`float`, optional
+            Time of the checkout. Defaults to ``None``, meaning the current
+            time.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        text = [time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))]
+        if employee is not None:
+            text.append(u'Served by {}'.format(employee))
+        parts = [self._header, self._encode(u'\n'.join(text) + u'\n'),
+                 self._separator]
+        subtotal = 0.0
+        for item, quantity in order:
+            amount = item.price * quantity
+            subtotal += amount
+            parts.append(self._column(item))
+            parts.append('{:>3}{:>7.2f}\n'.format(quantity, amount).encode(
+                'ascii'))
+        if subtotal - total > 0.005:
+            parts.append(self._total_line(u'Discounts', total - subtotal))
+        parts.append(self._separator)
+        parts.append(BOLD_ON + self._total_line(u'TOTAL', total) + BOLD_OFF)
+        parts.append(self._footer)
+        return b''.join(parts)
+
+    def _column(self, item):
+        """Returns the cached name and unit price column of an item."""
+        key = (item.name, item.price)
+        column = self._columns.get(key)
+        if column is None:
+            if len(self._columns) >= self.max_cached_items:
+                self._columns.clear()
+            name = item.name[:self._name_width].ljust(self._name_width)
+            column = self._encode(u'{}{:>7.2f} x'.format(name, item.price))
+            self._columns[key] = column
+        return column
+
+    def _total_line(self, label, amount):
+        """Returns a line with a label and a right-aligned amount."""
+        return self._encode(u'{}{:>{}.2f}\n'.format(
+            label, amount, self.width - len(label)))
+
+    def _encode(self, text):
+        return text.encode(self.encoding, 'replace')
+
+
+class PrintSpooler(object):
+    """Prints receipts on a background thread.
+
+    Receipts are queued and written to the printer by a worker thread, so
+    that a checkout never waits for the printer. A failed write is retried,
+    reopening the device, before the receipt is given up. When the queue is
+    full, new receipts are dropped.
+
+    Parameters
+    ----------
+    device_path : :class:`str`
+        Path to the printer, e.g. a serial or USB device or a
+        pseudo-terminal.
+    renderer : :class:`ReceiptRenderer`, optional
+        Renderer of the receipts. Defaults to ``None``, meaning a default
+        :class:`ReceiptRenderer`.
+    max_queue_size : :class:`int`, optional
+        Capacity of the queue of receipts. Defaults to 16.
+    retries : :class:`int`, optional
+        Number of times a failed write is retried. Defaults to 3.
+    retry_interval : :class:`float`, optional
+        Seconds between retries. Defaults to 1.
+    logger : :class:`logging.Logger`, optional
+        Logger reporting printing errors. Defaults to ``None``.
+
+    Attributes
+    ----------
+    printed : :class:`int`
+        Number of receipts written.
+    dropped : :class:`int`
+        Number of receipts dropped because the queue was full.
+    failed : :class:`int`
+        Number of receipts given up after all retries.
+
+    """
+    def __init__(self, device_path, renderer=None, max_queue_size=16,
+                 retries=3, retry_interval=1.0, logger=None):
+        if renderer is None:
+            renderer = ReceiptRenderer()
+        self.device_path = device_path
+        self.renderer = renderer
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.logger = logger
+        self.printed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(max_queue_size)
+        self._fd = None
+        self._worker = threading.Thread(target=self._work,
+                                        name='pyplanck-print-spooler')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def record_checkout(self, event):
+        """Prints the receipt of an :class:`OrderCheckedOut` event.
+
+        Meant to be subscribed to a register's :class:`EventBus`.
+
+        """
+        self.submit(self.renderer.render(event.order, event.total,
+                                         event.employee, event.time))
+
+    def submit(self, data):
+        """Queues bytes for the printer.
+
+        Returns
+        -------
+        queued : :class:`bool`
+            Whether the data was queued rather than dropped.
+
+        """
+        try:
+            self._queue.put_nowait(data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.logger is not None:
+                self.logger.warning('receipt dropped, printer queue is full')
+            return False
+
+    def join(self):
+        """Blocks until all queued receipts are printed or given up."""
+        self._queue.join()
+
+    def close(self):
+        """Prints the queued receipts and stops the worker."""
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            self._worker.join()
+            self._worker = None
+
+    def _work(self):
+        """Writes queued receipts until stopped."""
+        try:
+            while True:
+                data = self._queue.get()
+                try:
+                    if data is _STOP:
+                        return
+                    self._print(data)
+                finally:
+                    self._queue.task_done()
+        finally:
+            self._close_device()
+
+    def _print(self, data):
+        """Writes a receipt, retrying on errors."""
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.retry_interval)
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.device_path,
+                                       os.O_WRONLY | os.O_NOCTTY |
+                                       os.O_APPEND)
+                remaining = data
+                while remaining:
+                    remaining = remaining[os.write(self._fd, remaining):]
+                self.printed += 1
+                return
+            except OSError as e:
+                # The printer may be offline or unplugged
+                self._close_device()
+                error = e
+        self.failed += 1
+        if self.logger is not None:
+            self.logger.error('unable to print receipt: {}'.format(error))
+
+    def _close_device(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
@@ -2,12 +2,24 @@
 """Register-related classes."""
 import io
 import os
-import logging
 import struct
+import datetime
+import threading
+import time
 from collections import OrderedDict
-from logging.handlers import TimedRotatingFileHandler
 
-from .immutables import Employee, Item, validate_employee, validate_item
+# Subsystems which are optional or only needed once the catalog is loaded
+# are imported where they are used, so that a lazy register starts quickly
+from .chain import read_key
+from .dashboard import Dashboard
+from .events import (EventBus, EmployeeLoggedIn, EmployeeLoggedOut,
+                     ItemAdded, ItemRemoved, OrderCheckedOut, OrderCleared,
+                     RegisterAdjusted, RegisterCounted, StockOversold)
+from .immutables import validate_item
+from .logs import logger_manager, wait_for_compression
+from .parking import ParkedOrders
+from .policy import Policy
+from .profiles import DEFAULT_PROFILE, MenuProfile, load_menu_schedule
 from .exceptions import CredentialException, ItemNotFoundException
 from .utils import validate_amount, validate_file_path
 
@@ -25,37 +37,372 @@ class Register(object):
         Path to the register count file.
     log_path : :class:`str`
         Where to save logs.
+    parked_orders_file_path : :class:`str`, optional
+        Path to the parked orders database. Defaults to
+        ``'parked_orders'`` in ``log_path``.
+    order_log_file_path : :class:`str`, optional
+        Path to the write-ahead log of the current order. If given, every
+        change to the order is logged and an order left unfinished by a
+        crash is restored on startup. Defaults to ``None``, meaning the
+        order is only kept in memory.
+    log_backup_count : :class:`int`, optional
+        Number of rotated files to keep for each log. Defaults to 0,
+        meaning all rotated files are kept.
+    compress_logs : :class:`bool`, optional
+        Whether to gzip rotated log files in the background. Defaults to
+        ``False``.
+    policy_file_path : :class:`str`, optional
+        Path to a permission policy file overriding the minimum employee
+        level of operations, see :meth:`Policy.from_file`. Defaults to
+        ``None``, meaning the default policy is used.
+    lazy : :class:`bool`, optional
+        Whether to start without waiting for the menu and employees. The
+        menu and the pricing rules are loaded on a background thread and
+        operations needing them wait until they are ready, the employees
+        and the shifts are loaded on the first login, the register count is
+        opened on its first use and log files are opened on their first
+        record. Defaults to ``False``.
+    pricing_file_path : :class:`str`, optional
+        Path to a pricing rules file, see :func:`load_pricing_rules`, whose
+        discounts are applied to orders. Defaults to ``None``, meaning no
+        discounts.
+    inventory_file_path : :class:`str`, optional
+        Path to a stock file, see :func:`load_stock`, holding the stock
+        levels which checkouts decrement. Defaults to ``None``, meaning
+        stock is not tracked.
+    terminal : :class:`str`, optional
+        Name of the register, under which its loggers are named, e.g.
+        ``'pyplanck.<terminal>.event'``. Defaults to ``None``, meaning the
+        absolute path of ``log_path`` is used.
+    trace_memory : :class:`bool`, optional
+        Whether to trace the memory allocated while loading the menu, see
+        :meth:`memory_report`. Tracing needs :mod:`tracemalloc` and slows
+        the load down. Defaults to ``False``.
+    menu_profiles : :class:`dict`, optional
+        Profile name to menu file path mapping of menus, e.g. breakfast and
+        lunch menus, between which the register can switch, see
+        :meth:`switch_menu`. The menu of ``menu_file_path`` is the
+        ``'default'`` profile. All profiles are loaded on startup. Defaults
+        to ``None``, meaning only the default profile.
+    menu_schedule_file_path : :class:`str`, optional
+        Path to a menu schedule file, see :func:`load_menu_schedule`. The
+        scheduled profile is switched to between orders. Defaults to
+        ``None``, meaning profiles are only switched by
+        :meth:`switch_menu`.
+    log_key_file_path : :class:`str`, optional
+        Path to a key file. If given, the transaction and count logs are
+        hash-chained and their rotations are signed with the key, see
+        :class:`HashChainHandler` and :func:`verify_log`. Defaults to
+        ``None``.
+    shifts_file_path : :class:`str`, optional
+        Path to the shifts database, see :class:`ShiftLog`. Defaults to
+        ``'shifts.db'`` in ``log_path``.
+    display_socket_path : :class:`str`, optional
+        Path of a Unix socket on which to stream the order to customer
+        displays, see :class:`DisplayServer`. Defaults to ``None``, meaning
+        no display.
+    catalog_versions_file_path : :class:`str`, optional
+        Path to a catalog versions database. If given, each loaded menu that
+        changed is recorded as a new version, see :class:`CatalogVersions`,
+        and transaction records refer to items by catalog version and item
+        id rather than by name. Defaults to ``None``.
+    archive_path : :class:`str`, optional
+        Directory in which each rotated transaction log is archived as
+        daily NumPy columns, see :class:`TransactionArchiver`. Needs NumPy
+        and ``catalog_versions_file_path``. Defaults to ``None``.
+    receipt_printer_path : :class:`str`, optional
+        Path to an ESC/POS receipt printer, on which a receipt is printed in
+        the background at each checkout, see :class:`PrintSpooler`.
+        Defaults to ``None``, meaning no receipts.
+
+    Attributes
+    ----------
+    startup_times : :class:`OrderedDict`
+        Duration in seconds of each startup phase, in the order in which
+        they completed.
+    events : :class:`EventBus`
+        Bus on which the register publishes the events of :mod:`events`,
+        such as items being added or orders being checked out.
+    pricing : :class:`PricingEngine`
+        Discounts of the current order. ``None`` until the catalog is
+        loaded.
+    dashboard : :class:`Dashboard`
+        Rolling sales totals, fed by the checkouts published on
+        :attr:`events`.
+    shifts : :class:`ShiftLog`
+        Shifts of the employees logging in, whose sales are fed by the
+        checkouts published on :attr:`events`.
+    display : :class:`DisplayServer`
+        Server of the customer displays, ``None`` without
+        ``display_socket_path``.
+    catalog_versions : :class:`CatalogVersions`
+        History of the loaded menus, ``None`` without
+        ``catalog_versions_file_path``.
+    archiver : :class:`TransactionArchiver`
+        Archiver of the rotated transaction logs, ``None`` without
+        ``archive_path``.
+    printer : :class:`PrintSpooler`
+        Spooler of the receipts, fed by the checkouts published on
+        :attr:`events`. ``None`` without ``receipt_printer_path``.
 
     """
     def __init__(self, menu_file_path, employees_file_path,
-                 register_count_file_path, log_path):
+                 register_count_file_path, log_path,
+                 parked_orders_file_path=None, order_log_file_path=None,
+                 log_backup_count=0, compress_logs=False,
+                 policy_file_path=None, lazy=False,
+                 pricing_file_path=None, inventory_file_path=None,
+                 terminal=None, trace_memory=False, menu_profiles=None,
+                 menu_schedule_file_path=None, log_key_file_path=None,
+                 shifts_file_path=None, display_socket_path=None,
+                 catalog_versions_file_path=None, archive_path=None,
+                 receipt_printer_path=None):
 
         self.register_count_file_path = register_count_file_path
-
+        self.log_path = log_path
+        self.startup_times = OrderedDict()
+
+        phase_start = time.time()
+        if terminal is None:
+            # Dots would make the path a logger hierarchy
+            terminal = os.path.abspath(log_path).replace('.', '_')
+        self.terminal = terminal
+        self._loggers = []
+        log_key = None
+        if log_key_file_path is not None:
+            validate_file_path(log_key_file_path, 'log key')
+            log_key = read_key(log_key_file_path)
+        # Lazy loggers only open their file when the first record is emitted
+        transaction_log_path = os.path.join(log_path, 'transactions.log')
         self.transaction_logger = self.create_logger(
-            name='transaction',
-            log_path=os.path.join(log_path, 'transactions.log'),
-            log_format='%(asctime)s\n%(message)s')
+            name='pyplanck.{}.transaction'.format(terminal),
+            log_path=transaction_log_path,
+            log_format='%(asctime)s\n%(message)s',
+            backup_count=log_backup_count, compress=compress_logs,
+            delay=lazy, key=log_key)
+        # The logger may have other handlers, e.g. of other registers
+        self._transaction_handler = logger_manager.handler(
+            transaction_log_path)
         self.count_logger = self.create_logger(
-            name='count',
+            name='pyplanck.{}.count'.format(terminal),
             log_path=os.path.join(log_path, 'counts.log'),
-            log_format='%(asctime)s\n%(message)s')
+            log_format='%(asctime)s\n%(message)s',
+            backup_count=log_backup_count, compress=compress_logs,
+            delay=lazy, key=log_key)
         self.logger = self.create_logger(
-            name='event',
+            name='pyplanck.{}.event'.format(terminal),
             log_path=os.path.join(log_path, 'events.log'),
-            log_format='%(asctime)s - %(levelname)s - %(message)s')
+            log_format='%(asctime)s - %(levelname)s - %(message)s',
+            backup_count=log_backup_count, compress=compress_logs,
+            delay=lazy)
+        phase_start = self._time_startup_phase('loggers', phase_start)
+
+        self.events = EventBus(self.logger)
+        self.dashboard = Dashboard()
+        self.events.subscribe(self.dashboard.record_checkout,
+                              event_types=[OrderCheckedOut])
 
         validate_file_path(menu_file_path, 'menu')
         validate_file_path(employees_file_path, 'employees')
 
-        self.menu = self._load_menu(menu_file_path)
-        self.employees = self._load_employees(employees_file_path)
-        self._register_count = self._load_register_count(
-            self.register_count_file_path)
+        if policy_file_path is None:
+            self.policy = Policy()
+        else:
+            validate_file_path(policy_file_path, 'policy')
+            self.policy = Policy.from_file(policy_file_path)
+        phase_start = self._time_startup_phase('policy', phase_start)
+
+        # The rules are loaded along with the menu
+        self._pricing_file_path = pricing_file_path
+        if pricing_file_path is not None:
+            validate_file_path(pricing_file_path, 'pricing rules')
+
+        self._menu_profile_paths = dict(menu_profiles or {})
+        for path in self._menu_profile_paths.values():
+            validate_file_path(path, 'menu profile')
+        self._schedule = None
+        if menu_schedule_file_path is not None:
+            validate_file_path(menu_schedule_file_path, 'menu schedule')
+            self._schedule = load_menu_schedule(menu_schedule_file_path)
+            unknown = self._schedule.profiles.difference(
+                self._menu_profile_paths, [DEFAULT_PROFILE])
+            if unknown:
+                raise ValueError('unknown scheduled menu profiles: ' +
+                                 ', '.join(sorted(unknown)))
+        # The active profile is swapped as a whole, so that the catalog and
+        # the discounts always refer to the same menu
+        self._profile = None
+        self._profiles = {}
+        self._pending_profile = None
+        self._scheduled_profile = None
+
+        self.inventory = None
+        if inventory_file_path is not None:
+            from .inventory import Inventory
+            self.inventory = Inventory(inventory_file_path)
+            phase_start = self._time_startup_phase('inventory', phase_start)
+
+        # The count and the shifts are opened on first use in lazy mode
+        self._resources_lock = threading.Lock()
+        self._count_file = None
+        if shifts_file_path is None:
+            shifts_file_path = os.path.join(log_path, 'shifts.db')
+        self._shifts_file_path = shifts_file_path
+        self._shifts = None
+        self.events.subscribe(self._record_shift_checkout,
+                              event_types=[OrderCheckedOut])
+
+        self.catalog_versions = None
+        if catalog_versions_file_path is not None:
+            from .versions import CatalogVersions
+            self.catalog_versions = CatalogVersions(
+                catalog_versions_file_path)
+
+        self.archiver = None
+        if archive_path is not None:
+            if self.catalog_versions is None:
+                raise ValueError('archiving transactions requires catalog '
+                                 'versions')
+            # Only imported when archiving, as it imports NumPy
+            from .archive import TransactionArchiver
+            self.archiver = TransactionArchiver(archive_path,
+                                                self.catalog_versions,
+                                                self.logger)
+            # Rotated files are archived by the log compression thread
+            self._transaction_handler.rollover_callbacks.append(
+                self.archiver.archive_file)
+
+        self.display = None
+        if display_socket_path is not None:
+            from .display import DisplayServer
+            self.display = DisplayServer(self, display_socket_path)
+
+        self.printer = None
+        if receipt_printer_path is not None:
+            from .receipts import PrintSpooler
+            self.printer = PrintSpooler(receipt_printer_path,
+                                        logger=self.logger)
+            self.events.subscribe(self.printer.record_checkout,
+                                  event_types=[OrderCheckedOut])
 
         self.employee = None
+        # Replacing the order resets the discounts computed on it
         self.order_dict = OrderedDict()
 
+        if parked_orders_file_path is None:
+            parked_orders_file_path = os.path.join(log_path, 'parked_orders')
+        self.parked_orders = ParkedOrders(parked_orders_file_path)
+
+        self.order_log = None
+        if order_log_file_path is not None:
+            from .order_log import OrderLog
+            self.order_log = OrderLog(order_log_file_path)
+
+        self._employees_file_path = employees_file_path
+        self._employees = None
+        self._employee_index = None
+
+        self.catalog_load_trace = None
+        self._trace_memory = trace_memory
+        self._catalog_error = None
+        self._catalog_loaded = threading.Event()
+        if lazy:
+            loader = threading.Thread(target=self._load_catalog,
+                                      args=(menu_file_path,),
+                                      name='pyplanck-catalog-loader')
+            loader.daemon = True
+            loader.start()
+        else:
+            # Fail on startup rather than on the first use
+            self._count
+            self.shifts
+            self._load_catalog(menu_file_path)
+            self.catalog
+            self.employees
+
+    @property
+    def catalog(self):
+        """The menu's :class:`Catalog`, waiting for it to be loaded."""
+        self._catalog_loaded.wait()
+        if self._catalog_error is not None:
+            raise self._catalog_error
+        return self._profile.catalog
+
+    @property
+    def pricing(self):
+        profile = self._profile
+        return None if profile is None else profile.pricing
+
+    @property
+    def menu_profile(self):
+        """Name of the active menu profile."""
+        self.catalog
+        return self._profile.name
+
+    @property
+    def menu_profiles(self):
+        """Names of the loaded menu profiles."""
+        self.catalog
+        return sorted(self._profiles)
+
+    @property
+    def catalog_version(self):
+        """Version number of the active menu, ``None`` without versioning."""
+        self.catalog
+        return self._profile.version
+
+    @property
+    def catalog_ready(self):
+        """Whether the catalog is loaded."""
+        return self._catalog_loaded.is_set()
+
+    @property
+    def employees(self):
+        """The employees list, loaded on first use."""
+        if self._employees is None:
+            phase_start = time.time()
+            self._employees = self._load_employees(self._employees_file_path)
+            self._time_startup_phase('employees', phase_start)
+        return self._employees
+
+    @property
+    def shifts(self):
+        """The :class:`ShiftLog`, opened on first use."""
+        with self._resources_lock:
+            if self._shifts is None:
+                from .shifts import ShiftLog
+                phase_start = time.time()
+                self._shifts = ShiftLog(self._shifts_file_path)
+                self._time_startup_phase('shifts', phase_start)
+        return self._shifts
+
+    @property
+    def _count(self):
+        """The register count's :class:`SharedCount`, opened on first use."""
+        with self._resources_lock:
+            if self._count_file is None:
+                phase_start = time.time()
+                self._count_file = self._open_register_count(
+                    self.register_count_file_path)
+                self._time_startup_phase('register count', phase_start)
+        return self._count_file
+
+    @property
+    def menu(self):
+        return list(self.catalog)
+
+    @property
+    def employee(self):
+        return self._employee
+
+    @employee.setter
+    def employee(self, employee):
+        self._employee = employee
+        if employee is None:
+            self._capabilities = 0
+        else:
+            self._capabilities = self.policy.capabilities(employee.level)
+
     @property
     def events_logger(self):
         return self.logger
@@ -67,23 +414,52 @@ class Register(object):
         else:
             return self.employee.name
 
+    @property
+    def order_dict(self):
+        return self._order_dict
+
+    @order_dict.setter
+    def order_dict(self, order_dict):
+        self._order_dict = order_dict
+        if self.pricing is not None:
+            self.pricing.reset(order_dict)
+
     @property
     def order(self):
-        return tuple(self.order_dict.items())
+        catalog = self.catalog
+        return tuple((catalog.item(item_id), quantity)
+                     for item_id, quantity in self.order_dict.items())
+
+    @property
+    def order_subtotal(self):
+        prices = self.catalog.prices
+        return sum(prices[item_id] * quantity
+                   for item_id, quantity in self.order_dict.items())
 
     @property
     def order_total(self):
-        return sum(item.price * quantity for item, quantity in self.order)
+        return self.order_subtotal - self.pricing.total_discount
+
+    @property
+    def _register_count(self):
+        return self._count.value
+
+    @_register_count.setter
+    def _register_count(self, register_count):
+        self._count.set(register_count)
 
     @property
     def register_count(self):
-        self._verify_credentials(self.employee, 2)
+        self._authorize('register_count')
         return self._register_count
 
-    @staticmethod
-    def create_logger(name, log_path, log_format):
+    def create_logger(self, name, log_path, log_format, backup_count=0,
+                      compress=False, delay=False, key=None):
         """Creates a a rotating logger set to rotate at midnight.
 
+        The logger's file handler is shared with every other logger writing
+        to the same file, and released by :meth:`close`.
+
         Parameters
         ----------
         name : :class:`str`
@@ -92,40 +468,24 @@ class Register(object):
             In which file to save the log.
         log_format : :class:`str`
             Logging format.
+        backup_count : :class:`int`, optional
+            Number of rotated files to keep. Defaults to 0, meaning all
+            rotated files are kept.
+        compress : :class:`bool`, optional
+            Whether to gzip rotated files. Defaults to ``False``.
+        delay : :class:`bool`, optional
+            Whether to open the log file only when the first record is
+            emitted. Defaults to ``False``.
+        key : :class:`bytes`, optional
+            Key signing the checkpoints of a hash-chained log. Defaults to
+            ``None``, meaning records are not chained.
 
         """
-        logger = logging.getLogger(name)
-        logger.setLevel(logging.INFO)
-        handler = TimedRotatingFileHandler(log_path, 'midnight')
-        handler.setLevel(logging.INFO)
-        formatter = logging.Formatter(log_format)
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger = logger_manager.acquire(name, log_path, log_format,
+                                        backup_count, compress, delay, key)
+        self._loggers.append((name, log_path))
         return logger
 
-    @staticmethod
-    def find_in_list(items_list, token):
-        """Finds an item in a list by a token.
-
-        The token can either be its barcode or its shortcut.
-
-        Parameters
-        ----------
-        token : :class:`str`
-            Token by which to search the item.
-
-        Raises
-        ------
-        ValueError
-            If the token corresponds to no item in the list.
-
-        """
-        try:
-            return next(
-                i for i in items_list if token in (i.shortcut, i.barcode))
-        except StopIteration:
-            raise ValueError("item not found with token '{}'".format(token))
-
     def login_employee(self, token):
         """Finds and logs in an employee via a token.
 
@@ -142,19 +502,32 @@ class Register(object):
             If the login token corresponds to no employee.
 
         """
+        if self._employee_index is None:
+            # The first employee matching a token wins, as in a linear search
+            index = {}
+            for employee in reversed(self.employees):
+                index[employee.barcode] = employee
+                index[employee.code] = employee
+            self._employee_index = index
         try:
-            employee = next(
-                e for e in self.employees if token in (e.barcode, e.code))
-            self.employee = employee
-            self.logger.info("logged in employee '{}' ".format(employee.name) +
-                             "using token '{}'".format(token))
-        except StopIteration:
+            employee = self._employee_index[token]
+        except KeyError:
             raise CredentialException('invalid employee login')
+        self.employee = employee
+        shift = self.shifts.current
+        # Logging in again, e.g. after a restart, continues the shift
+        if shift is None or shift.employee != employee.name:
+            self.shifts.start(employee.name, self._register_count)
+        self.logger.info("logged in employee '{}' ".format(employee.name) +
+                         "using token '{}'".format(token))
+        self._publish(EmployeeLoggedIn)
 
     def logout_employee(self):
         """Logs out an employee."""
         employee = self.employee
+        self._publish(EmployeeLoggedOut)
         self.employee = None
+        self.shifts.end(self._register_count)
         self.logger.info("logged out employee '{}'".format(employee.name))
 
     def add(self, token):
@@ -166,9 +539,11 @@ class Register(object):
             Token representing the item to add.
 
         """
-        self._verify_credentials(self.employee, 0)
-        item = self._find_in_menu(token)
-        self._add_to_order(item)
+        self._authorize('add')
+        if not self.order_dict:
+            self._switch_between_orders()
+        item_id = self._find_in_menu(token)
+        self._add_to_order(item_id)
 
     def add_custom(self, name, price):
         """Adds a custom item to the order.
@@ -181,12 +556,15 @@ class Register(object):
             Price of the custom item.
 
         """
-        self._verify_credentials(self.employee, 1)
+        self._authorize('add_custom')
         barcode = 'custom_{}'.format(name)
         category = 'Custom'
         shortcut = None
         validate_item(name, price, barcode, category, shortcut)
-        self._add_to_order(Item(name, price, barcode, category, shortcut))
+        if not self.order_dict:
+            self._switch_between_orders()
+        self._add_to_order(
+            self.catalog.add_custom(name, price, barcode, category, shortcut))
 
     def remove(self, token):
         """Removes an item from the current order.
@@ -197,27 +575,261 @@ class Register(object):
             Token representing the item to remove.
 
         """
-        self._verify_credentials(self.employee, 0)
-        item = self._find_in_order(token)
-        self._remove_from_order(item)
+        self._authorize('remove')
+        item_id = self._find_in_order(token)
+        self._remove_from_order(item_id)
 
     def clear_order(self):
         """Clears the register's order."""
-        self._verify_credentials(self.employee, 0)
+        self._authorize('clear_order')
+        # Wait for a pending restore, which would replace the order
+        catalog = self.catalog
         self.order_dict = OrderedDict()
+        if self.order_log is not None:
+            self.order_log.truncate(catalog)
+        self._publish(OrderCleared)
+        self._switch_between_orders()
 
     def checkout_order(self):
         """Adds order total to register count and logs the transaction."""
-        self._verify_credentials(self.employee, 1)
+        self._authorize('checkout_order')
+        self._mark_checkout()
         self._add_to_register_count(self.order_total)
         self._log_order()
+        self._publish_checkout()
+        self._update_inventory()
         self.clear_order()
 
+    def park_order(self, name):
+        """Parks the current order under a name and clears it.
+
+        Parameters
+        ----------
+        name : str
+            Name under which to park the order.
+
+        Raises
+        ------
+        ValueError
+            If the order is empty or if the name is already taken.
+
+        """
+        self._authorize('park_order')
+        catalog = self.catalog
+        if not self.order_dict:
+            raise ValueError('cannot park an empty order')
+        self.parked_orders.park(name, self.order_dict, catalog)
+        self.logger.info("employee {} parked order '{}'".format(
+            self.employee_name, name))
+        self.clear_order()
+
+    def resume_order(self, name):
+        """Makes a parked order the current order.
+
+        Parameters
+        ----------
+        name : str
+            Name of the parked order.
+
+        Raises
+        ------
+        ValueError
+            If the current order is not empty or if no order is parked under
+            that name.
+
+        """
+        self._authorize('resume_order')
+        catalog = self.catalog
+        if self.order_dict:
+            raise ValueError('cannot resume a parked order while the ' +
+                             'current order is not empty')
+        self.order_dict = self.parked_orders.resume(name, catalog)
+        if self.order_log is not None:
+            self.order_log.write_order(self.order_dict, catalog)
+        self._reset_display()
+        self.logger.info("employee {} resumed order '{}'".format(
+            self.employee_name, name))
+
+    def discard_order(self, name):
+        """Removes a parked order without resuming it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the parked order.
+
+        Raises
+        ------
+        ValueError
+            If no order is parked under that name.
+
+        """
+        self._authorize('discard_order')
+        self.parked_orders.discard(name)
+        self.logger.info("employee {} discarded order '{}'".format(
+            self.employee_name, name))
+
     def order_to_string(self):
         """Returns a string representation of the current order."""
-        self._verify_credentials(self.employee, 0)
-        return '\n'.join('{} x {}'.format(item.name, quantity)
-                         for item, quantity in self.order)
+        self._authorize('order_to_string')
+        names = self.catalog.names
+        lines = ['{} x {}'.format(names[item_id], quantity)
+                 for item_id, quantity in self.order_dict.items()]
+        lines.extend('{} x {}: -{:.2f}$'.format(rule.name, times, discount)
+                     for rule, times, discount in self.pricing.discounts())
+        return '\n'.join(lines)
+
+    def low_stock(self, threshold=0):
+        """Returns the tracked items whose stock is at most a threshold.
+
+        Parameters
+        ----------
+        threshold : :class:`int`, optional
+            Highest stock level considered low. Defaults to 0.
+
+        Returns
+        -------
+        low : :class:`list`
+            ``(level, barcode)`` tuples, from the lowest level. Empty if the
+            register tracks no inventory.
+
+        """
+        self._authorize('low_stock')
+        if self.inventory is None:
+            return []
+        return self.inventory.low_stock(threshold)
+
+    def restock(self, file_path):
+        """Adds the units listed in a stock file to the inventory.
+
+        Parameters
+        ----------
+        file_path : :class:`str`
+            Path to a file of ``barcode|quantity`` lines.
+
+        Raises
+        ------
+        ValueError
+            If the register tracks no inventory or if a line of the file is
+            invalid, in which case no stock level changes.
+
+        """
+        self._authorize('restock')
+        if self.inventory is None:
+            raise ValueError('no inventory file was given')
+        validate_file_path(file_path, 'stock')
+        self.inventory.restock_from_file(file_path)
+        self.logger.info("employee {} restocked from '{}'".format(
+            self.employee_name, file_path))
+
+    def memory_report(self):
+        """Returns a report of the memory used by the register's subsystems.
+
+        If the register was created with ``trace_memory``, the report also
+        shows the peak and retained memory of the catalog's load.
+
+        """
+        self._authorize('memory_report')
+        from .memory import MemoryReport, register_memory
+        return MemoryReport(register_memory(self), self.catalog_load_trace)
+
+    def sales_dashboard(self, top=3):
+        """Returns the sales of the last 15 minutes, the last hour and today.
+
+        Parameters
+        ----------
+        top : :class:`int`, optional
+            Number of best selling items listed. Defaults to 3.
+
+        Returns
+        -------
+        summaries : :class:`OrderedDict`
+            Window name to :class:`WindowSummary` mapping, see
+            :meth:`Dashboard.summaries`.
+
+        """
+        self._authorize('sales_dashboard')
+        return self.dashboard.summaries(top=top)
+
+    def shift_report(self, employee=None, date=None):
+        """Returns shifts, optionally of an employee or of a day.
+
+        Parameters
+        ----------
+        employee : :class:`str`, optional
+            Employee name. Defaults to ``None``, meaning all employees.
+        date : :class:`str`, optional
+            Day the shifts started, as ``'YYYY-MM-DD'``. Defaults to
+            ``None``, meaning all days.
+
+        Returns
+        -------
+        shifts : :class:`list`
+            :class:`Shift` tuples, by start time.
+
+        """
+        self._authorize('shift_report')
+        return self.shifts.shifts(employee, date)
+
+    def on_shift(self, timestamp):
+        """Returns the shifts in progress at a time.
+
+        Parameters
+        ----------
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+
+        """
+        self._authorize('shift_report')
+        return self.shifts.on_shift(timestamp)
+
+    def price_at(self, barcode, timestamp, menu=DEFAULT_PROFILE):
+        """Returns the price of an item at a time, ``None`` if not on sale.
+
+        Parameters
+        ----------
+        barcode : :class:`str`
+            Item barcode.
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+        menu : :class:`str`, optional
+            Menu profile name. Defaults to ``'default'``.
+
+        Raises
+        ------
+        ValueError
+            If catalog versions are not recorded.
+
+        """
+        self._authorize('price_history')
+        if self.catalog_versions is None:
+            raise ValueError('catalog versions are not recorded')
+        return self.catalog_versions.price_at(barcode, timestamp, menu)
+
+    def switch_menu(self, name):
+        """Switches to another menu profile.
+
+        The switch happens right away if the order is empty, and otherwise
+        once the order is checked out, parked or cleared. It lasts until
+        the next scheduled switch, if any.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            Name of the profile, see :attr:`menu_profiles`.
+
+        Raises
+        ------
+        ValueError
+            If no profile has that name.
+
+        """
+        self._authorize('switch_menu')
+        self.catalog
+        if name not in self._profiles:
+            raise ValueError("unknown menu profile '{}'".format(name))
+        self._pending_profile = name
+        self._switch_between_orders()
 
     def count_register(self, count):
         """Counts the register.
@@ -231,8 +843,9 @@ class Register(object):
             Employee register count.
 
         """
-        self._verify_credentials(self.employee, 1)
+        self._authorize('count_register')
         self._log_count(count)
+        self._publish(RegisterCounted, count, self._register_count)
         self.logger.info(
             'employee {} counted the register'.format(self.employee_name))
 
@@ -245,26 +858,46 @@ class Register(object):
             Adjustment amount.
 
         """
-        self._verify_credentials(self.employee, 2)
+        self._authorize('adjust')
         self._adjust_register_count(amount)
+        self._publish(RegisterAdjusted, amount, self._register_count)
+
+    def close_out(self, date=None):
+        """Returns the close-out report of a day.
+
+        Parameters
+        ----------
+        date : :class:`str`, optional
+            Day of the report, as ``'YYYY-MM-DD'``. Defaults to today.
+
+        """
+        # Only managers need the log readers
+        from .closeout import close_out_report
+        self._authorize('close_out')
+        if date is None:
+            date = datetime.date.today().isoformat()
+        return close_out_report(self.log_path, date)
 
     def _find_in_menu(self, token):
-        """Finds an item in the menu."""
-        return self.find_in_list(self.menu, token)
+        """Finds an item id in the menu."""
+        return self.catalog.find(token)
 
     def _find_in_order(self, token):
-        """Finds an item in the order."""
-        return self.find_in_list(list(self.order_dict.keys()), token)
+        """Finds an item id in the order."""
+        catalog = self.catalog
+        try:
+            return next(item_id for item_id in self.order_dict
+                        if catalog.matches(item_id, token))
+        except StopIteration:
+            raise ValueError("item not found with token '{}'".format(token))
 
-    def _verify_credentials(self, employee, authorized_level):
-        """Verifies the credentials of an employee.
+    def _authorize(self, operation):
+        """Verifies that the logged in employee may perform an operation.
 
         Parameters
         ----------
-        employee : Employee
-            Employee to verify.
-        authorized_level : :class:`int`
-            Minimum access-granting level.
+        operation : :class:`str`
+            Operation name, as used in the permission policy.
 
         Raises
         ------
@@ -272,35 +905,40 @@ class Register(object):
             If the employee has unsufficient privileges.
 
         """
-        if employee is None and authorized_level is not None:
-            raise CredentialException(
-                'unauthorized operation while no employee logged in')
-        if employee is not None:
-            if employee.level < authorized_level:
+        if not self._capabilities & self.policy.bits[operation]:
+            if self._employee is None:
                 raise CredentialException(
-                    'insufficient privileges for this operation')
+                    'unauthorized operation while no employee logged in')
+            raise CredentialException(
+                'insufficient privileges for this operation')
 
-    def _add_to_order(self, item):
+    def _add_to_order(self, item_id):
         """Adds an item to the order.
 
         Parameters
         ----------
-        item : Item
-            Item to add.
+        item_id : :class:`int`
+            Catalog id of the item to add.
 
         """
-        if item in self.order_dict:
-            self.order_dict[item] += 1
+        if self.order_log is not None:
+            self.order_log.add(item_id, self.catalog)
+        if item_id in self.order_dict:
+            self.order_dict[item_id] += 1
         else:
-            self.order_dict[item] = 1
+            self.order_dict[item_id] = 1
+        self.pricing.update(item_id, self.order_dict[item_id])
+        if self.events.wants(ItemAdded):
+            self._publish(ItemAdded, self.catalog.item(item_id),
+                          self.order_dict[item_id], item_id)
 
-    def _remove_from_order(self, item):
+    def _remove_from_order(self, item_id):
         """Removes an item from the order.
 
         Parameters
         ----------
-        item : Item
-            Item to remove.
+        item_id : :class:`int`
+            Catalog id of the item to remove.
 
         Raises
         ------
@@ -308,14 +946,189 @@ class Register(object):
             If the item to be removed does not exist in the order.
 
         """
-        if item in self.order_dict:
-            if self.order_dict[item] == 1:
-                del self.order_dict[item]
+        if item_id in self.order_dict:
+            if self.order_log is not None:
+                self.order_log.remove(item_id)
+            if self.order_dict[item_id] == 1:
+                del self.order_dict[item_id]
             else:
-                self.order_dict[item] -= 1
+                self.order_dict[item_id] -= 1
+            self.pricing.update(item_id, self.order_dict.get(item_id, 0))
+            if self.events.wants(ItemRemoved):
+                self._publish(ItemRemoved, self.catalog.item(item_id),
+                              self.order_dict.get(item_id, 0), item_id)
         else:
             raise ItemNotFoundException(
-                "item '{}' not in current order".format(item.name))
+                "item '{}' not in current order".format(
+                    self.catalog.names[item_id]))
+
+    def _load_catalog(self, menu_file_path):
+        """Loads the catalog and restores the unfinished order, if any.
+
+        In lazy mode, this runs on a background thread and the catalog is
+        only published once the order is restored.
+
+        """
+        try:
+            phase_start = time.time()
+            self._pricing_rules = []
+            if self._pricing_file_path is not None:
+                from .pricing import load_pricing_rules
+                self._pricing_rules = load_pricing_rules(
+                    self._pricing_file_path)
+                phase_start = self._time_startup_phase('pricing rules',
+                                                       phase_start)
+            if self._trace_memory:
+                from .memory import trace_load
+                catalog, self.catalog_load_trace = trace_load(
+                    lambda: self._load_menu(menu_file_path))
+            else:
+                catalog = self._load_menu(menu_file_path)
+            self._profiles[DEFAULT_PROFILE] = self._build_profile(
+                DEFAULT_PROFILE, catalog)
+            phase_start = self._time_startup_phase('menu', phase_start)
+            if self._menu_profile_paths:
+                for name, path in self._menu_profile_paths.items():
+                    catalog, _ = self._load_menu_file(path)
+                    self._profiles[name] = self._build_profile(name, catalog)
+                phase_start = self._time_startup_phase('menu profiles',
+                                                       phase_start)
+            profile = self._profiles[DEFAULT_PROFILE]
+            if self._schedule is not None:
+                self._scheduled_profile = self._schedule.profile_at(
+                    time.time())
+                profile = self._profiles[self._scheduled_profile]
+            if self.order_log is not None:
+                profile = self._restore_order(profile)
+                self._time_startup_phase('order log', phase_start)
+            else:
+                profile.pricing.reset(self.order_dict)
+            self._profile = profile
+        except Exception as e:
+            self._catalog_error = e
+        finally:
+            self._catalog_loaded.set()
+        if self._catalog_error is None and self.order_dict:
+            # Show the restored order
+            self._reset_display()
+
+    def close(self):
+        """Releases the register's files, handlers and threads.
+
+        Pending stock changes are flushed. The register must not be used
+        afterwards.
+
+        """
+        if self.display is not None:
+            self.display.close()
+        self.events.close()
+        if self.printer is not None:
+            self.printer.close()
+        self._catalog_loaded.wait()
+        if self.inventory is not None:
+            self.inventory.flush()
+        if self.order_log is not None:
+            self.order_log.close()
+        self.parked_orders.close()
+        if self._shifts is not None:
+            self._shifts.close()
+        if self.archiver is not None:
+            self._transaction_handler.rollover_callbacks.remove(
+                self.archiver.archive_file)
+            # Let a running archive finish with the catalog versions
+            wait_for_compression()
+        if self.catalog_versions is not None:
+            self.catalog_versions.close()
+        if self._count_file is not None:
+            self._count_file.close()
+        for name, log_path in self._loggers:
+            logger_manager.release(name, log_path)
+        self._loggers = []
+
+    def _update_inventory(self):
+        """Removes the checked out order from stock."""
+        if self.inventory is None:
+            return
+        catalog = self.catalog
+        for item_id, quantity in self.order_dict.items():
+            level = self.inventory.remove(catalog.barcodes[item_id], quantity)
+            if level is not None and level < 0:
+                self.logger.warning("item '{}' oversold, stock is {}".format(
+                    catalog.names[item_id], level))
+                self._publish(StockOversold, catalog.item(item_id), level)
+
+    def _publish(self, event_type, *args):
+        """Publishes an event of the logged in employee, if anyone listens.
+
+        Parameters
+        ----------
+        event_type : :class:`type`
+            Event type from :mod:`events`, whose ``time`` and ``employee``
+            fields are filled in.
+
+        Other arguments are the event's remaining fields.
+
+        """
+        if self.events.wants(event_type):
+            self.events.publish(
+                event_type(time.time(), self.employee_name, *args))
+
+    def _publish_checkout(self):
+        """Publishes the checkout of the current order."""
+        if self.events.wants(OrderCheckedOut):
+            self._publish(OrderCheckedOut, self.order, self.order_total)
+
+    def _mark_checkout(self):
+        """Logs the checkout before the register count is updated."""
+        if self.order_log is not None:
+            self.order_log.checkout()
+
+    def _reset_display(self):
+        """Shows a replaced order on the customer displays."""
+        if self.display is not None:
+            self.display.reset(self.order_dict, self.catalog,
+                               self.order_total)
+
+    def _record_shift_checkout(self, event):
+        """Feeds a checkout to the shifts, opening them if needed."""
+        self.shifts.record_checkout(event)
+
+    def _time_startup_phase(self, phase, phase_start):
+        """Records the duration of a startup phase and returns the time."""
+        now = time.time()
+        self.startup_times[phase] = now - phase_start
+        return now
+
+    def _restore_order(self, profile):
+        """Restores the order left in the order log, if any.
+
+        The order is restored with the menu profile it was written with,
+        trying ``profile`` first, and that profile is returned.
+
+        """
+        candidates = [profile] + [other for other in self._profiles.values()
+                                  if other is not profile]
+        order_dict = OrderedDict()
+        for candidate in candidates:
+            try:
+                order_dict = self.order_log.restore(candidate.catalog)
+            except ValueError as e:
+                error = e
+                continue
+            profile = candidate
+            break
+        else:
+            self.logger.warning('unable to restore unfinished order: ' +
+                                str(error))
+        profile.pricing.reset(order_dict)
+        self.order_dict = order_dict
+        if self.order_dict:
+            quantity = sum(self.order_dict.values())
+            self.logger.warning(
+                'restored unfinished order with {} items'.format(quantity))
+        # Compact the log and make it refer to the current catalog
+        self.order_log.write_order(self.order_dict, profile.catalog)
+        return profile
 
     def _load_menu(self, file_path):
         """Loads and returns the menu.
@@ -326,90 +1139,59 @@ class Register(object):
             Path to the menu file.
 
         """
-        menu = []
-        with io.open(file_path, encoding='utf-8') as f:
-            # Read all lines in the file
-            lines = f.readlines()
-            # Strip all lines from trailing white space and carriage returns
-            lines = [line.strip() for line in lines]
-            # Remove empty lines
-            lines = [line for line in lines if line != '']
-            # Split lines into lists of tokens separated by '|' (items)
-            items = [line.split('|') for line in lines]
-
-            # This flag tells whether the file contains errors
-            errors_detected = False
-
-            current_category = 'General'
-            current_default_price = None
-
-            # Loop over items and try to add them to the menu as MenuItem
-            # instances. If errors occur, faulty lines are ignored and the
-            # `errors_detected` flag is raised.
-            for item in items:
-                # Strip all tokens from leading and trailing white space
-                item = [token.strip() for token in item]
-                # Items must have at least two tokens (name and barcode) and at
-                # most four (name, barcode, price and shortcut)
-                if not len(item) in (2, 3, 4):
-                    errors_detected = True
-                    continue
-                # If '#' is the first character of the line, this is a category
-                # command to set a new category and a new default price.
-                if item[0].startswith('#'):
-                    current_category = item[0][1:].strip()
-                    try:
-                        current_default_price = float(item[1])
-                        continue
-                    except ValueError:
-                        errors_detected = True
-                        continue
-                # The third token is always considered as the custom price, and
-                # the fourth one is the shortcut. Items with a shortcut must
-                # therefore have a price set. Items without a custom price must
-                # belong to a category which sets a default price.
-                if len(item) == 2 and current_default_price is None:
-                    errors_detected = True
-                    continue
-                # Parse the actual item
-                if len(item) == 2:
-                    barcode = item[0]
-                    name = item[1]
-                    category = current_category
-                    price = current_default_price
-                    shortcut = None
-                if len(item) == 3:
-                    barcode = item[0]
-                    name = item[1]
-                    category = current_category
-                    try:
-                        price = float(item[2])
-                    except ValueError:
-                        errors_detected = True
-                        continue
-                    shortcut = None
-                if len(item) == 4:
-                    barcode = item[0]
-                    name = item[1]
-                    category = current_category
-                    try:
-                        price = float(item[2])
-                    except ValueError:
-                        errors_detected = True
-                        continue
-                    shortcut = item[3]
-                try:
-                    validate_item(name, price, barcode, category, shortcut)
-                except ValueError:
-                    errors_detected = True
-                    continue
-                menu.append(Item(name, price, barcode, category, shortcut))
-
-        if errors_detected:
-            self.logger.warning('Some lines of the menu contained errors and '
-                                'were ignored')
-
-        return list(set(menu))
+        menu, self.menu_errors = self._load_menu_file(file_path)
+        return menu
+
+    def _load_menu_file(self, file_path):
+        """Loads a menu file and logs its errors."""
+        from .loaders import load_menu
+        menu, errors = load_menu(file_path)
+        if errors:
+            self.logger.warning("Some lines of the menu '{}' contained "
+                                "errors and were ignored".format(file_path))
+        for error in errors:
+            self.logger.warning('menu line {}: {}'.format(
+                error.line_number, error.reason))
+        return menu, errors
+
+    def _build_profile(self, name, catalog):
+        """Builds a menu profile, with its indexes ready for lookups."""
+        from .pricing import PricingEngine
+        pricing = PricingEngine(self._pricing_rules, catalog)
+        for token in pricing.unresolved:
+            self.logger.warning(
+                "pricing rule token '{}' matches no item of menu '{}'".format(
+                    token, name))
+        # Computed now rather than when the order log first needs it
+        catalog.digest()
+        version = None
+        if self.catalog_versions is not None:
+            version = self.catalog_versions.record(name, catalog)
+        return MenuProfile(name, catalog, pricing, version)
+
+    def _switch_between_orders(self):
+        """Applies a pending or scheduled menu switch if the order is empty."""
+        # Wait for a pending restore, which would fill the order
+        self.catalog
+        if self.order_dict:
+            return
+        profile = self._profile
+        name = self._pending_profile
+        self._pending_profile = None
+        if self._schedule is not None:
+            scheduled = self._schedule.profile_at(time.time())
+            if scheduled != self._scheduled_profile:
+                self._scheduled_profile = scheduled
+                name = scheduled
+        if name is None or name == profile.name:
+            return
+        profile = self._profiles[name]
+        profile.pricing.reset(self.order_dict)
+        # A single reference swap, so readers see either menu as a whole
+        self._profile = profile
+        if self.order_log is not None:
+            self.order_log.truncate(profile.catalog)
+        self.logger.info("switched to menu profile '{}'".format(name))
 
     def _load_employees(self, file_path):
         """Loads and returns the employees list.
@@ -420,52 +1202,17 @@ class Register(object):
             Path to the employees file.
 
         """
-        employees_list = []
-
-        with io.open(file_path, encoding='utf-8') as f:
-            # Read all lines in the file
-            lines = f.readlines()
-            # Strip all lines from trailing white space and carriage returns
-            lines = [line.strip() for line in lines]
-            # Remove empty lines
-            lines = [line for line in lines if line != '']
-            # Split lines into lists of tokens separated by '|' (employees)
-            employees = [line.split('|') for line in lines]
-
-            # This flag tells whether the file contains errors
-            errors_detected = False
-
-            # Loop over employees and try to add them to the menu as Employee
-            # instances. If errors occur, faulty lines are ignored and the
-            # `errors_detected` flag is raised.
-            for employee in employees:
-                # Strip all tokens from leading and trailing white space
-                employee = [token.strip() for token in employee]
-                # Employees must have four tokens (name, barcode, permanent
-                # code and employee level)
-                if len(employee) != 4:
-                    errors_detected = True
-                    continue
-                else:
-                    name = employee[0]
-                    barcode = employee[1]
-                    code = employee[2]
-                    try:
-                        level = int(employee[3])
-                        validate_employee(name, barcode, code, level)
-                    except ValueError:
-                        errors_detected = True
-                        continue
-                employees_list.append(Employee(name, barcode, code, level))
-
+        from .loaders import load_employees
+        employees, errors_detected = load_employees(file_path)
         if errors_detected:
             self.logger.warning('Some lines of the employee file contained ' +
                                 'errors and were ignored')
+        return employees
 
-        return list(set(employees_list))
+    def _open_register_count(self, file_path):
+        """Opens and returns the register count.
 
-    def _load_register_count(self, file_path):
-        """Loads and returns the register count.
+        The count is shared with every register using the same file.
 
         Parameters
         ----------
@@ -481,10 +1228,8 @@ class Register(object):
             abs_path = os.path.abspath(file_path)
             self.logger.warning('register count file not found, creating ' +
                                 'one with value 0.0 at '.format(abs_path))
-        else:
-            with io.open(file_path, 'rb') as f:
-                (register_count, ) = struct.unpack('d', f.read(8))
-        return register_count
+        from .shared_count import SharedCount
+        return SharedCount(file_path)
 
     def _adjust_register_count(self, amount):
         """Adjusts the register count.
@@ -500,13 +1245,7 @@ class Register(object):
             self._substract_from_register_count(abs(amount))
         else:
             self._add_to_register_count(amount)
-        new_register_count = self._register_count
-        message = '\n'.join([
-            'Adjustment by {}'.format(self.employee_name),
-            ' Old count: {:.2f}$'.format(old_register_count),
-            ' New count: {:.2f}$'.format(new_register_count),
-            'Difference: {:.2f}$'.format(amount)])
-        self.count_logger.info(message)
+        self._log_adjustment(old_register_count, amount)
 
     def _add_to_register_count(self, amount):
         """Adds an amount to the register count.
@@ -517,8 +1256,7 @@ class Register(object):
             Amount to add.
 
         """
-        self._register_count += amount
-        self._update_register_count()
+        self._count.add(amount)
 
     def _substract_from_register_count(self, amount):
         """Substracts an amount from the register count.
@@ -535,26 +1273,53 @@ class Register(object):
             count.
 
         """
-        count = self._register_count
         # The register amount cannot go negative because it is supposed to
         # represent the quantity of physical money in the register.
-        if amount > count:
+        try:
+            self._count.add(-amount, minimum=0.0)
+        except ValueError:
             raise ValueError(
                 'cannot substract amount ({:.2f}) '.format(amount) +
-                'greater than register count ({:.2f})'.format(count))
-        self._register_count -= amount
-        self._update_register_count()
-
-    def _update_register_count(self):
-        """Writes the register count to file."""
-        with io.open(self.register_count_file_path, 'wb') as f:
-            data = struct.pack('d', self._register_count)
-            f.write(data)
+                'greater than register count ({:.2f})'.format(
+                    self._register_count))
 
     def _log_order(self):
         """Logs a completed order."""
-        self.transaction_logger.info('{}\n'.format(self.employee_name) +
-                                     self.order_to_string())
+        message = [self.employee_name]
+        if self._profile.version is not None:
+            message.append(self._order_references())
+        elif self.order_dict:
+            message.append(self.order_to_string())
+        message.append('Total: {:.2f}$'.format(self.order_total))
+        self.transaction_logger.info('\n'.join(message))
+
+    def _order_references(self):
+        """Returns the order as item ids of the active catalog version.
+
+        Custom items, which are not part of any version, keep their name
+        and price.
+
+        """
+        catalog = self._profile.catalog
+        lines = ['Catalog version: {}'.format(self._profile.version)]
+        for item_id, quantity in self.order_dict.items():
+            if catalog.is_custom(item_id):
+                lines.append('{} x {} @ {:.2f}$'.format(
+                    catalog.names[item_id], quantity, catalog.prices[item_id]))
+            else:
+                lines.append('#{} x {}'.format(item_id, quantity))
+        lines.extend('{} x {}: -{:.2f}$'.format(rule.name, times, discount)
+                     for rule, times, discount in self.pricing.discounts())
+        return '\n'.join(lines)
+
+    def _log_adjustment(self, old_register_count, amount):
+        """Logs a register count adjustment."""
+        message = '\n'.join([
+            'Adjustment by {}'.format(self.employee_name),
+            ' Old count: {:.2f}$'.format(old_register_count),
+            ' New count: {:.2f}$'.format(self._register_count),
+            'Difference: {:.2f}$'.format(amount)])
+        self.count_logger.info(message)
 
     def _log_count(self, count):
         """Logs a register count."""
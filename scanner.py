@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Barcode scanner input."""
+import argparse
+import os
+import select
+import threading
+import time
+
+from six.moves import queue
+
+from .exceptions import CredentialException
+
+# Bytes ending a scanned code
+TERMINATORS = (b'\r', b'\n')
+
+
+class BarcodeScanner(object):
+    """Reads barcodes from a scanner device on a background thread.
+
+    The device must send each code as text followed by a carriage return
+    or a line feed, as serial scanners and USB scanners in serial emulation
+    mode do. Terminal devices are put in raw mode.
+
+    Codes are framed and debounced by the reader thread and put in a
+    bounded queue, from which :meth:`feed` adds them to a register in
+    batches. When the queue is full, the reader stops reading and the
+    device's own buffer holds further scans.
+
+    Parameters
+    ----------
+    device_path : :class:`str`
+        Path to the scanner device.
+    debounce : :class:`float`, optional
+        Seconds during which a repeated code is ignored, since scanners can
+        read a barcode twice. Defaults to 0.3.
+    max_queue_size : :class:`int`, optional
+        Capacity of the queue of scanned codes. Defaults to 256.
+    batch_size : :class:`int`, optional
+        Largest number of codes added to the register by :meth:`feed`.
+        Defaults to 32.
+    max_code_length : :class:`int`, optional
+        Length beyond which unterminated input is discarded as noise.
+        Defaults to 128.
+
+    Attributes
+    ----------
+    scans : :class:`int`
+        Number of codes queued.
+    debounced : :class:`int`
+        Number of repeated codes ignored.
+
+    """
+    def __init__(self, device_path, debounce=0.3, max_queue_size=256,
+                 batch_size=32, max_code_length=128):
+        self.device_path = device_path
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.max_code_length = max_code_length
+        self.scans = 0
+        self.debounced = 0
+        self.codes = queue.Queue(max_queue_size)
+        self._stop = threading.Event()
+        self._reader = None
+        self._fd = None
+        self._last_code = None
+        self._last_code_time = 0.0
+
+    def start(self):
+        """Opens the device and starts the reader thread."""
+        self._fd = os.open(self.device_path, os.O_RDONLY | os.O_NOCTTY)
+        if os.isatty(self._fd):
+            import tty
+            tty.setraw(self._fd)
+        self._stop.clear()
+        self._reader = threading.Thread(target=self._read,
+                                        name='pyplanck-scanner')
+        self._reader.daemon = True
+        self._reader.start()
+
+    def close(self):
+        """Stops the reader thread and closes the device."""
+        self._stop.set()
+        if self._reader is not None:
+            self._reader.join()
+            self._reader = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def feed(self, register, timeout=0):
+        """Adds a batch of scanned codes to a register's order.
+
+        Parameters
+        ----------
+        register : :class:`Register`
+            Register whose :meth:`Register.add` is called with each code.
+        timeout : :class:`float`, optional
+            Seconds to wait for a first code, ``None`` to wait forever.
+            Defaults to 0, meaning only codes already queued are added.
+
+        Returns
+        -------
+        errors : :class:`list`
+            ``(code, exception)`` tuples for the codes which could not be
+            added, e.g. unknown items.
+
+        """
+        errors = []
+        for code in self.get_batch(timeout):
+            try:
+                register.add(code)
+            except (CredentialException, ValueError) as e:
+                errors.append((code, e))
+        return errors
+
+    def get_batch(self, timeout=0):
+        """Returns up to ``batch_size`` queued codes.
+
+        Parameters
+        ----------
+        timeout : :class:`float`, optional
+            Seconds to wait for a first code, ``None`` to wait forever.
+            Defaults to 0.
+
+        """
+        try:
+            if timeout == 0:
+                batch = [self.codes.get_nowait()]
+            else:
+                batch = [self.codes.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.codes.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _read(self):
+        """Frames the device's input into codes until stopped."""
+        buffer_ = b''
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._fd], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._fd, 4096)
+            except OSError:
+                # The device was unplugged or the pseudo-terminal closed
+                break
+            if not data:
+                break
+            buffer_ += data
+            lines = buffer_.replace(b'\r', b'\n').split(b'\n')
+            buffer_ = lines.pop()
+            if len(buffer_) > self.max_code_length:
+                buffer_ = b''
+            for line in lines:
+                self._put(line.strip().decode('ascii', 'replace'))
+
+    def _put(self, code):
+        """Queues a code unless it is empty or a repeated read."""
+        if not code:
+            return
+        now = time.time()
+        if (code == self._last_code and
+                now - self._last_code_time < self.debounce):
+            self.debounced += 1
+            return
+        self._last_code = code
+        self._last_code_time = now
+        while not self._stop.is_set():
+            try:
+                self.codes.put(code, timeout=0.1)
+                self.scans += 1
+                return
+            except queue.Full:
+                continue
+
+
+def measure_throughput(count=10000, batch_size=32, sink=None):
+    """Measures how many scans per second go through a scanner.
+
+    A burst of distinct codes is written to a pseudo-terminal read by a
+    :class:`BarcodeScanner`, and each batch is passed to ``sink``.
+
+    Parameters
+    ----------
+    count : :class:`int`, optional
+        Number of codes in the burst. Defaults to 10000.
+    batch_size : :class:`int`, optional
+        Batch size of the scanner. Defaults to 32.
+    sink : callable, optional
+        Called with each batch of codes, e.g. to add them to a register.
+        Defaults to ``None``, meaning batches are discarded.
+
+    Returns
+    -------
+    scans_per_second : :class:`float`
+
+    """
+    import pty
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    scanner = BarcodeScanner(os.ttyname(slave), batch_size=batch_size)
+    scanner.start()
+    data = b''.join('{:013d}\r\n'.format(i).encode('ascii')
+                    for i in range(count))
+    start = time.time()
+    writer = threading.Thread(target=_write_all, args=(master, data))
+    writer.start()
+    received = 0
+    while received < count:
+        batch = scanner.get_batch(timeout=5)
+        if not batch:
+            break
+        if sink is not None:
+            sink(batch)
+        received += len(batch)
+    elapsed = time.time() - start
+    writer.join()
+    scanner.close()
+    os.close(master)
+    os.close(slave)
+    return received / elapsed
+
+
+def _write_all(fd, data):
+    """Writes all data to a file descriptor."""
+    while data:
+        data = data[os.write(fd, data):]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="measure the throughput of the scanner input pipeline " +
+                    "with a burst of scans on a pseudo-terminal")
+    parser.add_argument("-n", "--count", help="number of scans in the burst",
+                        type=int, default=10000)
+    parser.add_argument("-b", "--batch_size", help="largest number of " +
+                        "codes handled at once", type=int, default=32)
+    args = parser.parse_args()
+    print('{:.0f} scans per second'.format(
+        measure_throughput(args.count, args.batch_size)))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Register count storage."""
+import io
+import mmap
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class Count(object):
+    """Register count held in memory by a single process.
+
+    Parameters
+    ----------
+    value : :class:`float`, optional
+        Initial count. Defaults to 0.0.
+
+    """
+    def __init__(self, value=0.0):
+        self._lock = threading.Lock()
+        self._value = value
+
+    @property
+    def value(self):
+        with self._locked():
+            return self._read()
+
+    def set(self, value):
+        """Replaces the count."""
+        with self._locked():
+            self._write(value)
+
+    def add(self, amount, minimum=None):
+        """Atomically adds an amount to the count and returns the new count.
+
+        Parameters
+        ----------
+        amount : :class:`float`
+            Amount to add, which can be negative.
+        minimum : :class:`float`, optional
+            Lowest count allowed. Defaults to ``None``, meaning no limit.
+
+        Raises
+        ------
+        ValueError
+            If the new count would be lower than ``minimum``. The count is
+            then left unchanged.
+
+        """
+        with self._locked():
+            value = self._read() + amount
+            if minimum is not None and value < minimum:
+                raise ValueError('count cannot go below {}'.format(minimum))
+            self._write(value)
+        return value
+
+    def close(self):
+        """Releases the count's resources."""
+
+    def _locked(self):
+        """Returns a context manager holding the count's lock."""
+        return self._lock
+
+    def _read(self):
+        return self._value
+
+    def _write(self, value):
+        self._value = value
+
+
+class SharedCount(Count):
+    """Register count shared by the processes using the same count file.
+
+    The count file, which holds the count as a native double, is memory
+    mapped, so that every process sees a write as soon as it is made
+    without reading the file again. Updates are serialized across processes
+    by an exclusive lock on the file, where :mod:`fcntl` is available, and
+    across threads by a lock of the instance.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to an existing register count file.
+
+    """
+    def __init__(self, file_path):
+        Count.__init__(self)
+        self.file_path = file_path
+        self._file = io.open(file_path, 'r+b')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 8)
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self):
+        """Unmaps and closes the count file."""
+        if self._file is not None:
+            self._map.close()
+            self._file.close()
+            self._file = None
+
+    def _locked(self):
+        return _FileLock(self._lock, self._file)
+
+    def _read(self):
+        (value, ) = struct.unpack('d', self._map[0:8])
+        return value
+
+    def _write(self, value):
+        self._map[0:8] = struct.pack('d', value)
+
+
+class _FileLock(object):
+    """Holds a thread lock and an exclusive lock on a file."""
+    def __init__(self, lock, f):
+        self.lock = lock
+        self.file = f
+
+    def __enter__(self):
+        self.lock.acquire()
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                self.lock.release()
+                raise
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.lock.release()
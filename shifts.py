@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Employee shifts."""
+import datetime
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+Shift = namedtuple('Shift', 'id employee start end opening_count '
+                            'closing_count orders sales')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY,
+    employee TEXT NOT NULL,
+    date TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL,
+    opening_count REAL NOT NULL,
+    closing_count REAL,
+    orders INTEGER NOT NULL,
+    sales REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shifts_employee ON shifts (employee, date);
+CREATE INDEX IF NOT EXISTS shifts_date ON shifts (date, start);
+"""
+
+_COLUMNS = ('id, employee, start, end, opening_count, closing_count, '
+            'orders, sales')
+
+
+class ShiftLog(object):
+    """Shifts of the employees of a register, stored in SQLite.
+
+    A shift starts when an employee logs in and ends when they log out. Its
+    sales are updated at each checkout. Shifts are indexed by employee and
+    by the date they start on, which is also how shifts in progress at a
+    given time are found, so shifts are expected to last less than a day.
+
+    Only one shift is open at a time. Starting a shift ends the open one,
+    e.g. one left open by a crash.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the database. It is created if it does not exist.
+
+    Attributes
+    ----------
+    current : :class:`Shift`
+        Open shift, ``None`` if no shift is open.
+
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        # Checkouts and logins may come from the scanner's thread
+        self.connection = sqlite3.connect(file_path, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        open_shifts = self._query('end IS NULL ORDER BY start DESC LIMIT 1')
+        self.current = open_shifts[0] if open_shifts else None
+
+    def start(self, employee, opening_count, timestamp=None):
+        """Starts a shift and returns it.
+
+        Parameters
+        ----------
+        employee : :class:`str`
+            Employee name.
+        opening_count : :class:`float`
+            Register count at the start of the shift.
+        timestamp : :class:`float`, optional
+            Start time. Defaults to ``None``, meaning the current time.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if self.current is not None:
+                self._end(opening_count, timestamp)
+            cursor = self.connection.execute(
+                'INSERT INTO shifts (employee, date, start, opening_count, '
+                'orders, sales) VALUES (?, ?, ?, ?, 0, 0)',
+                (employee, _date(timestamp), timestamp, opening_count))
+            self.current = Shift(cursor.lastrowid, employee, timestamp, None,
+                                 opening_count, None, 0, 0.0)
+            return self.current
+
+    def end(self, closing_count, timestamp=None):
+        """Ends the open shift and returns it, ``None`` if none is open.
+
+        Parameters
+        ----------
+        closing_count : :class:`float`
+            Register count at the end of the shift.
+        timestamp : :class:`float`, optional
+            End time. Defaults to ``None``, meaning the current time.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if self.current is None:
+                return None
+            return self._end(closing_count, timestamp)
+
+    def record_checkout(self, event):
+        """Adds a checked out order, from an :class:`OrderCheckedOut` event.
+
+        Meant to be subscribed to a register's :class:`EventBus`.
+
+        """
+        self.add_sale(event.total)
+
+    def add_sale(self, total):
+        """Adds a checked out order to the open shift, if any."""
+        with self._lock:
+            shift = self.current
+            if shift is None:
+                return
+            self.current = shift._replace(orders=shift.orders + 1,
+                                          sales=shift.sales + total)
+            self.connection.execute(
+                'UPDATE shifts SET orders = ?, sales = ? WHERE id = ?',
+                (self.current.orders, self.current.sales, shift.id))
+
+    def shifts(self, employee=None, date=None):
+        """Returns shifts, by start time.
+
+        Parameters
+        ----------
+        employee : :class:`str`, optional
+            Only return this employee's shifts. Defaults to ``None``.
+        date : :class:`str`, optional
+            Only return shifts started on this day, as ``'YYYY-MM-DD'``.
+            Defaults to ``None``.
+
+        """
+        conditions = []
+        parameters = []
+        if employee is not None:
+            conditions.append('employee = ?')
+            parameters.append(employee)
+        if date is not None:
+            conditions.append('date = ?')
+            parameters.append(date)
+        where = ' AND '.join(conditions) if conditions else '1'
+        return self._query(where + ' ORDER BY start', parameters)
+
+    def on_shift(self, timestamp):
+        """Returns the shifts in progress at a time.
+
+        Parameters
+        ----------
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+
+        """
+        day = datetime.date.fromtimestamp(timestamp)
+        dates = ((day - datetime.timedelta(days=1)).isoformat(),
+                 day.isoformat())
+        return self._query(
+            'date IN (?, ?) AND start <= ? AND (end IS NULL OR end > ?) '
+            'ORDER BY start', dates + (timestamp, timestamp))
+
+    def close(self):
+        """Closes the database, leaving the open shift open."""
+        self.connection.close()
+
+    def _end(self, closing_count, timestamp):
+        """Ends the open shift; the lock must be held."""
+        shift = self.current._replace(end=timestamp,
+                                      closing_count=closing_count)
+        self.connection.execute(
+            'UPDATE shifts SET end = ?, closing_count = ?, orders = ?, '
+            'sales = ? WHERE id = ?',
+            (timestamp, closing_count, shift.orders, shift.sales, shift.id))
+        self.current = None
+        return shift
+
+    def _query(self, where, parameters=()):
+        """Returns the shifts matching an SQL condition."""
+        rows = self.connection.execute(
+            'SELECT {} FROM shifts WHERE {}'.format(_COLUMNS, where),
+            parameters)
+        return [Shift(*row) for row in rows]
+
+
+def shifts_to_string(shifts):
+    """Returns a printable report of shifts."""
+    lines = []
+    for shift in shifts:
+        end = 'open' if shift.end is None else _time(shift.end)
+        closing = ('' if shift.closing_count is None else
+                   ', closing count {:.2f}$'.format(shift.closing_count))
+        lines.append(
+            '{} {} - {}: {} orders, {:.2f}$, opening count {:.2f}${}'.format(
+                shift.employee, _time(shift.start), end, shift.orders,
+                shift.sales, shift.opening_count, closing))
+    return '\n'.join(lines)
+
+
+def _date(timestamp):
+    """Returns the local date of a time as ``'YYYY-MM-DD'``."""
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+
+def _time(timestamp):
+    """Formats a time for reports."""
+    return datetime.datetime.fromtimestamp(timestamp).strftime(
+        '%Y-%m-%d %H:%M')
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Startup time measurement."""
+import argparse
+import sys
+import time
+from collections import OrderedDict
+
+
+def measure_startup(lazy=False, **kwargs):
+    """Starts a register and returns the duration of each startup phase.
+
+    Parameters
+    ----------
+    lazy : :class:`bool`, optional
+        Whether to start the register in lazy mode. Defaults to ``False``.
+
+    Other keyword arguments are passed to :class:`Register`.
+
+    Returns
+    -------
+    times : :class:`OrderedDict`
+        Duration in seconds of importing the register module, of each phase
+        reported by :attr:`Register.startup_times`, of constructing the
+        register (``'ready'``, i.e. until the prompt can appear) and of
+        waiting for the catalog and the employees (``'loaded'``). Timing the
+        import is only meaningful the first time it is measured in a
+        process.
+
+    """
+    times = OrderedDict()
+    start = time.time()
+    from .register import Register
+    times['import'] = time.time() - start
+
+    start = time.time()
+    register = Register(lazy=lazy, **kwargs)
+    times['ready'] = time.time() - start
+    register.catalog
+    register.employees
+    times['loaded'] = time.time() - start
+    register.close()
+    for phase, duration in register.startup_times.items():
+        times[phase] = duration
+    return times
+
+
+def startup_times_to_string(times):
+    """Returns the durations of startup phases, one per line, in ms.
+
+    Parameters
+    ----------
+    times : :class:`OrderedDict`
+        Duration in seconds of each phase, e.g. from :func:`measure_startup`
+        or :attr:`Register.startup_times`.
+
+    """
+    return '\n'.join('{:>16}: {:8.2f} ms'.format(phase, 1000 * duration)
+                     for phase, duration in times.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="measure how long each phase of starting a register " +
+                    "takes")
+    parser.add_argument("-m", "--menu_path", help="path to the menu file",
+                        type=str, default="sample_menu.txt")
+    parser.add_argument("-e", "--employees_path", help="path to the " +
+                        "employees file", type=str,
+                        default="sample_employees.txt")
+    parser.add_argument("-r", "--register_count_path", help="path to the " +
+                        "register count file", type=str,
+                        default="sample_register_count.bin")
+    parser.add_argument("-l", "--log_path", help="path to the " +
+                        "directory of log files", type=str,
+                        default="./")
+    parser.add_argument("-o", "--order_log_path", help="path to the " +
+                        "write-ahead log of the current order", type=str,
+                        default=None)
+    parser.add_argument("-p", "--policy_path", help="path to the " +
+                        "permission policy file", type=str, default=None)
+    parser.add_argument("-L", "--lazy", help="start the register in lazy " +
+                        "mode", action="store_true")
+    args = parser.parse_args()
+
+    times = measure_startup(menu_file_path=args.menu_path,
+                            employees_file_path=args.employees_path,
+                            register_count_file_path=args.register_count_path,
+                            log_path=args.log_path,
+                            order_log_file_path=args.order_log_path,
+                            policy_file_path=args.policy_path,
+                            lazy=args.lazy)
+    sys.stdout.write(startup_times_to_string(times) + '\n')
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""Sales sync from tills to a central aggregator."""
+import argparse
+import io
+import json
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import zlib
+
+import six
+from six.moves import socketserver
+
+from .logs import CHAIN_TAG, RECORD_START, iter_records, rotated_log_files
+
+# Logs synced from each till's log directory
+LOGS = ('transactions', 'counts')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    till TEXT NOT NULL,
+    log TEXT NOT NULL,
+    asctime TEXT NOT NULL,
+    sequence INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    UNIQUE (till, log, asctime, sequence)
+);
+CREATE INDEX IF NOT EXISTS records_log_asctime ON records (log, asctime);
+"""
+
+
+def send_message(sock, message):
+    """Sends a JSON-serializable message as a compressed, sized frame."""
+    data = zlib.compress(json.dumps(message).encode('utf-8'))
+    sock.sendall(struct.pack('!I', len(data)) + data)
+
+
+def receive_message(sock):
+    """Receives a message sent by :func:`send_message`.
+
+    Returns ``None`` if the connection was closed between messages.
+
+    """
+    header = _receive_exactly(sock, 4)
+    if header is None:
+        return None
+    (size, ) = struct.unpack('!I', header)
+    data = _receive_exactly(sock, size)
+    if data is None:
+        raise IOError('connection closed in the middle of a message')
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class SyncAgent(object):
+    """Pushes a till's new log records to an aggregator.
+
+    Records are identified by their log, their ``asctime`` and their
+    position among the records sharing that ``asctime``. For each log, the
+    agent persists a cursor holding the last record acknowledged by the
+    aggregator and the offset where the current log file was read up to,
+    so that it sends everything appended since. The current file is
+    recognized by its inode and its first line, as the inodes of deleted
+    rotated files are reused. After a rotation, the
+    rotated files which can hold unsent records are read again, skipping
+    the records up to the last one acknowledged.
+
+    A batch whose acknowledgement is lost is sent again and ignored by the
+    aggregator, so each record is stored exactly once.
+
+    Parameters
+    ----------
+    log_path : :class:`str`
+        Directory of the till's logs.
+    till : :class:`str`
+        Name of the till.
+    address : :class:`tuple`
+        ``(host, port)`` of the aggregator.
+    cursor_file_path : :class:`str`, optional
+        Where to persist the cursors. Defaults to ``'sync_cursor.json'`` in
+        ``log_path``.
+    batch_size : :class:`int`, optional
+        Largest number of records per message. Defaults to 500.
+    timeout : :class:`float`, optional
+        Socket timeout in seconds. Defaults to 10.
+
+    """
+    def __init__(self, log_path, till, address, cursor_file_path=None,
+                 batch_size=500, timeout=10.0):
+        self.log_path = log_path
+        self.till = till
+        self.address = address
+        if cursor_file_path is None:
+            cursor_file_path = os.path.join(log_path, 'sync_cursor.json')
+        self.cursor_file_path = cursor_file_path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.cursors = {}
+        if os.path.isfile(cursor_file_path):
+            with io.open(cursor_file_path, encoding='utf-8') as f:
+                self.cursors = json.load(f)
+
+    def sync(self):
+        """Sends all new records and returns how many were sent.
+
+        Raises
+        ------
+        IOError
+            If the aggregator cannot be reached or does not acknowledge a
+            batch. Batches acknowledged before the error are not sent
+            again.
+
+        """
+        sent = 0
+        sock = None
+        try:
+            while True:
+                batch, cursors = self._next_batch()
+                if not batch:
+                    return sent
+                if sock is None:
+                    sock = socket.create_connection(self.address,
+                                                    self.timeout)
+                send_message(sock, {'till': self.till, 'records': batch})
+                reply = receive_message(sock)
+                if reply is None or reply.get('ack') != len(batch):
+                    raise IOError('batch not acknowledged by aggregator')
+                self.cursors.update(cursors)
+                self._save_cursors()
+                sent += len(batch)
+        except socket.error as e:
+            raise IOError(str(e))
+        finally:
+            if sock is not None:
+                sock.close()
+
+    def run(self, interval=30.0, stop=None):
+        """Syncs every ``interval`` seconds until ``stop`` is set.
+
+        Connection errors are ignored, so that a till keeps working offline
+        and catches up once the aggregator is reachable.
+
+        Parameters
+        ----------
+        interval : :class:`float`, optional
+            Seconds between syncs. Defaults to 30.
+        stop : :class:`threading.Event`, optional
+            Event stopping the loop. Defaults to ``None``, meaning the loop
+            never stops.
+
+        """
+        if stop is None:
+            stop = threading.Event()
+        while not stop.is_set():
+            try:
+                self.sync()
+            except (IOError, OSError):
+                pass
+            stop.wait(interval)
+
+    def _next_batch(self):
+        """Returns the next records to send and the cursors after them."""
+        batch = []
+        cursors = {}
+        for log in LOGS:
+            for asctime, sequence, message, cursor in self._pending(log):
+                if len(batch) == self.batch_size:
+                    return batch, cursors
+                batch.append([log, asctime, sequence, message])
+                cursors[log] = cursor
+        return batch, cursors
+
+    def _pending(self, log):
+        """Yields ``(asctime, sequence, message, cursor)`` of new records."""
+        file_path = os.path.join(self.log_path, log + '.log')
+        cursor = self.cursors.get(log, {})
+        last = tuple(cursor['last']) if 'last' in cursor else None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            stat = None
+        head = None
+        if stat is not None and cursor.get('inode') == stat.st_ino:
+            # Inodes of deleted rotated files are reused by new files
+            head = _first_line(file_path)
+        if (head is not None and cursor.get('head') == head and
+                cursor.get('offset', 0) <= stat.st_size):
+            # The current file was not rotated since the last sync
+            rotated_records = []
+            offset = cursor['offset']
+            previous = last
+        else:
+            files = rotated_log_files(file_path)
+            if last is not None:
+                # A rotated file only holds records up to the day in its
+                # suffix
+                prefix_length = len(os.path.basename(file_path)) + 1
+                files = [path for path in files
+                         if os.path.basename(path)[prefix_length:] >=
+                         last[0][:10]]
+            rotated_records = iter_records(files)
+            offset = 0
+            previous = None
+        for asctime, message in rotated_records:
+            key = _next_key(previous, asctime)
+            previous = key
+            if last is None or key > last:
+                # The current file must be read again from the start
+                yield key + (message, {'last': list(key)})
+        if stat is None:
+            return
+        # Records of the current file past the offset were never sent, even
+        # if the clock stepped back since the last one
+        for asctime, message, end in _read_records(file_path, offset):
+            if head is None:
+                head = _first_line(file_path)
+            key = _next_key(previous, asctime)
+            previous = key
+            yield key + (message, {'inode': stat.st_ino, 'head': head,
+                                   'offset': end, 'last': list(key)})
+
+    def _save_cursors(self):
+        """Writes the cursors to disk atomically."""
+        tmp_path = self.cursor_file_path + '.tmp'
+        with io.open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(json.dumps(self.cursors, sort_keys=True)))
+            f.flush()
+            os.fsync(f.fileno())
+        # A crash never leaves a partially written cursor
+        os.rename(tmp_path, self.cursor_file_path)
+
+
+class Aggregator(object):
+    """Merges the log records of all tills into an indexed SQLite store.
+
+    Parameters
+    ----------
+    database_file_path : :class:`str`
+        Path to the store. It is created if it does not exist.
+    address : :class:`tuple`, optional
+        ``(host, port)`` to listen on. Defaults to ``('127.0.0.1', 0)``,
+        meaning a free local port, see :attr:`address`.
+
+    """
+    def __init__(self, database_file_path, address=('127.0.0.1', 0)):
+        self.database_file_path = database_file_path
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.server = _Server(address, _SyncHandler)
+        self.server.aggregator = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def serve_forever(self):
+        """Handles agents until :meth:`close` is called."""
+        self.server.serve_forever()
+
+    def start(self):
+        """Handles agents on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='pyplanck-aggregator')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops handling agents."""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+
+    def store(self, till, records, connection=None):
+        """Stores records, ignoring those already stored.
+
+        Parameters
+        ----------
+        till : :class:`str`
+            Name of the till the records come from.
+        records : :class:`list`
+            ``[log, asctime, sequence, message]`` lists.
+
+        Returns
+        -------
+        stored : :class:`int`
+            Number of new records.
+
+        """
+        close = connection is None
+        if connection is None:
+            connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            before = connection.total_changes
+            connection.executemany(
+                'INSERT OR IGNORE INTO records '
+                '(till, log, asctime, sequence, message) '
+                'VALUES (?, ?, ?, ?, ?)',
+                ((till, ) + tuple(record) for record in records))
+            stored = connection.total_changes - before
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            if close:
+                connection.close()
+        return stored
+
+    def records(self, log, start=None, end=None):
+        """Returns the records of a log from all tills, in time order.
+
+        Parameters
+        ----------
+        log : :class:`str`
+            Log name, one of :data:`LOGS`.
+        start : :class:`str`, optional
+            Earliest ``asctime``, inclusive. Defaults to ``None``.
+        end : :class:`str`, optional
+            Latest ``asctime``, exclusive. Defaults to ``None``.
+
+        Returns
+        -------
+        records : :class:`list`
+            ``(asctime, till, message)`` tuples.
+
+        """
+        query = 'SELECT asctime, till, message FROM records WHERE log = ?'
+        parameters = [log]
+        if start is not None:
+            query += ' AND asctime >= ?'
+            parameters.append(start)
+        if end is not None:
+            query += ' AND asctime < ?'
+            parameters.append(end)
+        query += ' ORDER BY asctime, till, sequence'
+        connection = self._connect()
+        try:
+            return connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def _connect(self):
+        """Opens a connection to the store."""
+        connection = sqlite3.connect(self.database_file_path,
+                                     isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _SyncHandler(socketserver.BaseRequestHandler):
+    """Stores the batches sent by an agent and acknowledges them."""
+    def handle(self):
+        aggregator = self.server.aggregator
+        connection = aggregator._connect()
+        try:
+            while True:
+                message = receive_message(self.request)
+                if message is None:
+                    return
+                aggregator.store(message['till'], message['records'],
+                                 connection)
+                send_message(self.request, {'ack': len(message['records'])})
+        except (IOError, socket.error, ValueError, zlib.error):
+            # A broken batch is not acknowledged and will be sent again
+            return
+        finally:
+            connection.close()
+
+
+def _next_key(previous, asctime):
+    """Returns the ``(asctime, sequence)`` key of a record."""
+    if previous is not None and previous[0] == asctime:
+        return (asctime, previous[1] + 1)
+    return (asctime, 0)
+
+
+def _first_line(file_path):
+    """Returns the first line of a log file, identifying it."""
+    with io.open(file_path, 'rb') as f:
+        return f.readline(256).decode('utf-8', 'replace')
+
+
+def _read_records(file_path, offset):
+    """Yields ``(asctime, message, end offset)`` from an offset of a log.
+
+    A record followed by a line without line ending is still being written
+    and is left for the next read.
+
+    """
+    with io.open(file_path, 'rb') as f:
+        f.seek(offset)
+        asctime = None
+        lines = []
+        end = position = offset
+        while True:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            text = line.decode('utf-8').rstrip(u'\r\n')
+            match = RECORD_START.match(text)
+            if match:
+                if asctime is not None:
+                    yield asctime, u'\n'.join(lines), end
+                asctime = match.group(0)
+                rest = CHAIN_TAG.sub(u'', text[match.end():]).strip()
+                lines = [rest] if rest else []
+            elif asctime is not None:
+                lines.append(text)
+            position += len(line)
+            end = position
+        if asctime is not None and not line:
+            yield asctime, u'\n'.join(lines), end
+
+
+def _receive_exactly(sock, size):
+    """Receives exactly ``size`` bytes, ``None`` if closed before any."""
+    chunks = []
+    received = 0
+    while received < size:
+        chunk = sock.recv(size - received)
+        if not chunk:
+            if received == 0:
+                return None
+            raise IOError('connection closed in the middle of a message')
+        chunks.append(chunk)
+        received += len(chunk)
+    return b''.join(chunks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="sync till logs to a central aggregator")
+    subparsers = parser.add_subparsers(dest="command")
+    agent_parser = subparsers.add_parser("agent", help="push this till's " +
+                                         "logs to an aggregator")
+    agent_parser.add_argument("-l", "--log_path", help="path to the " +
+                              "directory of log files", type=str,
+                              default="./")
+    agent_parser.add_argument("-t", "--till", help="name of the till",
+                              type=str, default=socket.gethostname())
+    agent_parser.add_argument("-H", "--host", help="aggregator host",
+                              type=str, default="127.0.0.1")
+    agent_parser.add_argument("-p", "--port", help="aggregator port",
+                              type=int, default=8765)
+    agent_parser.add_argument("-i", "--interval", help="seconds between " +
+                              "syncs", type=float, default=30.0)
+    aggregator_parser = subparsers.add_parser("aggregator", help="merge " +
+                                              "the logs of all tills")
+    aggregator_parser.add_argument("-d", "--database_path", help="path to " +
+                                   "the merged store", type=str,
+                                   default="sales.db")
+    aggregator_parser.add_argument("-H", "--host", help="address to " +
+                                   "listen on", type=str, default="0.0.0.0")
+    aggregator_parser.add_argument("-p", "--port", help="port to listen on",
+                                   type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "agent":
+        agent = SyncAgent(args.log_path, args.till, (args.host, args.port))
+        agent.run(args.interval)
+    else:
+        aggregator = Aggregator(args.database_path, (args.host, args.port))
+        aggregator.serve_forever()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Tests for the columnar transaction archive."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal
+
+from pyplanck.archive import (CUSTOM_ITEM, DISCOUNT, TransactionArchiver,
+                              load_archive)
+from pyplanck.catalog import Catalog
+from pyplanck.versions import CatalogVersions
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RECORDS = (u'2016-01-01 10:00:00,000\nAdmin\nCatalog version: 1\n#0 x 2\n'
+           u'tip x 1 @ 0.50$\nTotal: 2.00$\n'
+           u'2016-01-01 11:00:00,250\nEmployee\nGum x 1\nTotal: 0.75$\n'
+           u'2016-01-02 09:00:00,000\nEmployee\nCatalog version: 1\n'
+           u'#1 x 3\nGum deal x 1: -0.25$\nTotal: 2.00$\n')
+
+
+class TestTransactionArchiver(object):
+    def setUp(self):
+        if numpy is None:
+            raise SkipTest('NumPy is not installed')
+        self.tempdir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tempdir, 'transactions.log')
+        self.archive_path = os.path.join(self.tempdir, 'archive')
+        self.versions = CatalogVersions(
+            os.path.join(self.tempdir, 'catalog_versions.db'))
+        catalog = Catalog()
+        catalog.add('Chocolate bar', 0.75, '001')
+        catalog.add('Gum', 0.75, '002')
+        self.versions.record('default', catalog, 0.0)
+        self.archiver = TransactionArchiver(self.archive_path, self.versions)
+        with io.open(self.log_path + '.2016-01-02', 'w',
+                     encoding='utf-8') as f:
+            f.write(RECORDS)
+
+    def tearDown(self):
+        self.versions.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_archives_each_day(self):
+        dates = self.archiver.archive_log(self.log_path)
+        assert_equal(dates, ['2016-01-01', '2016-01-02'])
+        first, second = load_archive(self.archive_path)
+        assert_equal(first.manifest['rows'], 2)
+        assert_equal(first.manifest['orders'], 1)
+        assert_equal(first.manifest['skipped'], 1)
+        assert_equal(first.manifest['cents'], 200)
+        assert_equal(list(first['item_ids']), [0, CUSTOM_ITEM])
+        assert_equal(list(first['quantities']), [2, 1])
+        assert_equal(list(first['cents']), [150, 50])
+        assert_equal(first.employees, ['Admin'])
+        assert_equal(list(second['item_ids']), [1, DISCOUNT])
+        assert_equal(list(second['cents']), [225, -25])
+        assert_equal(second.employees, ['Employee'])
+        assert_equal(list(second['employee_ids']), [0, 0])
+
+    def test_columns_are_memory_mapped(self):
+        self.archiver.archive_log(self.log_path)
+        day = load_archive(self.archive_path)[0]
+        assert isinstance(day['timestamps'], numpy.memmap)
+        assert_equal(day['timestamps'][1] - day['timestamps'][0], 0.0)
+
+    def test_archived_days_are_skipped(self):
+        self.archiver.archive_log(self.log_path)
+        assert_equal(self.archiver.archive_log(self.log_path), [])
+
+    def test_load_date_range(self):
+        self.archiver.archive_log(self.log_path)
+        days = load_archive(self.archive_path, start='2016-01-02')
+        assert_equal([day.date for day in days], ['2016-01-02'])
+        days = load_archive(self.archive_path, end='2016-01-01')
+        assert_equal([day.date for day in days], ['2016-01-01'])
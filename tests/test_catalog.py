@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Tests for Catalog class."""
+from nose.tools import raises, assert_equal
+
+from pyplanck.catalog import Catalog
+from pyplanck.immutables import Item
+
+
+class TestCatalog(object):
+    def setUp(self):
+        self.catalog = Catalog()
+        self.catalog.add('Chocolate bar', 1.0, '001', 'Candy')
+        self.catalog.add('Gum', 0.75, '002', 'Candy')
+        self.catalog.add('Hot chocolate', 0.5, '003', 'Beverage', 'hc')
+
+    def test_ids_follow_insertion_order(self):
+        assert_equal(self.catalog.find('001'), 0)
+        assert_equal(self.catalog.find('003'), 2)
+
+    def test_find_by_shortcut(self):
+        assert_equal(self.catalog.find('hc'), 2)
+
+    @raises(ValueError)
+    def test_find_raises_exception_on_nonexistent_item(self):
+        self.catalog.find('nothing')
+
+    def test_item(self):
+        assert_equal(self.catalog.item(2),
+                     Item('Hot chocolate', 0.5, '003', 'Beverage', 'hc'))
+
+    def test_categories_are_stored_once(self):
+        assert_equal(self.catalog.categories, ['Candy', 'Beverage'])
+        assert_equal(list(self.catalog.category_ids), [0, 0, 1])
+
+    def test_first_item_keeps_token(self):
+        self.catalog.add('Other gum', 0.8, '002', 'Candy')
+        assert_equal(self.catalog.find('002'), 1)
+
+    def test_custom_items_are_not_indexed(self):
+        self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        assert_equal('custom_gum' in self.catalog, False)
+        assert_equal(len(list(self.catalog)), 3)
+
+    def test_custom_items_are_deduplicated(self):
+        first = self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        second = self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        assert_equal(first, second)
+
+    def test_is_custom(self):
+        item_id = self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        assert_equal(self.catalog.is_custom(item_id), True)
+        assert_equal(self.catalog.is_custom(0), False)
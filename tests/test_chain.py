@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Tests for hash-chained logs."""
+import io
+import logging
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from pyplanck.chain import (GENESIS, HashChainHandler, checkpoints_file_path,
+                            iter_chained_records, load_checkpoints,
+                            verify_file, verify_log)
+from pyplanck.logs import iter_records
+
+KEY = b'secret'
+
+
+class TestHashChain(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tempdir, 'transactions.log')
+        self.handler = self.make_handler()
+
+    def tearDown(self):
+        self.handler.close()
+        shutil.rmtree(self.tempdir)
+
+    def make_handler(self, delay=False):
+        handler = HashChainHandler(self.log_path, KEY, compress=False,
+                                   delay=delay)
+        handler.setFormatter(logging.Formatter('%(asctime)s\n%(message)s'))
+        return handler
+
+    def log(self, message):
+        self.handler.handle(logging.LogRecord(
+            'pyplanck.test', logging.INFO, __file__, 0, message, None, None))
+
+    def rotate(self):
+        self.handler.doRollover()
+        return [name for name in os.listdir(self.tempdir)
+                if name.startswith('transactions.log.2')][0]
+
+    def edit(self, file_path, old, new):
+        with io.open(file_path, encoding='utf-8') as f:
+            text = f.read()
+        with io.open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text.replace(old, new))
+
+    def test_records_are_chained(self):
+        self.log(u'Admin\nGum x 1')
+        self.log(u'Admin\nTea x 2')
+        assert_equal(verify_file(self.log_path, GENESIS), [])
+        tags = [tag for _, tag, _ in iter_chained_records(self.log_path)]
+        assert_equal(len(set(tags)), 2)
+
+    def test_readers_ignore_hashes(self):
+        self.log(u'Admin\nGum x 1')
+        assert_equal([record.message for record in
+                      iter_records([self.log_path])], [u'Admin\nGum x 1'])
+
+    def test_edited_record_is_detected(self):
+        self.log(u'Admin\nGum x 1')
+        self.log(u'Admin\nTea x 2')
+        self.handler.close()
+        self.edit(self.log_path, u'Gum x 1', u'Gum x 9')
+        errors = verify_file(self.log_path, GENESIS)
+        assert_equal(len(errors), 1)
+        assert 'record 1' in errors[0]
+
+    def test_removed_record_is_detected(self):
+        self.log(u'Admin\nGum x 1')
+        self.log(u'Admin\nTea x 2')
+        self.handler.close()
+        with io.open(self.log_path, encoding='utf-8') as f:
+            lines = f.readlines()
+        with io.open(self.log_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines[2:])
+        assert_equal(len(verify_file(self.log_path, GENESIS)), 1)
+
+    def test_chain_continues_after_restart(self):
+        self.log(u'Admin\nGum x 1')
+        self.handler.close()
+        self.handler = self.make_handler()
+        self.log(u'Admin\nTea x 2')
+        assert_equal(verify_log(self.log_path, KEY), [])
+
+    def test_delayed_chain_continues_on_first_record(self):
+        self.log(u'Admin\nGum x 1')
+        self.handler.close()
+        self.handler = self.make_handler(delay=True)
+        assert not self.handler._resumed
+        self.log(u'Admin\nTea x 2')
+        assert_equal(verify_log(self.log_path, KEY), [])
+
+    def test_rotation_writes_checkpoint(self):
+        self.log(u'Admin\nGum x 1')
+        self.log(u'Admin\nTea x 2')
+        rotated_name = self.rotate()
+        self.log(u'Admin\nGum x 3')
+        checkpoints = load_checkpoints(self.log_path)
+        assert_equal(len(checkpoints), 1)
+        assert_equal(rotated_name, 'transactions.log.' +
+                     checkpoints[0].suffix)
+        assert_equal(checkpoints[0].first, GENESIS)
+        assert_equal(checkpoints[0].count, 2)
+        assert_equal(verify_log(self.log_path, KEY), [])
+        assert_equal(verify_log(self.log_path, KEY, processes=2), [])
+
+    def test_edited_rotated_file_is_detected(self):
+        self.log(u'Admin\nGum x 1')
+        rotated_name = self.rotate()
+        self.log(u'Admin\nGum x 3')
+        self.edit(os.path.join(self.tempdir, rotated_name), u'Gum x 1',
+                  u'Gum x 9')
+        errors = verify_log(self.log_path, KEY)
+        assert_equal(len(errors), 1)
+        assert errors[0].startswith(rotated_name)
+
+    def test_forged_checkpoint_is_detected(self):
+        self.log(u'Admin\nGum x 1')
+        self.rotate()
+        assert_equal(verify_log(self.log_path, KEY), [])
+        assert_equal(len(verify_log(self.log_path, b'other key')), 1)
+        self.edit(checkpoints_file_path(self.log_path), u'|1|', u'|2|')
+        errors = verify_log(self.log_path, KEY)
+        assert_equal(len(errors), 2)
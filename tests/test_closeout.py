@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Tests for the close-out report defined in `closeout.py`."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from pyplanck.closeout import Discrepancy, close_out_report
+
+OLD_TRANSACTIONS = u'2016-01-01 18:00:00,000\nAdmin\nGum x 1\nTotal: 0.75$\n'
+TRANSACTIONS = (u'2016-01-02 09:00:00,000\nAdmin\nGum x 2\nTotal: 1.50$\n'
+                u'2016-01-02 10:00:00,000\nEmployee\nChocolate bar x 1\n'
+                u'Total: 1.00$\n'
+                u'2016-01-02 12:00:00,000\nEmployee\nTotal: 0.00$\n')
+COUNTS = (u'2016-01-02 08:00:00,000\nCount by Admin\n'
+          u'Employee count: 10.00$\nRegister count: 10.00$\n'
+          u'      Mismatch: 0.00$\n'
+          u'2016-01-02 11:00:00,000\nAdjustment by Admin\n'
+          u' Old count: 12.50$\n New count: 11.50$\nDifference: -1.00$\n'
+          u'2016-01-02 13:00:00,000\nCount by Employee\n'
+          u'Employee count: 11.00$\nRegister count: 12.00$\n'
+          u'      Mismatch: -1.00$\n'
+          u'2016-01-03 08:00:00,000\nCount by Admin\n'
+          u'Employee count: 12.00$\nRegister count: 12.00$\n'
+          u'      Mismatch: 0.00$\n')
+
+
+class TestCloseOutReport(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        transactions_path = os.path.join(self.tempdir, 'transactions.log')
+        with io.open(transactions_path + '.2016-01-01', 'w') as f:
+            f.write(OLD_TRANSACTIONS)
+        with io.open(transactions_path, 'w') as f:
+            f.write(TRANSACTIONS)
+        with io.open(os.path.join(self.tempdir, 'counts.log'), 'w') as f:
+            f.write(COUNTS)
+        self.report = close_out_report(self.tempdir, '2016-01-02')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_totals(self):
+        assert_equal(self.report.transactions, 3)
+        assert_equal(self.report.sales, 2.5)
+        assert_equal(self.report.adjustments, -1.0)
+        assert_equal(self.report.counts, 2)
+        assert_equal(self.report.opening_count, 10.0)
+        assert_equal(self.report.closing_count, 12.0)
+
+    def test_discrepancies(self):
+        assert_equal(self.report.discrepancies, [
+            Discrepancy('2016-01-02 13:00:00,000', 'Employee',
+                        'unexplained change', 0.5),
+            Discrepancy('2016-01-02 13:00:00,000', 'Employee',
+                        'count mismatch', -1.0)])
+
+    def test_employee_breakdown(self):
+        admin = self.report.employees['Admin']
+        employee = self.report.employees['Employee']
+        assert_equal((admin.transactions, admin.sales, admin.adjustments,
+                      admin.counts), (1, 1.5, -1.0, 1))
+        assert_equal((employee.transactions, employee.sales,
+                      employee.counts, employee.count_mismatch),
+                     (2, 1.0, 1, -1.0))
+
+    def test_to_string(self):
+        assert_equal(self.report.to_string().split('\n')[0],
+                     'Close-out for 2016-01-02')
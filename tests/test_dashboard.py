@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Tests for rolling sales aggregates."""
+import time
+from collections import OrderedDict
+
+from nose.tools import assert_equal
+
+from pyplanck.dashboard import (Dashboard, DailyTotals, RollingWindow,
+                                WindowSummary, summaries_to_string)
+
+# Noon, so that a few hours either way stay on the same day
+NOON = time.mktime((2016, 1, 1, 12, 0, 0, 0, 0, -1))
+
+
+class TestRollingWindow(object):
+    def setUp(self):
+        self.window = RollingWindow(600, 10)
+
+    def test_sums_sales_in_window(self):
+        self.window.add_sale(NOON, 150, [('Gum', 2)])
+        self.window.add_sale(NOON + 30, 100, [('Gum', 1), ('Tea', 1)])
+        assert_equal(self.window.summary(NOON + 60),
+                     WindowSummary(2, 2.5, 4, [('Gum', 3), ('Tea', 1)]))
+
+    def test_expires_old_buckets(self):
+        self.window.add_sale(NOON, 150, [('Gum', 2)])
+        self.window.add_sale(NOON + 300, 100, [('Tea', 1)])
+        assert_equal(self.window.summary(NOON + 660),
+                     WindowSummary(1, 1.0, 1, [('Tea', 1)]))
+        assert_equal(self.window.summary(NOON + 960),
+                     WindowSummary(0, 0.0, 0, []))
+
+    def test_covers_at_least_span(self):
+        self.window.add_sale(NOON, 150, [('Gum', 2)])
+        assert_equal(self.window.summary(NOON + 600 + 59).orders, 1)
+        assert_equal(self.window.summary(NOON + 660).orders, 0)
+
+    def test_expires_everything_after_long_pause(self):
+        self.window.add_sale(NOON, 150, [('Gum', 2)])
+        self.window.add_sale(NOON + 7200, 100, [('Tea', 1)])
+        assert_equal(self.window.summary(NOON + 7200),
+                     WindowSummary(1, 1.0, 1, [('Tea', 1)]))
+
+    def test_ignores_sales_older_than_window(self):
+        self.window.summary(NOON + 3600)
+        self.window.add_sale(NOON, 150, [('Gum', 2)])
+        assert_equal(self.window.summary(NOON + 3600).orders, 0)
+
+    def test_no_rounding_error_accumulates(self):
+        for second in range(100):
+            self.window.add_sale(NOON + second, 10, [('Gum', 1)])
+        assert_equal(self.window.summary(NOON + 1200).revenue, 0.0)
+
+
+class TestDailyTotals(object):
+    def test_resets_at_midnight(self):
+        totals = DailyTotals()
+        totals.add_sale(NOON, 150, [('Gum', 2)])
+        assert_equal(totals.summary(NOON + 3600).orders, 1)
+        assert_equal(totals.summary(NOON + 86400).orders, 0)
+        totals.add_sale(NOON, 150, [('Gum', 2)])
+        assert_equal(totals.summary(NOON + 86400).orders, 0)
+
+
+class TestDashboard(object):
+    def setUp(self):
+        self.dashboard = Dashboard()
+
+    def test_windows(self):
+        self.dashboard.add_sale(NOON - 3000, 2.0, [('Gum', 2)])
+        self.dashboard.add_sale(NOON, 1.25, [('Tea', 1)])
+        summaries = self.dashboard.summaries(NOON + 60)
+        assert_equal(summaries['15 min'].revenue, 1.25)
+        assert_equal(summaries['1 h'].revenue, 3.25)
+        assert_equal(summaries['today'].revenue, 3.25)
+
+    def test_top_items(self):
+        self.dashboard.add_sale(NOON, 4.0, [('Gum', 2), ('Tea', 3),
+                                            ('Candy', 1)])
+        assert_equal(self.dashboard.summaries(NOON, top=2)['1 h'].top_items,
+                     [('Tea', 3), ('Gum', 2)])
+
+    def test_to_string(self):
+        summaries = OrderedDict([('1 h', WindowSummary(2, 3.25, 3,
+                                                       [('Gum', 2)]))])
+        assert_equal(summaries_to_string(summaries),
+                     '     1 h: 3.25$, 2 orders, 3 items\n          Gum x 2')
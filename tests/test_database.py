@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Tests for the SQLite storage backend."""
+import io
+import os
+import time
+import logging
+import shutil
+import tempfile
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.database import Database, SQLiteRegister
+from pyplanck.immutables import Item, Employee
+
+# No logging for unit tests
+logging.disable(logging.CRITICAL)
+
+
+class TestSQLiteRegister(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        menu_path = os.path.join(self.tempdir, 'menu.txt')
+        employees_path = os.path.join(self.tempdir, 'employees.txt')
+        self.database_path = os.path.join(self.tempdir, 'register.db')
+        with io.open(menu_path, 'w') as f:
+            f.write(u'#Candy|1.00\n001|Chocolate bar\n002|Gum|0.75\n' +
+                    u'#Beverage|0.50\n003|Hot chocolate|0.50|hc\n')
+        with io.open(employees_path, 'w') as f:
+            f.write(u'Admin|2222|admin|2\nEmployee|1111|employee|1\n' +
+                    u'Guest|0000|guest|0\n')
+        database = Database(self.database_path)
+        database.import_files(menu_path, employees_path, 11.5)
+        database.close()
+        self.register = SQLiteRegister(self.database_path, self.tempdir)
+
+    def tearDown(self):
+        self.register.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_database_uses_wal(self):
+        (mode, ) = self.register.database.connection.execute(
+            'PRAGMA journal_mode').fetchone()
+        assert_equal(mode, 'wal')
+
+    def test_reads_menu(self):
+        correct_menu = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
+                        Item('Gum', 0.75, '002', 'Candy', None),
+                        Item('Hot chocolate', 0.5, '003', 'Beverage', 'hc')]
+        assert_equal(set(self.register.menu), set(correct_menu))
+
+    def test_reads_employees_list(self):
+        correct_employees = [Employee('Admin', '2222', 'admin', 2),
+                             Employee('Employee', '1111', 'employee', 1),
+                             Employee('Guest', '0000', 'guest', 0)]
+        assert_equal(set(self.register.employees), set(correct_employees))
+
+    def test_reads_register_count(self):
+        assert_equal(self.register._register_count, 11.5)
+
+    def test_checkout_order(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.add('002')
+        self.register.add('002')
+        self.register.checkout_order()
+        assert_equal(self.register._register_count, 14.0)
+        assert_equal(self.register.database.register_count(), 14.0)
+        assert_equal(self.register.database.sales_by_item(0, time.time() + 1),
+                     [('001', 'Chocolate bar', 1, 1.0),
+                      ('002', 'Gum', 2, 1.5)])
+        assert_equal(
+            self.register.database.sales_by_employee(0, time.time() + 1),
+            [('Admin', 1, 2.5)])
+
+    def test_adjust(self):
+        self.register.login_employee('admin')
+        self.register.adjust(-1.5)
+        assert_equal(self.register._register_count, 10.0)
+        assert_equal(self.register.database.register_count(), 10.0)
+
+    @raises(ValueError)
+    def test_adjust_rejects_negative_register_count(self):
+        self.register.login_employee('admin')
+        self.register.adjust(-12)
+
+    def test_count_is_journaled(self):
+        self.register.login_employee('admin')
+        self.register.count_register(11.0)
+        row = self.register.database.connection.execute(
+            'SELECT kind, employee, amount, balance FROM count_journal '
+            'ORDER BY id DESC LIMIT 1').fetchone()
+        assert_equal(row, ('count', 'Admin', 11.0, 11.5))
+
+    def test_state_persists(self):
+        self.register.login_employee('admin')
+        self.register.add('hc')
+        self.register.checkout_order()
+        self.register.close()
+        self.register = SQLiteRegister(self.database_path, self.tempdir)
+        assert_equal(self.register._register_count, 12.0)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Tests for customer displays."""
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equal
+
+from pyplanck.catalog import Catalog
+from pyplanck.display import DisplayClient, DisplayServer
+from pyplanck.events import (EventBus, ItemAdded, ItemRemoved,
+                             OrderCheckedOut, OrderCleared)
+from pyplanck.immutables import Item
+
+GUM = Item('Gum', 0.75, '002', 'Candy', None)
+TEA = Item('Tea', 1.5, '004', 'Beverage', None)
+ITEM_IDS = {GUM: 1, TEA: 3}
+
+
+class FakeRegister(object):
+    def __init__(self):
+        self.events = EventBus()
+        self.order_total = 0.0
+
+
+class TestDisplayClient(object):
+    def setUp(self):
+        self.client = DisplayClient('unused')
+
+    def test_applies_deltas(self):
+        self.client.apply(['snapshot', [[1, 'Gum', 1, 0.75]], 0.75])
+        self.client.apply(['set', 3, 'Tea', 2, 1.5])
+        self.client.apply(['del', 1])
+        self.client.apply(['total', 3.0])
+        assert_equal(list(self.client.lines.items()), [(3, ['Tea', 2, 1.5])])
+        assert_equal(self.client.total, 3.0)
+
+    def test_checkout_and_clear(self):
+        self.client.apply(['set', 1, 'Gum', 1, 0.75])
+        self.client.apply(['total', 0.75])
+        self.client.apply(['checkout', 0.75])
+        self.client.apply(['clear'])
+        assert_equal(self.client.to_string(),
+                     'Total: 0.00$\nPaid: 0.75$ - Thank you!')
+        self.client.apply(['set', 1, 'Gum', 1, 0.75])
+        assert_equal(self.client.paid, None)
+
+
+class TestDisplayServer(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tempdir, 'display.sock')
+        self.register = FakeRegister()
+        self.server = DisplayServer(self.register, self.socket_path)
+        self.client = self.connect()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        shutil.rmtree(self.tempdir)
+
+    def connect(self):
+        client = DisplayClient(self.socket_path)
+        client.connect()
+        client._sock.settimeout(5)
+        # Wait for the server to accept the display
+        deadline = time.time() + 5
+        while self.server.display_count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        return client
+
+    def receive_until(self, client, condition):
+        while not condition():
+            client.receive()
+
+    def add(self, item, quantity, total, item_id=None):
+        if item_id is None:
+            item_id = ITEM_IDS[item]
+        self.register.order_total = total
+        self.register.events.publish(ItemAdded(time.time(), None, item,
+                                               quantity, item_id))
+
+    def test_streams_order_changes(self):
+        self.add(GUM, 1, 0.75)
+        self.add(GUM, 2, 1.5)
+        self.add(TEA, 1, 3.0)
+        self.register.order_total = 1.5
+        self.register.events.publish(ItemRemoved(time.time(), None, GUM, 0,
+                                                 ITEM_IDS[GUM]))
+        self.receive_until(self.client, lambda: self.client.total == 1.5)
+        assert_equal(list(self.client.lines.items()), [(3, ['Tea', 1, 1.5])])
+
+    def test_custom_items_with_the_same_name_are_distinct(self):
+        self.add(Item('tip', 0.5, 'custom_tip', 'Custom', None), 1, 0.5, 5)
+        self.add(Item('tip', 1.0, 'custom_tip', 'Custom', None), 1, 1.5, 6)
+        self.receive_until(self.client, lambda: self.client.total == 1.5)
+        assert_equal(list(self.client.lines.items()),
+                     [(5, ['tip', 1, 0.5]), (6, ['tip', 1, 1.0])])
+
+    def test_checkout_then_clear(self):
+        self.add(GUM, 1, 0.75)
+        self.register.events.publish(OrderCheckedOut(time.time(), None,
+                                                     ((GUM, 1),), 0.75))
+        self.register.events.publish(OrderCleared(time.time(), None))
+        self.receive_until(self.client, lambda: self.client.paid == 0.75 and
+                           not self.client.lines)
+        assert_equal(self.client.total, 0.0)
+
+    def test_reconnected_display_gets_snapshot(self):
+        self.add(GUM, 2, 1.5)
+        self.receive_until(self.client, lambda: self.client.total == 1.5)
+        self.client.close()
+        self.add(TEA, 1, 3.0)
+        client = self.connect()
+        try:
+            self.receive_until(client, lambda: client.total == 3.0)
+            assert_equal(list(client.lines.items()),
+                         [(1, ['Gum', 2, 0.75]), (3, ['Tea', 1, 1.5])])
+        finally:
+            client.close()
+
+    def test_burst_coalesces_into_snapshot(self):
+        self.server.close()
+        self.client.close()
+        self.server = DisplayServer(self.register, self.socket_path,
+                                    max_pending=4)
+        self.client = self.connect()
+        for quantity in range(1, 101):
+            self.add(GUM, quantity, 0.75 * quantity)
+        self.receive_until(self.client, lambda: self.client.total == 75.0)
+        assert_equal(list(self.client.lines.items()),
+                     [(1, ['Gum', 100, 0.75])])
+
+    def test_reset(self):
+        catalog = Catalog()
+        catalog.add('Chocolate bar', 1.0, '001', 'Candy')
+        catalog.add('Gum', 0.75, '002', 'Candy')
+        self.server.reset({1: 3}, catalog, 2.25)
+        self.receive_until(self.client, lambda: self.client.total == 2.25)
+        assert_equal(list(self.client.lines.items()), [(1, ['Gum', 3, 0.75])])
+
+    def test_close_removes_socket(self):
+        self.server.close()
+        assert_equal(os.path.exists(self.socket_path), False)
+        # Reopened for tearDown
+        self.server = DisplayServer(self.register, self.socket_path)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Tests for the in-process event bus."""
+import threading
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.events import (EventBus, EmployeeLoggedIn, ItemAdded,
+                             OrderCleared)
+
+
+class TestEventBus(object):
+    def setUp(self):
+        self.bus = EventBus()
+        self.received = []
+
+    def tearDown(self):
+        self.bus.close()
+
+    def test_synchronous_subscriber(self):
+        self.bus.subscribe(self.received.append)
+        event = OrderCleared(0.0, 'Admin')
+        self.bus.publish(event)
+        assert_equal(self.received, [event])
+
+    def test_subscriber_only_receives_its_event_types(self):
+        self.bus.subscribe(self.received.append, [OrderCleared])
+        self.bus.publish(EmployeeLoggedIn(0.0, 'Admin'))
+        assert_equal(self.received, [])
+        assert not self.bus.wants(EmployeeLoggedIn)
+        assert self.bus.wants(OrderCleared)
+
+    def test_failing_subscriber_does_not_break_publisher(self):
+        def fail(event):
+            raise RuntimeError('subscriber failure')
+        self.bus.subscribe(fail)
+        self.bus.subscribe(self.received.append)
+        self.bus.publish(OrderCleared(0.0, 'Admin'))
+        assert_equal(len(self.received), 1)
+
+    def test_asynchronous_subscriber(self):
+        self.bus.subscribe(self.received.append, asynchronous=True)
+        events = [ItemAdded(0.0, 'Admin', None, i, 0) for i in range(100)]
+        for event in events:
+            self.bus.publish(event)
+        self.bus.join()
+        assert_equal(self.received, events)
+
+    def test_unsubscribe(self):
+        subscription = self.bus.subscribe(self.received.append)
+        self.bus.unsubscribe(subscription)
+        self.bus.publish(OrderCleared(0.0, 'Admin'))
+        assert_equal(self.received, [])
+
+    def check_drop_policy(self, policy, expected_quantities):
+        release = threading.Event()
+
+        def slow(event):
+            release.wait()
+            self.received.append(event.quantity)
+        subscription = self.bus.subscribe(slow, asynchronous=True,
+                                          max_queue_size=2, policy=policy)
+        self.bus.publish(ItemAdded(0.0, 'Admin', None, 0, 0))
+        # Wait for the worker to be blocked on the first event
+        while subscription._queue.qsize():
+            pass
+        for quantity in range(1, 5):
+            self.bus.publish(ItemAdded(0.0, 'Admin', None, quantity, 0))
+        release.set()
+        self.bus.join()
+        assert_equal(self.received, expected_quantities)
+        assert_equal(subscription.dropped, 2)
+
+    def test_drop_newest_policy(self):
+        self.check_drop_policy('drop_newest', [0, 1, 2])
+
+    def test_drop_oldest_policy(self):
+        self.check_drop_policy('drop_oldest', [0, 3, 4])
+
+    @raises(ValueError)
+    def test_rejects_unknown_policy(self):
+        self.bus.subscribe(self.received.append, policy='unknown')
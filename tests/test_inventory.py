@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Tests for stock levels."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.inventory import Inventory, load_stock
+
+
+class TestInventory(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'stock.txt')
+        with io.open(self.file_path, 'w') as f:
+            f.write(u'001|10\n002|3\n003|0\n')
+        self.inventory = Inventory(self.file_path, batch_size=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def read_stock(self):
+        return load_stock(self.file_path)
+
+    def test_loads_stock_file(self):
+        assert_equal(self.inventory.levels, {'001': 10, '002': 3, '003': 0})
+
+    def test_remove(self):
+        assert_equal(self.inventory.remove('001', 4), 6)
+        assert_equal(self.inventory.level('001'), 6)
+
+    def test_remove_ignores_untracked_items(self):
+        assert_equal(self.inventory.remove('004', 1), None)
+        assert '004' not in self.inventory
+
+    def test_changes_are_flushed_in_batches(self):
+        self.inventory.remove('001', 1)
+        self.inventory.remove('001', 1)
+        assert_equal(self.read_stock()['001'], 10)
+        self.inventory.remove('001', 1)
+        assert_equal(self.read_stock()['001'], 7)
+
+    def test_changes_are_flushed_after_interval(self):
+        self.inventory.flush_interval = 0
+        self.inventory.remove('002', 1)
+        assert_equal(self.read_stock()['002'], 2)
+
+    def test_flush(self):
+        self.inventory.remove('002', 1)
+        self.inventory.flush()
+        assert_equal(self.read_stock(), {'001': 10, '002': 2, '003': 0})
+
+    def test_low_stock(self):
+        assert_equal(self.inventory.low_stock(3), [(0, '003'), (3, '002')])
+        self.inventory.remove('001', 9)
+        self.inventory.remove('002', 1)
+        self.inventory.restock({'003': 5})
+        assert_equal(self.inventory.low_stock(3), [(1, '001'), (2, '002')])
+        assert_equal(self.inventory.low_stock(1), [(1, '001')])
+
+    def test_low_stock_ignores_stale_entries(self):
+        for i in range(100):
+            self.inventory.remove('001', 1)
+            self.inventory.restock({'001': 1})
+        assert_equal(self.inventory.low_stock(10), [(0, '003'), (3, '002'),
+                                                    (10, '001')])
+
+    def test_restock_from_file(self):
+        restock_path = os.path.join(self.tempdir, 'restock.txt')
+        with io.open(restock_path, 'w') as f:
+            f.write(u'002|5\n004|2\n002|1\n')
+        self.inventory.restock_from_file(restock_path)
+        assert_equal(self.inventory.levels,
+                     {'001': 10, '002': 9, '003': 0, '004': 2})
+
+    @raises(ValueError)
+    def test_restock_rejects_invalid_file(self):
+        restock_path = os.path.join(self.tempdir, 'restock.txt')
+        with io.open(restock_path, 'w') as f:
+            f.write(u'002|5\n004|two\n')
+        try:
+            self.inventory.restock_from_file(restock_path)
+        finally:
+            assert_equal(self.inventory.level('002'), 3)
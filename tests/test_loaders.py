@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Tests for the file loading functions defined in `loaders.py`."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from pyplanck.loaders import MenuError, load_menu
+
+MENU = (u'#Candy|1.00\n'
+        u'001|Chocolate bar\n'
+        u'002|Gum|0.75\n'
+        u'\n'
+        u'004|Lollipop|free\n'
+        u'#Beverage|0.50\n'
+        u'003|Hot chocolate|0.50|hc\n'
+        u'005\n'
+        u'#Misc|none\n'
+        u'006|Napkin\n'
+        u'007|Cup|0.10\n'
+        u'007|Cup|0.10\n')
+
+
+class TestLoadMenu(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.menu_path = os.path.join(self.tempdir, 'menu.txt')
+        with io.open(self.menu_path, 'w') as f:
+            f.write(MENU)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_reads_items(self):
+        menu, _ = load_menu(self.menu_path)
+        assert_equal([tuple(item) for item in menu], [
+            ('Chocolate bar', 1.0, '001', 'Candy', None),
+            ('Gum', 0.75, '002', 'Candy', None),
+            ('Hot chocolate', 0.5, '003', 'Beverage', 'hc'),
+            ('Napkin', 0.5, '006', 'Misc', None),
+            ('Cup', 0.1, '007', 'Misc', None)])
+
+    def test_reports_errors_by_line(self):
+        _, errors = load_menu(self.menu_path)
+        assert_equal(errors, [
+            MenuError(5, '004|Lollipop|free', 'invalid price'),
+            MenuError(8, '005', 'expected 2 to 4 fields, got 1'),
+            MenuError(9, '#Misc|none', 'invalid category default price')])
+
+    def test_chunks_give_same_result(self):
+        menu, errors = load_menu(self.menu_path)
+        for chunk_size in (1, 2, 5):
+            chunked_menu, chunked_errors = load_menu(
+                self.menu_path, processes=1, chunk_size=chunk_size)
+            assert_equal(list(chunked_menu), list(menu))
+            assert_equal(chunked_errors, errors)
+
+    def test_process_pool_gives_same_result(self):
+        menu, errors = load_menu(self.menu_path)
+        pooled_menu, pooled_errors = load_menu(
+            self.menu_path, processes=2, chunk_size=3)
+        assert_equal(list(pooled_menu), list(menu))
+        assert_equal(pooled_errors, errors)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Tests for log rotation and reading functions defined in `logs.py`."""
+import gzip
+import io
+import os
+import shutil
+import logging
+import tempfile
+
+from nose.tools import assert_equal
+
+from pyplanck.chain import HashChainHandler
+from pyplanck.logs import (CompressingTimedRotatingFileHandler, LogRecord,
+                           LoggerManager, iter_records, log_files,
+                           rotated_log_files, wait_for_compression)
+
+RECORD = u'2016-01-01 10:00:00,000\nAdmin\nGum x 1\n'
+
+
+class TestLogs(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tempdir, 'transactions.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, file_path, text):
+        if file_path.endswith('.gz'):
+            with gzip.open(file_path, 'wb') as f:
+                f.write(text.encode('utf-8'))
+        else:
+            with io.open(file_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+    def make_handler(self, **kwargs):
+        handler = CompressingTimedRotatingFileHandler(self.log_path, **kwargs)
+        handler.setFormatter(logging.Formatter('%(asctime)s\n%(message)s'))
+        return handler
+
+    def test_rotated_log_files_are_sorted(self):
+        for suffix in ('2016-01-02', '2016-01-01.gz', '2016-01-03.gz'):
+            self.write(self.log_path + '.' + suffix, RECORD)
+        self.write(os.path.join(self.tempdir, 'counts.log.2016-01-01'),
+                   RECORD)
+        assert_equal([os.path.basename(path)
+                      for path in rotated_log_files(self.log_path)],
+                     ['transactions.log.2016-01-01.gz',
+                      'transactions.log.2016-01-02',
+                      'transactions.log.2016-01-03.gz'])
+
+    def test_iter_records_reads_compressed_and_plain_files(self):
+        self.write(self.log_path + '.2016-01-01.gz', RECORD)
+        self.write(self.log_path,
+                   RECORD.replace(u'10:00', u'11:00') +
+                   u'2016-01-01 12:00:00,000 - INFO - logged out\n')
+        assert_equal(list(iter_records(log_files(self.log_path))), [
+            LogRecord(u'2016-01-01 10:00:00,000', u'Admin\nGum x 1'),
+            LogRecord(u'2016-01-01 11:00:00,000', u'Admin\nGum x 1'),
+            LogRecord(u'2016-01-01 12:00:00,000', u'- INFO - logged out')])
+
+    def test_rollover_compresses_rotated_file(self):
+        handler = self.make_handler()
+        handler.emit(logging.makeLogRecord({'msg': 'Admin\nGum x 1'}))
+        handler.doRollover()
+        wait_for_compression()
+        handler.close()
+        rotated = rotated_log_files(self.log_path)
+        assert_equal(len(rotated), 1)
+        assert_equal(rotated[0].endswith('.gz'), True)
+        records = list(iter_records(rotated))
+        assert_equal([record.message for record in records],
+                     [u'Admin\nGum x 1'])
+
+    def test_rollover_applies_retention(self):
+        for suffix in ('2016-01-01.gz', '2016-01-02.gz', '2016-01-03'):
+            self.write(self.log_path + '.' + suffix, RECORD)
+        handler = self.make_handler(backup_count=2, compress=False)
+        handler.doRollover()
+        wait_for_compression()
+        handler.close()
+        rotated = rotated_log_files(self.log_path)
+        assert_equal(len(rotated), 2)
+        assert_equal(rotated[0], self.log_path + '.2016-01-03')
+
+
+    def test_rollover_calls_callbacks_with_rotated_file(self):
+        rotated = []
+        handler = self.make_handler()
+        handler.rollover_callbacks.append(rotated.append)
+        handler.emit(logging.makeLogRecord({'msg': 'Admin\nGum x 1'}))
+        handler.doRollover()
+        wait_for_compression()
+        handler.close()
+        assert_equal(rotated, rotated_log_files(self.log_path))
+
+
+class TestLoggerManager(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tempdir, 'events.log')
+        self.manager = LoggerManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_handlers_are_shared(self):
+        first = self.manager.acquire('test.first', self.log_path,
+                                     '%(message)s')
+        second = self.manager.acquire('test.second', self.log_path,
+                                      '%(message)s')
+        assert_equal(self.manager.handler_count(), 1)
+        assert first.handlers[0] is second.handlers[0]
+        self.manager.release('test.first', self.log_path)
+        self.manager.release('test.second', self.log_path)
+
+    def test_handler_is_found_by_path(self):
+        logger = self.manager.acquire('test.path', self.log_path,
+                                      '%(message)s')
+        assert self.manager.handler(self.log_path) is logger.handlers[0]
+        self.manager.release('test.path', self.log_path)
+        assert_equal(self.manager.handler(self.log_path), None)
+
+    def test_logger_is_attached_once(self):
+        for i in range(3):
+            logger = self.manager.acquire('test.once', self.log_path,
+                                          '%(message)s')
+        assert_equal(len(logger.handlers), 1)
+        for i in range(3):
+            self.manager.release('test.once', self.log_path)
+        assert_equal(logger.handlers, [])
+
+    def test_release_closes_unused_handlers(self):
+        self.manager.acquire('test.first', self.log_path, '%(message)s')
+        logger = self.manager.acquire('test.second', self.log_path,
+                                      '%(message)s')
+        self.manager.release('test.first', self.log_path)
+        assert_equal(self.manager.handler_count(), 1)
+        assert_equal(len(logger.handlers), 1)
+        self.manager.release('test.second', self.log_path)
+        assert_equal(self.manager.handler_count(), 0)
+        assert_equal(logger.handlers, [])
+
+    def test_only_logs_with_key_are_chained(self):
+        plain = self.manager.acquire('test.plain', self.log_path,
+                                     '%(message)s')
+        chained_path = os.path.join(self.tempdir, 'transactions.log')
+        chained = self.manager.acquire('test.chained', chained_path,
+                                       '%(message)s', key=b'secret')
+        assert not isinstance(plain.handlers[0], HashChainHandler)
+        assert isinstance(chained.handlers[0], HashChainHandler)
+        self.manager.release('test.plain', self.log_path)
+        self.manager.release('test.chained', chained_path)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Tests for memory footprint reports."""
+import io
+import os
+import struct
+import sys
+import logging
+import shutil
+import tempfile
+from array import array
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal
+
+from pyplanck.memory import MemoryReport, deep_size, trace_load, tracemalloc
+from pyplanck.register import Register
+
+# No logging for unit tests
+logging.disable(logging.CRITICAL)
+
+
+class TestDeepSize(object):
+    def test_counts_referenced_objects(self):
+        values = array('d', [1.0] * 100)
+        container = {'values': values}
+        assert deep_size(container) >= (sys.getsizeof(container) +
+                                         sys.getsizeof(values))
+
+    def test_counts_shared_objects_once(self):
+        values = array('d', [1.0] * 100)
+        seen = set()
+        deep_size([values], seen)
+        assert deep_size([values], seen) < sys.getsizeof(values)
+
+    def test_handles_cycles(self):
+        cycle = []
+        cycle.append(cycle)
+        assert_equal(deep_size(cycle), sys.getsizeof(cycle))
+
+
+class TestTraceLoad(object):
+    def test_trace_load(self):
+        if tracemalloc is None:
+            raise SkipTest('tracemalloc is not available')
+        result, trace = trace_load(lambda: [0.5 * i for i in range(10000)])
+        assert_equal(len(result), 10000)
+        assert trace.retained > 0
+        assert trace.peak >= trace.retained
+        assert not tracemalloc.is_tracing()
+
+
+class TestRegisterMemoryReport(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        menu_path = os.path.join(self.tempdir, 'menu.txt')
+        employees_path = os.path.join(self.tempdir, 'employees.txt')
+        count_path = os.path.join(self.tempdir, 'register_count.bin')
+        with io.open(menu_path, 'w') as f:
+            f.write(u'#Candy|1.00\n001|Chocolate bar\n002|Gum|0.75\n')
+        with io.open(employees_path, 'w') as f:
+            f.write(u'Admin|2222|admin|2\n')
+        with io.open(count_path, 'wb') as f:
+            f.write(struct.pack('d', 11.5))
+        self.register = Register(menu_path, employees_path, count_path,
+                                 self.tempdir, trace_memory=True)
+        self.register.login_employee('admin')
+
+    def tearDown(self):
+        self.register.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_reports_subsystems(self):
+        report = self.register.memory_report()
+        assert_equal(list(report.subsystems),
+                     ['catalog', 'employees', 'order', 'loggers', 'other'])
+        assert report.subsystems['catalog'] > 0
+        assert 'catalog' in report.to_string()
+
+    def test_reports_catalog_load(self):
+        if tracemalloc is None:
+            raise SkipTest('tracemalloc is not available')
+        report = self.register.memory_report()
+        assert report.catalog_load.peak > 0
+        assert 'Catalog load:' in report.to_string()
+
+    def test_report_without_catalog_load(self):
+        report = MemoryReport(self.register.memory_report().subsystems)
+        assert 'Catalog load:' not in report.to_string()
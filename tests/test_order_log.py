@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Tests for OrderLog class."""
+import io
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.catalog import Catalog
+from pyplanck.order_log import OrderLog
+
+
+class TestOrderLog(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'order.log')
+        self.catalog = self.make_catalog()
+        self.order_log = OrderLog(self.file_path)
+        self.order_log.truncate(self.catalog)
+
+    def tearDown(self):
+        self.order_log.close()
+        shutil.rmtree(self.tempdir)
+
+    @staticmethod
+    def make_catalog():
+        catalog = Catalog()
+        catalog.add('Chocolate bar', 1.0, '001', 'Candy')
+        catalog.add('Gum', 0.75, '002', 'Candy')
+        return catalog
+
+    def restore(self):
+        self.order_log.close()
+        return OrderLog(self.file_path).restore(self.make_catalog())
+
+    def test_restore_missing_log(self):
+        order_log = OrderLog(os.path.join(self.tempdir, 'missing.log'))
+        assert_equal(order_log.restore(self.catalog), OrderedDict())
+
+    def test_restore_replays_mutations(self):
+        self.order_log.add(1, self.catalog)
+        self.order_log.add(0, self.catalog)
+        self.order_log.add(1, self.catalog)
+        self.order_log.remove(0)
+        assert_equal(self.restore(), OrderedDict([(1, 2)]))
+
+    def test_truncate_empties_order(self):
+        self.order_log.add(1, self.catalog)
+        self.order_log.truncate(self.catalog)
+        assert_equal(self.restore(), OrderedDict())
+
+    def test_write_order(self):
+        order_dict = OrderedDict([(1, 3), (0, 1)])
+        self.order_log.write_order(order_dict, self.catalog)
+        assert_equal(self.restore(), order_dict)
+
+    def test_checked_out_order_is_not_restored(self):
+        self.order_log.add(1, self.catalog)
+        self.order_log.checkout()
+        assert_equal(self.restore(), OrderedDict())
+
+    def test_restore_custom_items(self):
+        item_id = self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        self.order_log.add(item_id, self.catalog)
+        self.order_log.add(item_id, self.catalog)
+        catalog = self.make_catalog()
+        self.order_log.close()
+        order_dict = OrderLog(self.file_path).restore(catalog)
+        assert_equal([(catalog.row(i), q) for i, q in order_dict.items()],
+                     [(('gum', 0.47, 'custom_gum', 'Custom', None), 2)])
+
+    def test_restore_custom_items_with_separators(self):
+        name = u'tab\tnew\nline\\t\r'
+        item_id = self.catalog.add_custom(name, 0.5, u'custom_' + name,
+                                          'Custom')
+        self.order_log.add(item_id, self.catalog)
+        catalog = self.make_catalog()
+        self.order_log.close()
+        order_dict = OrderLog(self.file_path).restore(catalog)
+        assert_equal([(catalog.row(i), q) for i, q in order_dict.items()],
+                     [((name, 0.5, u'custom_' + name, 'Custom', None), 1)])
+
+    def test_restore_ignores_interrupted_record(self):
+        self.order_log.add(1, self.catalog)
+        self.order_log.close()
+        with io.open(self.file_path, 'a', encoding='utf-8') as f:
+            f.write(u'+\t0')
+        assert_equal(self.restore(), OrderedDict([(1, 1)]))
+
+    @raises(ValueError)
+    def test_restore_rejects_different_menu(self):
+        self.order_log.add(1, self.catalog)
+        self.order_log.close()
+        catalog = self.make_catalog()
+        catalog.add('Hot chocolate', 0.5, '003', 'Beverage', 'hc')
+        OrderLog(self.file_path).restore(catalog)
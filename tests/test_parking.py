@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Tests for ParkedOrders class."""
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.catalog import Catalog
+from pyplanck.parking import ParkedOrders
+
+
+class TestParkedOrders(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'parked_orders')
+        self.catalog = Catalog()
+        self.catalog.add('Chocolate bar', 1.0, '001', 'Candy')
+        self.catalog.add('Gum', 0.75, '002', 'Candy')
+        self.parked_orders = ParkedOrders(self.file_path)
+
+    def tearDown(self):
+        self.parked_orders.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_park_and_resume(self):
+        order_dict = OrderedDict([(1, 2), (0, 1)])
+        self.parked_orders.park('table', order_dict, self.catalog)
+        assert_equal(self.parked_orders.resume('table', self.catalog),
+                     order_dict)
+
+    def test_resume_removes_parked_order(self):
+        self.parked_orders.park('table', OrderedDict([(0, 1)]), self.catalog)
+        self.parked_orders.resume('table', self.catalog)
+        assert_equal('table' in self.parked_orders, False)
+
+    def test_parked_orders_persist(self):
+        self.parked_orders.park('table', OrderedDict([(0, 1)]), self.catalog)
+        self.parked_orders.close()
+        parked_orders = ParkedOrders(self.file_path)
+        assert_equal(parked_orders.names, ['table'])
+        parked_orders.close()
+
+    def test_custom_items_are_restored(self):
+        item_id = self.catalog.add_custom('gum', 0.47, 'custom_gum', 'Custom')
+        self.parked_orders.park('table', OrderedDict([(item_id, 3)]),
+                                self.catalog)
+        catalog = Catalog()
+        catalog.add('Chocolate bar', 1.0, '001', 'Candy')
+        catalog.add('Gum', 0.75, '002', 'Candy')
+        order_dict = self.parked_orders.resume('table', catalog)
+        assert_equal([(catalog.row(i), q) for i, q in order_dict.items()],
+                     [(('gum', 0.47, 'custom_gum', 'Custom', None), 3)])
+
+    @raises(ValueError)
+    def test_resume_rejects_removed_items(self):
+        self.parked_orders.park('table', OrderedDict([(0, 1)]), self.catalog)
+        catalog = Catalog()
+        catalog.add('Gum', 0.75, '002', 'Candy', 'g')
+        try:
+            self.parked_orders.resume('table', catalog)
+        finally:
+            assert 'table' in self.parked_orders
+
+    def test_resume_with_different_menu(self):
+        self.parked_orders.park('table', OrderedDict([(1, 2), (0, 1)]),
+                                self.catalog)
+        catalog = Catalog()
+        catalog.add('Hot chocolate', 0.5, '003', 'Beverage', 'hc')
+        catalog.add('Gum', 0.8, '002', 'Candy', 'g')
+        catalog.add('Chocolate bar', 1.0, '001', 'Candy', 'cb')
+        order_dict = self.parked_orders.resume('table', catalog)
+        assert_equal(order_dict, OrderedDict([(1, 2), (2, 1)]))
+
+    def test_discard(self):
+        self.parked_orders.park('table', OrderedDict([(0, 1)]), self.catalog)
+        self.parked_orders.discard('table')
+        assert_equal(self.parked_orders.names, [])
+
+    @raises(ValueError)
+    def test_discard_rejects_unknown_name(self):
+        self.parked_orders.discard('table')
+
+    @raises(ValueError)
+    def test_park_rejects_taken_name(self):
+        self.parked_orders.park('table', OrderedDict([(0, 1)]), self.catalog)
+        self.parked_orders.park('table', OrderedDict([(1, 1)]), self.catalog)
+
+    @raises(ValueError)
+    def test_resume_rejects_unknown_name(self):
+        self.parked_orders.resume('table', self.catalog)
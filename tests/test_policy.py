@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Tests for Policy class."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.policy import DEFAULT_LEVELS, Policy
+
+
+class TestPolicy(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.policy_path = os.path.join(self.tempdir, 'policy.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, text):
+        with io.open(self.policy_path, 'w') as f:
+            f.write(text)
+
+    def allowed(self, policy, level):
+        capabilities = policy.capabilities(level)
+        return set(operation for operation, bit in policy.bits.items()
+                   if capabilities & bit)
+
+    def test_default_policy(self):
+        policy = Policy()
+        assert_equal(self.allowed(policy, 0),
+                     set(operation for operation, level
+                         in DEFAULT_LEVELS.items() if level == 0))
+        assert_equal(self.allowed(policy, 2), set(DEFAULT_LEVELS))
+
+    def test_bits_are_distinct(self):
+        policy = Policy()
+        assert_equal(len(set(policy.bits.values())), len(DEFAULT_LEVELS))
+
+    def test_from_file_with_roles(self):
+        self.write(u'@treasurer|3\n\nadjust|treasurer\nadd_custom|0\n')
+        policy = Policy.from_file(self.policy_path)
+        assert_equal(policy.levels['adjust'], 3)
+        assert_equal(policy.levels['add_custom'], 0)
+        assert_equal('adjust' in self.allowed(policy, 2), False)
+        assert_equal('adjust' in self.allowed(policy, 3), True)
+
+    @raises(ValueError)
+    def test_from_file_rejects_unknown_operation(self):
+        self.write(u'ajust|2\n')
+        Policy.from_file(self.policy_path)
+
+    @raises(ValueError)
+    def test_from_file_rejects_unknown_role(self):
+        self.write(u'adjust|treasurer\n')
+        Policy.from_file(self.policy_path)
+
+    @raises(ValueError)
+    def test_from_file_rejects_negative_level(self):
+        self.write(u'adjust|-1\n')
+        Policy.from_file(self.policy_path)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Tests for pricing rules."""
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import raises, assert_equal, assert_almost_equal
+
+from pyplanck.catalog import Catalog
+from pyplanck.pricing import PricingEngine, PricingRule, load_pricing_rules
+
+
+class TestLoadPricingRules(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'pricing.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def load(self, text):
+        with io.open(self.file_path, 'w') as f:
+            f.write(text)
+        return load_pricing_rules(self.file_path)
+
+    def test_loads_rules(self):
+        rules = self.load(u'bundle|3 for 2|3|2.00|001|002\n\n' +
+                          u'combo|Coffee + pastry|3.00|cof|#Pastry\n')
+        assert_equal(rules, [
+            PricingRule('bundle', '3 for 2', 3, 2.0, ('001', '002')),
+            PricingRule('combo', 'Coffee + pastry', 2, 3.0,
+                        ('cof', '#Pastry'))])
+
+    @raises(ValueError)
+    def test_rejects_unknown_kind(self):
+        self.load(u'discount|10%|0.10|001\n')
+
+    @raises(ValueError)
+    def test_rejects_rule_without_tokens(self):
+        self.load(u'bundle|3 for 2|3|2.00\n')
+
+
+class TestPricingEngine(object):
+    def setUp(self):
+        self.catalog = Catalog()
+        self.cookie = self.catalog.add('Cookie', 0.75, '001', 'Cookies')
+        self.big_cookie = self.catalog.add('Big cookie', 1.0, '002',
+                                           'Cookies')
+        self.coffee = self.catalog.add('Coffee', 2.0, '003', 'Drinks', 'cof')
+        self.muffin = self.catalog.add('Muffin', 1.5, '004', 'Pastry')
+        self.croissant = self.catalog.add('Croissant', 1.75, '005', 'Pastry')
+        rules = [PricingRule('bundle', '3 cookies', 3, 2.0, ('#Cookies', )),
+                 PricingRule('combo', 'Coffee + pastry', 2, 3.0,
+                             ('cof', '#Pastry'))]
+        self.engine = PricingEngine(rules, self.catalog)
+
+    def test_no_discount_on_empty_order(self):
+        assert_equal(self.engine.discounts(), [])
+        assert_equal(self.engine.total_discount, 0)
+
+    def test_bundle(self):
+        self.engine.update(self.cookie, 2)
+        assert_equal(self.engine.discounts(), [])
+        self.engine.update(self.cookie, 4)
+        ((rule, times, discount), ) = self.engine.discounts()
+        assert_equal((rule.name, times), ('3 cookies', 1))
+        assert_almost_equal(discount, 0.25)
+
+    def test_bundle_takes_most_expensive_units(self):
+        self.engine.update(self.cookie, 2)
+        self.engine.update(self.big_cookie, 1)
+        assert_almost_equal(self.engine.total_discount, 0.5)
+
+    def test_combo(self):
+        self.engine.update(self.coffee, 2)
+        self.engine.update(self.muffin, 1)
+        self.engine.update(self.croissant, 1)
+        ((rule, times, discount), ) = self.engine.discounts()
+        assert_equal(times, 2)
+        assert_almost_equal(discount, 1.25)
+
+    def test_removing_item_removes_discount(self):
+        self.engine.update(self.coffee, 1)
+        self.engine.update(self.muffin, 1)
+        self.engine.update(self.muffin, 0)
+        assert_equal(self.engine.discounts(), [])
+
+    def test_reset(self):
+        self.engine.reset({self.cookie: 3})
+        assert_almost_equal(self.engine.total_discount, 0.25)
+        self.engine.reset()
+        assert_equal(self.engine.discounts(), [])
+
+    def test_reports_unresolved_tokens(self):
+        engine = PricingEngine(
+            [PricingRule('bundle', '2 teas', 2, 1.0, ('tea', '#Tea'))],
+            self.catalog)
+        assert_equal(engine.unresolved, ['tea', '#Tea'])
+
+    def test_combo_with_repeated_item(self):
+        engine = PricingEngine(
+            [PricingRule('combo', '2 croissants + coffee', 3, 3.0,
+                         ('005', '005', 'cof'))], self.catalog)
+        engine.update(self.croissant, 1)
+        engine.update(self.coffee, 1)
+        assert_equal(engine.discounts(), [])
+        engine.update(self.croissant, 2)
+        assert_almost_equal(engine.total_discount, 2.5)
+
+    def test_combo_with_repeated_category(self):
+        engine = PricingEngine(
+            [PricingRule('combo', '2 pastries', 2, 2.5,
+                         ('#Pastry', '#Pastry'))], self.catalog)
+        engine.update(self.croissant, 1)
+        assert_equal(engine.discounts(), [])
+        engine.update(self.muffin, 1)
+        assert_almost_equal(engine.total_discount, 0.75)
+
+    def test_units_count_towards_a_single_rule(self):
+        engine = PricingEngine(
+            [PricingRule('bundle', '2 croissants', 2, 3.0, ('005', )),
+             PricingRule('combo', 'Coffee + pastry', 2, 3.0,
+                         ('cof', '#Pastry'))], self.catalog)
+        engine.update(self.croissant, 2)
+        engine.update(self.coffee, 1)
+        ((rule, times, discount), ) = engine.discounts()
+        assert_equal(rule.name, '2 croissants')
+        assert_almost_equal(discount, 0.5)
+        engine.update(self.muffin, 1)
+        assert_almost_equal(engine.total_discount, 1.0)
+
+    def test_update_only_evaluates_competing_rules(self):
+        catalog = Catalog()
+        rules = []
+        for i in range(10):
+            barcode = '{:03d}'.format(i)
+            catalog.add('Item {}'.format(i), 1.0, barcode,
+                        'Category {}'.format(i))
+            rules.append(PricingRule('bundle', barcode, 2, 1.5, (barcode, )))
+        rules.append(PricingRule('bundle', 'Any 3', 3, 2.0,
+                                 ('#Category 0', '#Category 1')))
+        engine = PricingEngine(rules, catalog)
+        evaluated = []
+        apply_rule = engine._apply
+
+        def counting_apply(rule_index, pool):
+            evaluated.append(rule_index)
+            apply_rule(rule_index, pool)
+        engine._apply = counting_apply
+        engine.update(5, 2)
+        assert_equal(evaluated, [5])
+        del evaluated[:]
+        engine.update(0, 3)
+        assert_equal(evaluated, [0, 10])
+        del evaluated[:]
+        engine.update(1, 1)
+        assert_equal(evaluated, [1, 10])
+        assert_equal([rule.name for rule, _, _ in engine.discounts()],
+                     ['000', '005'])
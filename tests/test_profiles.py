@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Tests for menu profile schedules."""
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.profiles import MenuSchedule, load_menu_schedule
+
+
+def at(hour, minute):
+    return time.mktime((2016, 1, 1, hour, minute, 0, 0, 0, -1))
+
+
+class TestMenuSchedule(object):
+    def setUp(self):
+        self.schedule = MenuSchedule([(11 * 60, 'lunch'),
+                                      (6 * 60 + 30, 'breakfast')])
+
+    def test_profile_at(self):
+        assert_equal(self.schedule.profile_at(at(6, 30)), 'breakfast')
+        assert_equal(self.schedule.profile_at(at(10, 59)), 'breakfast')
+        assert_equal(self.schedule.profile_at(at(11, 0)), 'lunch')
+
+    def test_profile_before_first_entry_wraps_around(self):
+        assert_equal(self.schedule.profile_at(at(3, 0)), 'lunch')
+
+    def test_empty_schedule(self):
+        assert_equal(MenuSchedule([]).profile_at(at(3, 0)), None)
+
+    def test_profiles(self):
+        assert_equal(self.schedule.profiles, set(['breakfast', 'lunch']))
+
+
+class TestLoadMenuSchedule(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'schedule.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, text):
+        with io.open(self.file_path, 'w') as f:
+            f.write(text)
+
+    def test_loads_schedule(self):
+        self.write(u'06:30|breakfast\n\n11:00 | lunch\n')
+        schedule = load_menu_schedule(self.file_path)
+        assert_equal(len(schedule), 2)
+        assert_equal(schedule.profile_at(at(12, 0)), 'lunch')
+
+    @raises(ValueError)
+    def test_rejects_invalid_time(self):
+        self.write(u'25:00|breakfast\n')
+        load_menu_schedule(self.file_path)
+
+    @raises(ValueError)
+    def test_rejects_missing_profile(self):
+        self.write(u'06:30\n')
+        load_menu_schedule(self.file_path)
+
+    @raises(ValueError)
+    def test_rejects_empty_schedule(self):
+        self.write(u'\n')
+        load_menu_schedule(self.file_path)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Tests for receipts."""
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equal
+
+from pyplanck.events import OrderCheckedOut
+from pyplanck.immutables import Item
+from pyplanck.receipts import (ALIGN_CENTER, ALIGN_LEFT, BOLD_OFF, BOLD_ON,
+                               FEED_AND_CUT, INITIALIZE, PrintSpooler,
+                               ReceiptRenderer)
+
+GUM = Item('Gum', 0.75, '002', 'Candy', None)
+BAR = Item('Chocolate bar with a very long name', 1.0, '001', 'Candy', None)
+
+NOON = time.mktime((2016, 1, 1, 12, 0, 0, 0, 0, -1))
+
+
+class TestReceiptRenderer(object):
+    def setUp(self):
+        self.renderer = ReceiptRenderer(width=32)
+
+    def test_render(self):
+        receipt = self.renderer.render(((GUM, 2), (BAR, 1)), 2.25, 'Admin',
+                                       NOON)
+        assert receipt.startswith(INITIALIZE)
+        assert receipt.endswith(FEED_AND_CUT)
+        lines = receipt.split(b'\n')
+        assert_equal(lines[1], BOLD_OFF + ALIGN_LEFT + b'2016-01-01 12:00')
+        assert_equal(lines[2:8], [b'Served by Admin',
+                                  b'-' * 32,
+                                  b'Gum             0.75 x  2   1.50',
+                                  b'Chocolate bar   1.00 x  1   1.00',
+                                  b'Discounts                  -0.25',
+                                  b'-' * 32])
+        assert_equal(lines[8], BOLD_ON + b'TOTAL                       2.25')
+        assert_equal(lines[9], BOLD_OFF + ALIGN_CENTER + b'Thank you!')
+
+    def test_item_columns_are_cached(self):
+        self.renderer.render(((GUM, 1),), 0.75)
+        self.renderer.render(((GUM, 3),), 2.25)
+        assert_equal(len(self.renderer._columns), 1)
+
+    def test_unencodable_characters_are_replaced(self):
+        item = Item(u'Thé ☃', 1.0, '005', 'Beverage', None)
+        receipt = self.renderer.render(((item, 1),), 1.0)
+        assert b'Th\x82 ?' in receipt
+
+
+class TestPrintSpooler(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.device_path = os.path.join(self.tempdir, 'printer')
+        io.open(self.device_path, 'wb').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def read_device(self):
+        with io.open(self.device_path, 'rb') as f:
+            return f.read()
+
+    def test_prints_in_background(self):
+        spooler = PrintSpooler(self.device_path)
+        spooler.record_checkout(OrderCheckedOut(NOON, 'Admin', ((GUM, 1),),
+                                                0.75))
+        spooler.submit(b'second')
+        spooler.close()
+        data = self.read_device()
+        assert data.startswith(INITIALIZE)
+        assert data.endswith(FEED_AND_CUT + b'second')
+        assert_equal(spooler.printed, 2)
+
+    def test_gives_up_after_retries(self):
+        spooler = PrintSpooler(os.path.join(self.tempdir, 'unplugged'),
+                               retries=2, retry_interval=0.01)
+        spooler.submit(b'receipt')
+        spooler.join()
+        assert_equal((spooler.printed, spooler.failed), (0, 1))
+        spooler.close()
+
+    def test_retries_until_device_is_back(self):
+        path = os.path.join(self.tempdir, 'replugged')
+        spooler = PrintSpooler(path, retries=100, retry_interval=0.01)
+        spooler.submit(b'receipt')
+        time.sleep(0.05)
+        io.open(path, 'wb').close()
+        spooler.close()
+        assert_equal(spooler.printed, 1)
+        with io.open(path, 'rb') as f:
+            assert_equal(f.read(), b'receipt')
+
+    def test_drops_receipts_when_full(self):
+        spooler = PrintSpooler(os.path.join(self.tempdir, 'unplugged'),
+                               max_queue_size=1, retries=1,
+                               retry_interval=0.2)
+        results = [spooler.submit(b'receipt') for _ in range(3)]
+        spooler.close()
+        assert_equal(results.count(False), spooler.dropped)
+        assert spooler.dropped >= 1
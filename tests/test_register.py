@@ -6,14 +6,26 @@ import struct
 import logging
 import shutil
 import tempfile
+import time
 from collections import OrderedDict
 
-from nose.tools import raises, assert_equal
+from nose.plugins.skip import SkipTest
+from nose.tools import raises, assert_equal, assert_raises
 
+from pyplanck.archive import load_archive
+from pyplanck.chain import iter_chained_records, verify_log
+from pyplanck.display import DisplayClient
+from pyplanck.events import StockOversold
+from pyplanck.logs import logger_manager, wait_for_compression
 from pyplanck.register import Register
 from pyplanck.immutables import Item, Employee
 from pyplanck.exceptions import CredentialException, ItemNotFoundException
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # No logging for unit tests
 logging.disable(logging.CRITICAL)
 
@@ -43,6 +55,9 @@ class TestRegister(object):
         self.register = Register(self.menu_path, self.employees_path,
                                  self.count_path, self.tempdir)
 
+    def tearDown(self):
+        self.register.close()
+
     def test_reads_menu(self):
         menu = self.register.menu
         correct_menu = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
@@ -92,10 +107,14 @@ class TestRegister(object):
     def test_employee_name_returns_none(self):
         assert_equal(self.register.employee_name, 'None')
 
+    def custom_item_id(self, name, price):
+        return self.register.catalog.add_custom(
+            name, price, 'custom_{}'.format(name), 'Custom', None)
+
     def test_add(self):
         self.register.login_employee('admin')
         self.register.add('001')
-        correct_added_item = Item('Chocolate bar', 1.0, '001', 'Candy', None)
+        correct_added_item = self.register.catalog.find('001')
         correct_quantity = 1
         correct_dict = OrderedDict([(correct_added_item, correct_quantity)])
         assert_equal(self.register.order_dict, correct_dict)
@@ -103,23 +122,28 @@ class TestRegister(object):
     def test_add_custom(self):
         self.register.login_employee('admin')
         self.register.add_custom('gum', 0.47)
-        correct_added_item = Item('gum', 0.47, 'custom_gum', 'Custom', None)
+        correct_added_item = self.custom_item_id('gum', 0.47)
         correct_quantity = 1
         correct_dict = OrderedDict([(correct_added_item, correct_quantity)])
         assert_equal(self.register.order_dict, correct_dict)
 
+    def test_add_custom_keeps_custom_item_out_of_menu(self):
+        self.register.login_employee('admin')
+        self.register.add_custom('gum', 0.47)
+        assert_equal(len(self.register.menu), 3)
+
     def test_remove(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('Gum', 0.75, '002', 'Candy', None)]
+        items = [self.register.catalog.find('001'),
+                 self.register.catalog.find('002')]
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         self.register.remove('001')
         assert_equal(self.register.order_dict, OrderedDict([(items[1], 1)]))
 
     def test_remove_custom(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('gum', 0.47, 'custom_gum', 'Custom', None)]
+        items = [self.register.catalog.find('001'),
+                 self.custom_item_id('gum', 0.47)]
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         self.register.remove('custom_gum')
         assert_equal(self.register.order_dict, OrderedDict([(items[0], 1)]))
@@ -129,21 +153,23 @@ class TestRegister(object):
         items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
                  Item('gum', 0.47, 'custom_gum', 'Custom', None)]
         order = ((items[0], 1), (items[1], 1))
-        self.register.order_dict = OrderedDict(order)
+        self.register.order_dict = OrderedDict(
+            [(self.register.catalog.find('001'), 1),
+             (self.custom_item_id('gum', 0.47), 1)])
         assert_equal(self.register.order, order)
 
     def test_clear_order(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('Gum', 0.75, '002', 'Candy', None)]
+        items = [self.register.catalog.find('001'),
+                 self.register.catalog.find('002')]
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         self.register.clear_order()
         assert_equal(self.register.order_dict, OrderedDict())
 
     def test_checkout_order(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('Gum', 0.75, '002', 'Candy', None)]
+        items = [self.register.catalog.find('001'),
+                 self.register.catalog.find('002')]
         self.register._register_count = 1.5
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         self.register.checkout_order()
@@ -164,10 +190,477 @@ class TestRegister(object):
             register_count, = struct.unpack('d', f.read(8))
         assert_equal(register_count, 1.5)
 
+    def test_park_order_clears_order(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.park_order('clears')
+        assert_equal(self.register.order_dict, OrderedDict())
+
+    def test_resume_order(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.add('002')
+        self.register.add('002')
+        order = self.register.order
+        self.register.park_order('resume')
+        self.register.resume_order('resume')
+        assert_equal(self.register.order, order)
+
+    def test_resume_order_after_restart(self):
+        self.register.login_employee('admin')
+        self.register.add('hc')
+        self.register.add_custom('gum', 0.47)
+        order = self.register.order
+        self.register.park_order('restart')
+        self.register.close()
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir)
+        register.login_employee('admin')
+        register.resume_order('restart')
+        register.close()
+        assert_equal(register.order, order)
+
+    def test_discard_order(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.park_order('discard')
+        self.register.discard_order('discard')
+        assert_equal(self.register.parked_orders.names, [])
+
+    @raises(ValueError)
+    def test_resume_order_rejects_non_empty_order(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.park_order('non_empty')
+        self.register.add('002')
+        self.register.resume_order('non_empty')
+
+    @raises(ValueError)
+    def test_park_order_rejects_empty_order(self):
+        self.register.login_employee('admin')
+        self.register.park_order('empty')
+
+    def test_restores_unfinished_order(self):
+        order_log_path = os.path.join(self.tempdir, 'order.log')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path)
+        register.login_employee('admin')
+        register.add('001')
+        register.add('hc')
+        register.add_custom('gum', 0.47)
+        register.remove('hc')
+        order = register.order
+        register.close()
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path)
+        register.login_employee('admin')
+        restored_order = register.order
+        register.checkout_order()
+        register.close()
+        assert_equal(restored_order, order)
+        assert_equal(os.path.getsize(order_log_path),
+                     len('D\t{}\n'.format(register.catalog.digest())))
+
+    def test_interrupted_checkout_is_not_restored(self):
+        order_log_path = os.path.join(self.tempdir, 'order.log')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path)
+        register.login_employee('admin')
+        register.add('001')
+
+        def crash(amount):
+            raise RuntimeError('crash')
+        register._add_to_register_count = crash
+        assert_raises(RuntimeError, register.checkout_order)
+        register.close()
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path)
+        try:
+            assert_equal(register.order_dict, OrderedDict())
+        finally:
+            register.close()
+
+    def test_lazy_register_restores_unfinished_order(self):
+        order_log_path = os.path.join(self.tempdir, 'lazy_order.log')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path)
+        register.login_employee('admin')
+        register.add('001')
+        register.add('001')
+        order = register.order
+        register.close()
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            order_log_file_path=order_log_path, lazy=True)
+        register.login_employee('admin')
+        register.add('hc')
+        register.close()
+        assert_equal(register.order[:1], order)
+
+    def test_lazy_register_loads_menu_and_employees(self):
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir, lazy=True)
+        assert_equal(register._employees, None)
+        register.login_employee('employee')
+        register.add('hc')
+        assert register.catalog_ready
+        assert_equal(register.employee_name, 'Employee')
+        assert_equal(register.order_to_string(), 'Hot chocolate x 1')
+        assert 'menu' in register.startup_times
+        assert 'employees' in register.startup_times
+        register.close()
+
+    def test_lazy_register_opens_count_and_shifts_on_first_use(self):
+        count_path = os.path.join(self.tempdir, 'lazy_count.bin')
+        shifts_path = os.path.join(self.tempdir, 'lazy_shifts.db')
+        register = Register(self.menu_path, self.employees_path, count_path,
+                            self.tempdir, shifts_file_path=shifts_path,
+                            lazy=True)
+        assert not os.path.exists(count_path)
+        assert not os.path.exists(shifts_path)
+        register.login_employee('employee')
+        assert os.path.exists(count_path)
+        assert os.path.exists(shifts_path)
+        assert 'register count' in register.startup_times
+        assert 'shifts' in register.startup_times
+        register.close()
+        os.remove(count_path)
+        os.remove(shifts_path)
+
+    def test_lazy_register_raises_menu_errors_on_use(self):
+        class BrokenMenuRegister(Register):
+            def _load_menu(self, file_path):
+                raise IOError('broken menu')
+
+        register = BrokenMenuRegister(self.menu_path, self.employees_path,
+                                      self.count_path, self.tempdir,
+                                      lazy=True)
+        register.login_employee('admin')
+        assert_raises(IOError, register.add, '001')
+        register.close()
+
+    def test_registers_share_register_count(self):
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir)
+        register.login_employee('admin')
+        register.add('001')
+        register.checkout_order()
+        assert_equal(self.register._register_count, 12.57)
+        register.close()
+
+    def test_registers_do_not_accumulate_handlers(self):
+        handler_count = logger_manager.handler_count()
+        for i in range(3):
+            register = Register(self.menu_path, self.employees_path,
+                                self.count_path, self.tempdir)
+            assert_equal(len(register.logger.handlers), 1)
+            register.close()
+        assert_equal(logger_manager.handler_count(), handler_count)
+
+    def test_terminals_have_their_own_loggers(self):
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir, terminal='till2')
+        assert_equal(register.logger.name, 'pyplanck.till2.event')
+        assert register.logger is not self.register.logger
+        register.close()
+
+    def test_publishes_events(self):
+        events = []
+        self.register.events.subscribe(events.append)
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.add('001')
+        self.register.remove('001')
+        self.register.checkout_order()
+        self.register.logout_employee()
+        assert_equal([type(event).__name__ for event in events],
+                     ['EmployeeLoggedIn', 'ItemAdded', 'ItemAdded',
+                      'ItemRemoved', 'OrderCheckedOut', 'OrderCleared',
+                      'EmployeeLoggedOut'])
+        assert_equal([event.quantity for event in events[1:4]], [1, 2, 1])
+        assert_equal(events[4].total, 1.0)
+        assert_equal(events[4].employee, 'Admin')
+
+    def test_applies_pricing_rules(self):
+        pricing_path = os.path.join(self.tempdir, 'pricing.txt')
+        with io.open(pricing_path, 'w') as f:
+            f.write(u'bundle|2 gums for 1.00$|2|1.00|002\n')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            pricing_file_path=pricing_path)
+        register.login_employee('admin')
+        register.add('002')
+        register.add('002')
+        register.add('001')
+        assert_equal(register.order_to_string(),
+                     'Gum x 2\nChocolate bar x 1\n' +
+                     '2 gums for 1.00$ x 1: -0.50$')
+        assert_equal(register.order_total, 2.0)
+        register.remove('002')
+        assert_equal(register.order_total, 1.75)
+        register.close()
+
+    def test_checkout_updates_inventory(self):
+        stock_path = os.path.join(self.tempdir, 'stock.txt')
+        with io.open(stock_path, 'w') as f:
+            f.write(u'001|1\n002|5\n')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            inventory_file_path=stock_path)
+        events = []
+        register.events.subscribe(events.append, [StockOversold])
+        register.login_employee('admin')
+        register.add('001')
+        register.add('001')
+        register.add('002')
+        register.add('hc')
+        register.checkout_order()
+        assert_equal(register.low_stock(4), [(-1, '001'), (4, '002')])
+        assert_equal([(event.item.name, event.level) for event in events],
+                     [('Chocolate bar', -1)])
+        register.close()
+
+    def test_checkout_updates_sales_dashboard(self):
+        self.register.login_employee('admin')
+        self.register.add('001')
+        self.register.add('001')
+        self.register.add('hc')
+        self.register.checkout_order()
+        summaries = self.register.sales_dashboard(top=1)
+        assert_equal(list(summaries.keys()), ['15 min', '1 h', 'today'])
+        for summary in summaries.values():
+            assert_equal(summary.orders, 1)
+            assert_equal(summary.revenue, 2.5)
+            assert_equal(summary.items, 3)
+            assert_equal(summary.top_items, [('Chocolate bar', 2)])
+
+    @raises(CredentialException)
+    def test_sales_dashboard_needs_manager(self):
+        self.register.login_employee('employee')
+        self.register.sales_dashboard()
+
+    def make_profile_register(self, **kwargs):
+        breakfast_path = os.path.join(self.tempdir, 'breakfast.txt')
+        with io.open(breakfast_path, 'w') as f:
+            f.write(u'#Breakfast|2.00\n101|Croissant\n')
+        return Register(self.menu_path, self.employees_path, self.count_path,
+                        self.tempdir,
+                        menu_profiles={'breakfast': breakfast_path}, **kwargs)
+
+    def test_switch_menu(self):
+        register = self.make_profile_register()
+        register.login_employee('admin')
+        assert_equal(register.menu_profiles, ['breakfast', 'default'])
+        register.switch_menu('breakfast')
+        assert_equal(register.menu_profile, 'breakfast')
+        register.add('101')
+        assert_equal(register.order_total, 2.0)
+        assert_raises(ValueError, register.add, '001')
+        register.close()
+
+    def test_switch_menu_waits_for_order_end(self):
+        register = self.make_profile_register()
+        register.login_employee('admin')
+        register.add('001')
+        register.switch_menu('breakfast')
+        assert_equal(register.menu_profile, 'default')
+        register.add('002')
+        register.checkout_order()
+        assert_equal(register.menu_profile, 'breakfast')
+        register.close()
+
+    @raises(ValueError)
+    def test_switch_menu_raises_exception_on_unknown_profile(self):
+        self.register.login_employee('admin')
+        self.register.switch_menu('dinner')
+
+    def test_menu_schedule(self):
+        schedule_path = os.path.join(self.tempdir, 'schedule.txt')
+        with io.open(schedule_path, 'w') as f:
+            f.write(u'00:00|breakfast\n')
+        register = self.make_profile_register(
+            menu_schedule_file_path=schedule_path)
+        assert_equal(register.menu_profile, 'breakfast')
+        register.login_employee('admin')
+        # A manual switch lasts until the next scheduled switch
+        register.switch_menu('default')
+        register.add('001')
+        assert_equal(register.menu_profile, 'default')
+        register.close()
+
+    def test_restores_unfinished_order_of_other_profile(self):
+        order_log_path = os.path.join(self.tempdir, 'profile_order.log')
+        register = self.make_profile_register(
+            order_log_file_path=order_log_path)
+        register.login_employee('admin')
+        register.switch_menu('breakfast')
+        register.add('101')
+        order = register.order
+        register.close()
+        register = self.make_profile_register(
+            order_log_file_path=order_log_path)
+        assert_equal(register.menu_profile, 'breakfast')
+        assert_equal(register.order, order)
+        register.close()
+
+    def test_log_key_chains_transaction_log(self):
+        log_path = os.path.join(self.tempdir, 'chained')
+        os.mkdir(log_path)
+        key_path = os.path.join(log_path, 'log.key')
+        with io.open(key_path, 'wb') as f:
+            f.write(b'secret\n')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, log_path,
+                            log_key_file_path=key_path)
+        register.login_employee('admin')
+        register.add('001')
+        logging.disable(logging.NOTSET)
+        try:
+            register.checkout_order()
+            register.count_register(12.57)
+        finally:
+            logging.disable(logging.CRITICAL)
+        register.close()
+        for name in ('transactions.log', 'counts.log'):
+            file_path = os.path.join(log_path, name)
+            assert_equal(len(list(iter_chained_records(file_path))), 1)
+            assert_equal(verify_log(file_path, b'secret'), [])
+
+    def test_shift_tracks_sales(self):
+        shifts_path = os.path.join(self.tempdir, 'test_shifts.db')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            shifts_file_path=shifts_path)
+        register.login_employee('admin')
+        register.add('001')
+        register.checkout_order()
+        register.logout_employee()
+        register.login_employee('admin')
+        shift, current = register.shift_report(employee='Admin')
+        assert_equal((shift.orders, shift.sales), (1, 1.0))
+        assert_equal((shift.opening_count, shift.closing_count),
+                     (11.57, 12.57))
+        assert_equal(register.on_shift(time.time()), [current])
+        register.close()
+
+    def test_display_follows_order(self):
+        socket_path = os.path.join(self.tempdir, 'display.sock')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            display_socket_path=socket_path)
+        register.login_employee('admin')
+        register.add('001')
+        client = DisplayClient(socket_path)
+        client.connect()
+        client._sock.settimeout(5)
+        try:
+            client.receive()
+            assert_equal(list(client.lines.items()),
+                         [(0, ['Chocolate bar', 1, 1.0])])
+            register.add('hc')
+            while client.total != 1.5:
+                client.receive()
+            register.clear_order()
+            while client.lines:
+                client.receive()
+        finally:
+            client.close()
+            register.close()
+        assert_equal(os.path.exists(socket_path), False)
+
+    def test_transactions_refer_to_catalog_version(self):
+        versions_path = os.path.join(self.tempdir, 'catalog_versions.db')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            catalog_versions_file_path=versions_path)
+        try:
+            logging.disable(logging.NOTSET)
+            version = register.catalog_version
+            register.login_employee('admin')
+            register.add('001')
+            register.add('001')
+            register.add_custom('tip', 0.5)
+            register.checkout_order()
+            now = time.time()
+            assert_equal(register.price_at('002', now), 0.75)
+            assert_equal(register.price_at('004', now), None)
+            record = list(iter_chained_records(
+                os.path.join(self.tempdir, 'transactions.log')))[-1][2]
+            assert_equal(record.split('\n')[1:],
+                         ['Admin', 'Catalog version: {}'.format(version),
+                          '#0 x 2', 'tip x 1 @ 0.50$', 'Total: 2.50$'])
+            assert_equal(register.catalog_versions.item(version, 0).name,
+                         'Chocolate bar')
+        finally:
+            logging.disable(logging.CRITICAL)
+            register.close()
+
+    @raises(CredentialException)
+    def test_price_at_needs_manager(self):
+        self.register.login_employee('employee')
+        self.register.price_at('001', time.time())
+
+    def test_rotated_transactions_are_archived(self):
+        if numpy is None:
+            raise SkipTest('NumPy is not installed')
+        log_path = os.path.join(self.tempdir, 'archived_logs')
+        os.mkdir(log_path)
+        archive_path = os.path.join(self.tempdir, 'archive')
+        # A handler added by the application comes first
+        other_handler = logging.NullHandler()
+        logging.getLogger('pyplanck.None.transaction').addHandler(
+            other_handler)
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, log_path,
+                            catalog_versions_file_path=os.path.join(
+                                log_path, 'catalog_versions.db'),
+                            archive_path=archive_path)
+        try:
+            logging.disable(logging.NOTSET)
+            register.login_employee('admin')
+            register.add('001')
+            register.checkout_order()
+            register._transaction_handler.doRollover()
+            wait_for_compression()
+            day, = load_archive(archive_path)
+            assert_equal(list(day['item_ids']), [0])
+            assert_equal(list(day['cents']), [100])
+        finally:
+            logging.disable(logging.CRITICAL)
+            register.close()
+            logging.getLogger('pyplanck.None.transaction').removeHandler(
+                other_handler)
+
+    @raises(ValueError)
+    def test_archive_needs_catalog_versions(self):
+        Register(self.menu_path, self.employees_path, self.count_path,
+                 self.tempdir, archive_path=os.path.join(self.tempdir, 'a'))
+
+    def test_checkout_prints_receipt(self):
+        printer_path = os.path.join(self.tempdir, 'printer')
+        io.open(printer_path, 'wb').close()
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            receipt_printer_path=printer_path)
+        register.login_employee('admin')
+        register.add('001')
+        register.checkout_order()
+        register.close()
+        with io.open(printer_path, 'rb') as f:
+            receipt = f.read()
+        assert b'Chocolate bar' in receipt
+        assert b'Served by Admin' in receipt
+        assert_equal(register.printer.printed, 1)
+
     def test_order_to_string(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('Gum', 0.75, '002', 'Candy', None)]
+        items = [self.register.catalog.find('001'),
+                 self.register.catalog.find('002')]
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         representation = self.register.order_to_string().split('\n')
         correct_representation = ['Chocolate bar x 1', 'Gum x 1']
@@ -175,8 +668,8 @@ class TestRegister(object):
 
     def test_order_total_non_empty_order(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('gum', 0.47, 'custom_gum', 'Custom', None)]
+        items = [self.register.catalog.find('001'),
+                 self.custom_item_id('gum', 0.47)]
         self.register.order_dict = OrderedDict([(items[0], 1), (items[1], 1)])
         assert_equal(self.register.order_total, 1.47)
 
@@ -206,48 +699,64 @@ class TestRegister(object):
 
     def test_find_by_barcode(self):
         self.register.login_employee('admin')
-        item = self.register._find_in_menu('001')
-        assert_equal(item, Item('Chocolate bar', 1.0, '001', 'Candy', None))
+        item_id = self.register._find_in_menu('001')
+        assert_equal(self.register.catalog.item(item_id),
+                     Item('Chocolate bar', 1.0, '001', 'Candy', None))
 
     def test_find_by_shortcut(self):
         self.register.login_employee('admin')
-        item = self.register._find_in_menu('hc')
-        assert_equal(item, Item('Hot chocolate', 0.5, '003', 'Beverage', 'hc'))
+        item_id = self.register._find_in_menu('hc')
+        assert_equal(self.register.catalog.item(item_id),
+                     Item('Hot chocolate', 0.5, '003', 'Beverage', 'hc'))
 
     @raises(ValueError)
     def test_find_raises_exception_on_nonexistent_item(self):
         self.register.login_employee('admin')
         self.register._find_in_menu('nothing')
 
-    def test_verify_credential_allows_right_employee(self):
-        self.register._verify_credentials(
-            Employee('E', '1111', 'employee', 1), 0)
-        self.register._verify_credentials(
-            Employee('E', '1111', 'employee', 1), 1)
+    def test_authorize_allows_right_employee(self):
+        self.register.login_employee('employee')
+        self.register._authorize('add')
+        self.register._authorize('add_custom')
 
     @raises(CredentialException)
-    def test_verify_credential_raises_exception_on_wrong_employee(self):
-        self.register._verify_credentials(
-            Employee('E', '1111', 'employee', 1), 2)
+    def test_authorize_raises_exception_on_wrong_employee(self):
+        self.register.login_employee('employee')
+        self.register._authorize('adjust')
 
     @raises(CredentialException)
-    def test_verify_credential_raises_exception_on_none(self):
-        self.register._verify_credentials(None, 1)
+    def test_authorize_raises_exception_on_none(self):
+        self.register._authorize('add')
+
+    def test_policy_file_overrides_levels(self):
+        policy_path = os.path.join(self.tempdir, 'policy.txt')
+        with io.open(policy_path, 'w') as f:
+            f.write(u'@treasurer|3\nadjust|treasurer\nadd|1\n')
+        register = Register(self.menu_path, self.employees_path,
+                            self.count_path, self.tempdir,
+                            policy_file_path=policy_path)
+        register.login_employee('guest')
+        assert_raises(CredentialException, register.add, '001')
+        register.login_employee('admin')
+        assert_raises(CredentialException, register.adjust, 1.0)
 
-    def test_verify_credential_can_allow_none(self):
-        self.register._verify_credentials(None, None)
+    @raises(CredentialException)
+    def test_logout_revokes_permissions(self):
+        self.register.login_employee('admin')
+        self.register.logout_employee()
+        self.register.add('001')
 
     def test_add_existing_item_to_order(self):
         self.register.login_employee('admin')
-        item = Item('Gum', 0.75, '002', 'Candy', None)
+        item = self.register.catalog.find('002')
         self.register.order_dict = OrderedDict([(item, 1)])
         self.register._add_to_order(item)
         assert_equal(self.register.order_dict, OrderedDict([(item, 2)]))
 
     def test_add_new_item_to_order(self):
         self.register.login_employee('admin')
-        items = [Item('Chocolate bar', 1.0, '001', 'Candy', None),
-                 Item('Gum', 0.75, '002', 'Candy', None)]
+        items = [self.register.catalog.find('001'),
+                 self.register.catalog.find('002')]
         self.register.order_dict = OrderedDict([(items[0], 1)])
         self.register._add_to_order(items[1])
         assert_equal(self.register.order_dict,
@@ -255,14 +764,14 @@ class TestRegister(object):
 
     def test_remove_duplicate_item_from_order(self):
         self.register.login_employee('admin')
-        item = Item('Gum', 0.75, '002', 'Candy', None)
+        item = self.register.catalog.find('002')
         self.register.order_dict = OrderedDict([(item, 2)])
         self.register._remove_from_order(item)
         assert_equal(self.register.order_dict, OrderedDict([(item, 1)]))
 
     def test_remove_unique_item_from_order(self):
         self.register.login_employee('admin')
-        item = Item('Gum', 0.75, '002', 'Candy', None)
+        item = self.register.catalog.find('002')
         self.register.order_dict = OrderedDict([(item, 1)])
         self.register._remove_from_order(item)
         assert_equal(self.register.order_dict, OrderedDict())
@@ -270,7 +779,7 @@ class TestRegister(object):
     @raises(ItemNotFoundException)
     def test_remove_raises_exception_if_item_not_in_order(self):
         self.register.login_employee('admin')
-        item = Item('Gum', 0.75, '002', 'Candy', None)
+        item = self.register.catalog.find('002')
         self.register.order_dict = OrderedDict()
         self.register._remove_from_order(item)
 
@@ -280,10 +789,9 @@ class TestRegister(object):
         self.register._register_count = 1
         self.register._substract_from_register_count(2)
 
-    def test_update_register_count(self):
+    def test_register_count_is_persisted(self):
         self.register.login_employee('admin')
         self.register._register_count = 2.0
-        self.register._update_register_count()
         with io.open(self.count_path, 'rb') as f:
             register_count, = struct.unpack('d', f.read(8))
         assert_equal(register_count, 2.0)
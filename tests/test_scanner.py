@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Tests for barcode scanner input."""
+import os
+import time
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal
+
+from pyplanck.exceptions import CredentialException
+from pyplanck.scanner import BarcodeScanner, measure_throughput
+
+try:
+    import pty
+    import tty
+except ImportError:
+    pty = None
+
+
+class FakeRegister(object):
+    def __init__(self):
+        self.tokens = []
+
+    def add(self, token):
+        if token == 'unknown':
+            raise ValueError("item not found with token 'unknown'")
+        if token == 'forbidden':
+            raise CredentialException('insufficient privileges')
+        self.tokens.append(token)
+
+
+class TestBarcodeScanner(object):
+    def setUp(self):
+        if pty is None:
+            raise SkipTest('pseudo-terminals are not available')
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.scanner = BarcodeScanner(os.ttyname(self.slave), batch_size=3)
+        self.scanner.start()
+
+    def tearDown(self):
+        self.scanner.close()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def scan(self, data, count):
+        os.write(self.master, data)
+        deadline = time.time() + 5
+        while (self.scanner.codes.qsize() < count and
+               time.time() < deadline):
+            time.sleep(0.01)
+
+    def test_frames_codes(self):
+        self.scan(b'001\r\n002\n\r003\r', 3)
+        assert_equal(self.scanner.get_batch(), ['001', '002', '003'])
+
+    def test_frames_codes_split_across_reads(self):
+        os.write(self.master, b'00')
+        time.sleep(0.05)
+        self.scan(b'1\r\n', 1)
+        assert_equal(self.scanner.get_batch(), ['001'])
+
+    def test_debounces_repeated_codes(self):
+        self.scan(b'001\r\n001\r\n002\r\n', 2)
+        time.sleep(0.05)
+        assert_equal(self.scanner.get_batch(), ['001', '002'])
+        assert_equal(self.scanner.debounced, 1)
+
+    def test_feed_adds_codes_in_batches(self):
+        self.scan(b'001\r\nunknown\r\nforbidden\r\n002\r\n', 4)
+        register = FakeRegister()
+        errors = self.scanner.feed(register)
+        assert_equal(register.tokens, ['001'])
+        assert_equal([code for code, _ in errors], ['unknown', 'forbidden'])
+        self.scanner.feed(register)
+        assert_equal(register.tokens, ['001', '002'])
+
+    def test_feed_without_scans(self):
+        register = FakeRegister()
+        assert_equal(self.scanner.feed(register), [])
+        assert_equal(register.tokens, [])
+
+
+class TestMeasureThroughput(object):
+    def test_measure_throughput(self):
+        if pty is None:
+            raise SkipTest('pseudo-terminals are not available')
+        batches = []
+        assert measure_throughput(100, sink=batches.append) > 0
+        assert_equal(sum(len(batch) for batch in batches), 100)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tests for register count storage."""
+import io
+import os
+import struct
+import shutil
+import tempfile
+import multiprocessing
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.shared_count import Count, SharedCount
+
+
+def increment(file_path, times):
+    count = SharedCount(file_path)
+    for i in range(times):
+        count.add(1.0)
+    count.close()
+
+
+class TestCount(object):
+    def test_add(self):
+        count = Count(1.5)
+        assert_equal(count.add(2.0), 3.5)
+        assert_equal(count.value, 3.5)
+
+    @raises(ValueError)
+    def test_add_respects_minimum(self):
+        Count(1.0).add(-2.0, minimum=0.0)
+
+
+class TestSharedCount(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'register_count.bin')
+        with io.open(self.file_path, 'wb') as f:
+            f.write(struct.pack('d', 11.5))
+        self.count = SharedCount(self.file_path)
+
+    def tearDown(self):
+        self.count.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_reads_count_file(self):
+        assert_equal(self.count.value, 11.5)
+
+    def test_writes_count_file(self):
+        self.count.set(2.25)
+        with io.open(self.file_path, 'rb') as f:
+            (value, ) = struct.unpack('d', f.read(8))
+        assert_equal(value, 2.25)
+
+    def test_add_is_seen_by_other_instances(self):
+        other_count = SharedCount(self.file_path)
+        other_count.add(1.0)
+        other_count.close()
+        assert_equal(self.count.value, 12.5)
+
+    def test_failed_add_leaves_count_unchanged(self):
+        try:
+            self.count.add(-12.0, minimum=0.0)
+        except ValueError:
+            pass
+        assert_equal(self.count.value, 11.5)
+
+    def test_add_is_atomic_across_processes(self):
+        processes = [multiprocessing.Process(target=increment,
+                                             args=(self.file_path, 200))
+                     for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert_equal(self.count.value, 811.5)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Tests for employee shifts."""
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equal
+
+from pyplanck.shifts import ShiftLog, shifts_to_string
+
+
+def at(day, hour):
+    return time.mktime((2016, 1, day, hour, 0, 0, 0, 0, -1))
+
+
+class TestShiftLog(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'shifts.db')
+        self.shifts = ShiftLog(self.file_path)
+
+    def tearDown(self):
+        self.shifts.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_shift_totals(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        self.shifts.add_sale(2.5)
+        self.shifts.add_sale(1.0)
+        shift = self.shifts.end(13.5, at(1, 17))
+        assert_equal(shift.orders, 2)
+        assert_equal(shift.sales, 3.5)
+        assert_equal(shift.closing_count, 13.5)
+        assert_equal(self.shifts.shifts(), [shift])
+        assert_equal(self.shifts.current, None)
+
+    def test_sales_without_shift_are_ignored(self):
+        self.shifts.add_sale(2.5)
+        assert_equal(self.shifts.shifts(), [])
+
+    def test_starting_a_shift_ends_the_open_one(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        self.shifts.start('Employee', 12.0, at(1, 12))
+        first, second = self.shifts.shifts()
+        assert_equal((first.end, first.closing_count), (at(1, 12), 12.0))
+        assert_equal(second.end, None)
+
+    def test_open_shift_survives_restart(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        self.shifts.add_sale(2.5)
+        self.shifts.close()
+        self.shifts = ShiftLog(self.file_path)
+        assert_equal(self.shifts.current.employee, 'Admin')
+        assert_equal(self.shifts.current.sales, 2.5)
+
+    def test_shifts_by_employee_and_date(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        self.shifts.start('Employee', 10.0, at(1, 12))
+        self.shifts.start('Admin', 10.0, at(2, 9))
+        self.shifts.end(10.0, at(2, 17))
+        assert_equal([shift.start for shift in self.shifts.shifts('Admin')],
+                     [at(1, 9), at(2, 9)])
+        assert_equal([shift.employee for shift in
+                      self.shifts.shifts(date='2016-01-01')],
+                     ['Admin', 'Employee'])
+        assert_equal(len(self.shifts.shifts('Admin', '2016-01-02')), 1)
+
+    def test_on_shift(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        self.shifts.start('Employee', 10.0, at(1, 22))
+        self.shifts.end(10.0, at(2, 6))
+        assert_equal([shift.employee for shift in
+                      self.shifts.on_shift(at(1, 10))], ['Admin'])
+        assert_equal([shift.employee for shift in
+                      self.shifts.on_shift(at(2, 1))], ['Employee'])
+        assert_equal(self.shifts.on_shift(at(2, 7)), [])
+
+    def test_shifts_to_string(self):
+        self.shifts.start('Admin', 10.0, at(1, 9))
+        assert_equal(shifts_to_string(self.shifts.shifts()),
+                     'Admin 2016-01-01 09:00 - open: 0 orders, 0.00$, ' +
+                     'opening count 10.00$')
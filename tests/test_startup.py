@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Tests for startup time measurement."""
+import io
+import os
+import struct
+import logging
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from nose.tools import assert_equal
+
+from pyplanck.startup import measure_startup, startup_times_to_string
+
+# No logging for unit tests
+logging.disable(logging.CRITICAL)
+
+
+class TestMeasureStartup(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.kwargs = dict(
+            menu_file_path=os.path.join(self.tempdir, 'menu.txt'),
+            employees_file_path=os.path.join(self.tempdir, 'employees.txt'),
+            register_count_file_path=os.path.join(self.tempdir, 'count.bin'),
+            log_path=self.tempdir)
+        with io.open(self.kwargs['menu_file_path'], 'w') as f:
+            f.write(u'#Candy|1.00\n001|Chocolate bar\n002|Gum|0.75\n')
+        with io.open(self.kwargs['employees_file_path'], 'w') as f:
+            f.write(u'Admin|2222|admin|2\n')
+        with io.open(self.kwargs['register_count_file_path'], 'wb') as f:
+            f.write(struct.pack('d', 11.5))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_measures_every_phase(self):
+        times = measure_startup(**self.kwargs)
+        assert_equal(list(times),
+                     ['import', 'ready', 'loaded', 'loggers', 'policy',
+                      'register count', 'shifts', 'menu', 'employees'])
+
+    def test_lazy_startup_defers_loading(self):
+        times = measure_startup(lazy=True, **self.kwargs)
+        assert_equal(set(times),
+                     set(['import', 'ready', 'loaded', 'loggers', 'policy',
+                          'menu', 'employees']))
+        assert times['ready'] <= times['loaded']
+
+
+def test_startup_times_to_string():
+    times = OrderedDict([('loggers', 0.0012), ('menu', 0.25)])
+    assert_equal(startup_times_to_string(times),
+                 '         loggers:     1.20 ms\n'
+                 '            menu:   250.00 ms')
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Tests for the sales sync between tills and the aggregator."""
+import io
+import os
+import shutil
+import socket
+import tempfile
+
+from nose.tools import raises, assert_equal
+
+from pyplanck.sync import (Aggregator, SyncAgent, receive_message,
+                           send_message)
+
+
+def record(asctime, text):
+    return u'{}\nAdmin\n{}\n'.format(asctime, text)
+
+
+class TestSync(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log_paths = {}
+        for till in ('till1', 'till2'):
+            self.log_paths[till] = os.path.join(self.tempdir, till)
+            os.mkdir(self.log_paths[till])
+        self.aggregator = Aggregator(os.path.join(self.tempdir, 'sales.db'))
+        self.aggregator.start()
+
+    def tearDown(self):
+        self.aggregator.close()
+        shutil.rmtree(self.tempdir)
+
+    def append(self, till, text, log='transactions'):
+        file_path = os.path.join(self.log_paths[till], log + '.log')
+        with io.open(file_path, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def make_agent(self, till, **kwargs):
+        return SyncAgent(self.log_paths[till], till, self.aggregator.address,
+                         **kwargs)
+
+    def messages(self, log='transactions'):
+        return [(till, message) for _, till, message
+                in self.aggregator.records(log)]
+
+    def test_sync_sends_new_records(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent = self.make_agent('till1')
+        assert_equal(agent.sync(), 1)
+        self.append('till1', record('2016-01-01 10:05:00,000', 'Tea x 1'))
+        assert_equal(agent.sync(), 1)
+        assert_equal(agent.sync(), 0)
+        assert_equal(self.messages(), [('till1', u'Admin\nGum x 1'),
+                                       ('till1', u'Admin\nTea x 1')])
+
+    def test_records_of_all_tills_are_merged_in_time_order(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.append('till2', record('2016-01-01 09:00:00,000', 'Tea x 1'))
+        self.append('till2', record('2016-01-01 10:00:00,000', 'Tea x 2'),
+                    log='counts')
+        self.make_agent('till1').sync()
+        self.make_agent('till2').sync()
+        assert_equal(self.messages(), [('till2', u'Admin\nTea x 1'),
+                                       ('till1', u'Admin\nGum x 1')])
+        assert_equal(self.messages('counts'), [('till2', u'Admin\nTea x 2')])
+
+    def test_cursor_is_persisted(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.make_agent('till1').sync()
+        self.append('till1', record('2016-01-01 10:05:00,000', 'Tea x 1'))
+        assert_equal(self.make_agent('till1').sync(), 1)
+
+    def test_records_sent_twice_are_stored_once(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.make_agent('till1').sync()
+        # The acknowledgement was lost, so the cursor was not saved
+        os.remove(os.path.join(self.log_paths['till1'], 'sync_cursor.json'))
+        self.append('till1', record('2016-01-01 10:05:00,000', 'Tea x 1'))
+        assert_equal(self.make_agent('till1').sync(), 2)
+        assert_equal(len(self.messages()), 2)
+
+    def test_records_with_the_same_time_are_distinct(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent = self.make_agent('till1')
+        agent.sync()
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent.sync()
+        assert_equal(len(self.messages()), 3)
+
+    def test_records_after_clock_step_back_are_sent(self):
+        self.append('till1', record('2016-01-01 10:05:00,000', 'Gum x 1'))
+        agent = self.make_agent('till1')
+        agent.sync()
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Tea x 1'))
+        assert_equal(agent.sync(), 1)
+        assert_equal(len(self.messages()), 2)
+
+    def test_batches(self):
+        for second in range(5):
+            self.append('till1', record(
+                '2016-01-01 10:00:0{},000'.format(second), 'Gum x 1'))
+        assert_equal(self.make_agent('till1', batch_size=2).sync(), 5)
+        assert_equal(len(self.messages()), 5)
+
+    def test_partially_written_record_is_left_for_next_sync(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.append('till1', u'2016-01-01 10:05:00,000\nAdmin')
+        agent = self.make_agent('till1')
+        assert_equal(agent.sync(), 1)
+        self.append('till1', u'\nTea x 1\n')
+        assert_equal(agent.sync(), 1)
+        assert_equal(self.messages()[-1], ('till1', u'Admin\nTea x 1'))
+
+    def test_rotated_records_are_sent(self):
+        agent = self.make_agent('till1')
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent.sync()
+        self.append('till1', record('2016-01-01 23:00:00,000', 'Tea x 1'))
+        # The log rotates before the next sync
+        file_path = os.path.join(self.log_paths['till1'], 'transactions.log')
+        os.rename(file_path, file_path + '.2016-01-01')
+        self.append('till1', record('2016-01-02 08:00:00,000', 'Gum x 2'))
+        assert_equal(agent.sync(), 2)
+        assert_equal([message for _, message in self.messages()],
+                     [u'Admin\nGum x 1', u'Admin\nTea x 1',
+                      u'Admin\nGum x 2'])
+
+    def test_new_file_reusing_inode_is_read_from_start(self):
+        agent = self.make_agent('till1')
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent.sync()
+        # The log rotated twice and the rotated files were deleted
+        file_path = os.path.join(self.log_paths['till1'], 'transactions.log')
+        os.remove(file_path)
+        self.append('till1', record('2016-01-03 08:00:00,000', 'Gum x 2'))
+        self.append('till1', record('2016-01-03 09:00:00,000', 'Tea x 3'))
+        # The new file got the inode of the old one
+        agent.cursors['transactions']['inode'] = os.stat(file_path).st_ino
+        assert_equal(agent.sync(), 2)
+        assert_equal([message for _, message in self.messages()],
+                     [u'Admin\nGum x 1', u'Admin\nGum x 2',
+                      u'Admin\nTea x 3'])
+
+    @raises(IOError)
+    def test_sync_fails_when_offline(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        agent = self.make_agent('till1')
+        self.aggregator.close()
+        agent.sync()
+
+    def test_offline_till_catches_up(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        address = self.aggregator.address
+        self.aggregator.close()
+        agent = SyncAgent(self.log_paths['till1'], 'till1', address)
+        try:
+            agent.sync()
+        except IOError:
+            pass
+        self.aggregator = Aggregator(os.path.join(self.tempdir, 'sales.db'),
+                                     address)
+        self.aggregator.start()
+        assert_equal(agent.sync(), 1)
+
+    def test_records_time_range(self):
+        self.append('till1', record('2016-01-01 10:00:00,000', 'Gum x 1'))
+        self.append('till1', record('2016-01-02 10:00:00,000', 'Tea x 1'))
+        self.make_agent('till1').sync()
+        assert_equal(len(self.aggregator.records(
+            'transactions', start='2016-01-02', end='2016-01-03')), 1)
+
+
+def test_messages_round_trip():
+    left, right = socket.socketpair()
+    try:
+        send_message(left, {'till': 'till1', 'records': [[u'é', 1]]})
+        assert_equal(receive_message(right),
+                     {'till': 'till1', 'records': [[u'é', 1]]})
+        left.close()
+        assert_equal(receive_message(right), None)
+    finally:
+        right.close()
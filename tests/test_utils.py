@@ -52,10 +52,13 @@ class TestValidateEmployeeLevel(object):
         validate_employee_level(1)
         validate_employee_level(2)
 
+    def test_accepts_levels_above_2(self):
+        validate_employee_level(3)
+
     @raises(ValueError)
     def test_rejects_non_integers(self):
         validate_employee_level('gum')
 
     @raises(ValueError)
     def test_rejects_invalid_integers(self):
-        validate_employee_level(3)
+        validate_employee_level(-1)
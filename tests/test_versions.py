@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Tests for versioned catalogs."""
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal, raises
+
+from pyplanck.catalog import Catalog
+from pyplanck.immutables import Item
+from pyplanck.versions import CatalogVersions
+
+
+def make_catalog(*rows):
+    catalog = Catalog()
+    for name, price, barcode in rows:
+        catalog.add(name, price, barcode, 'Candy')
+    return catalog
+
+
+class TestCatalogVersions(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tempdir, 'catalog_versions.db')
+        self.versions = CatalogVersions(self.file_path)
+
+    def tearDown(self):
+        self.versions.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_unchanged_menu_keeps_version(self):
+        first = self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 100.0)
+        second = self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 200.0)
+        assert_equal(first, second)
+        assert_equal(len(self.versions.versions()), 1)
+
+    def test_changed_menu_is_new_version(self):
+        first = self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 100.0)
+        second = self.versions.record(
+            'default', make_catalog(('Gum', 0.80, '002')), 200.0)
+        assert_equal(second, first + 1)
+        assert_equal(self.versions.item(first, 0),
+                     Item('Gum', 0.75, '002', 'Candy', None))
+        assert_equal(self.versions.item(second, 0).price, 0.80)
+        assert_equal(self.versions.version_at(150.0, 'default').id, first)
+        assert_equal(self.versions.version_at(50.0, 'default'), None)
+
+    def test_price_at(self):
+        self.versions.record('default', make_catalog(
+            ('Gum', 0.75, '002'), ('Tea', 1.5, '004')), 100.0)
+        self.versions.record('default', make_catalog(
+            ('Gum', 0.80, '002'), ('Tea', 1.5, '004')), 200.0)
+        self.versions.record('default', make_catalog(
+            ('Tea', 1.5, '004')), 300.0)
+        assert_equal(self.versions.price_at('002', 50.0, 'default'), None)
+        assert_equal(self.versions.price_at('002', 100.0, 'default'), 0.75)
+        assert_equal(self.versions.price_at('002', 250.0, 'default'), 0.80)
+        assert_equal(self.versions.price_at('002', 350.0, 'default'), None)
+        assert_equal(self.versions.price_at('004', 350.0, 'default'), 1.5)
+
+    def test_menus_are_separate(self):
+        self.versions.record('default', make_catalog(('Gum', 0.75, '002')),
+                             100.0)
+        self.versions.record('breakfast', make_catalog(('Gum', 0.5, '002')),
+                             100.0)
+        assert_equal(self.versions.price_at('002', 150.0, 'breakfast'), 0.5)
+        assert_equal(len(self.versions.versions('default')), 1)
+
+    def test_persists(self):
+        version = self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 100.0)
+        self.versions.close()
+        self.versions = CatalogVersions(self.file_path)
+        assert_equal(self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 200.0), version)
+
+    @raises(ValueError)
+    def test_unknown_item(self):
+        version = self.versions.record(
+            'default', make_catalog(('Gum', 0.75, '002')), 100.0)
+        self.versions.item(version, 1)
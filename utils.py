@@ -77,13 +77,13 @@ def validate_employee_level(employee_level):
     Raises
     ------
     ValueError
-        If ``employee_level`` is not an integer in {0, 1, 2}.
+        If ``employee_level`` is not a positive integer.
 
     """
     if not isinstance(employee_level, six.integer_types):
         raise ValueError('employee level must be an integer')
-    if employee_level not in (0, 1, 2):
-        raise ValueError('employee level must be in {0, 1, 2}')
+    if employee_level < 0:
+        raise ValueError('employee level must be positive')
 
 
 def validate_file_path(file_path, type_='file'):
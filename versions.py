@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Versioned catalogs and point-in-time prices."""
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from .immutables import Item
+
+CatalogVersion = namedtuple('CatalogVersion', 'id menu digest loaded size')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    menu TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    loaded REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_menu ON versions (menu, loaded);
+CREATE TABLE IF NOT EXISTS items (
+    version INTEGER NOT NULL REFERENCES versions (id),
+    item_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    barcode TEXT NOT NULL,
+    category TEXT NOT NULL,
+    shortcut TEXT,
+    PRIMARY KEY (version, item_id)
+);
+CREATE TABLE IF NOT EXISTS prices (
+    menu TEXT NOT NULL,
+    barcode TEXT NOT NULL,
+    start REAL NOT NULL,
+    version INTEGER NOT NULL REFERENCES versions (id),
+    name TEXT,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS prices_barcode ON prices (menu, barcode, start);
+"""
+
+_VERSION_COLUMNS = 'id, menu, digest, loaded, size'
+
+
+class CatalogVersions(object):
+    """History of the catalogs loaded by a register, stored in SQLite.
+
+    Each load of a menu whose items differ from the menu's latest version,
+    as told by :meth:`Catalog.digest`, is recorded as a new version holding
+    all its items, so that an item id and a version number identify an item
+    as it was sold.
+
+    Prices are also indexed by barcode as intervals: a row is only written
+    when an item's name or price changes, or when it leaves the menu, and
+    starts when the version is loaded. The price of a barcode at a given
+    time is then the latest row starting before it, which the index finds
+    in logarithmic time.
+
+    Parameters
+    ----------
+    file_path : :class:`str`
+        Path to the database. It is created if it does not exist.
+
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        # Menus are loaded on the catalog loader's thread in lazy mode
+        self.connection = sqlite3.connect(file_path, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def record(self, menu, catalog, timestamp=None):
+        """Records a loaded catalog and returns its version number.
+
+        Parameters
+        ----------
+        menu : :class:`str`
+            Name of the menu, e.g. its menu profile.
+        catalog : :class:`Catalog`
+            Loaded catalog.
+        timestamp : :class:`float`, optional
+            Load time. Defaults to ``None``, meaning the current time.
+
+        Returns
+        -------
+        version : :class:`int`
+            Number of the new version, or of the menu's latest version if
+            the catalog has not changed since.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        digest = catalog.digest()
+        item_ids = catalog.indexed_ids()
+        with self._lock:
+            latest = self._latest(menu)
+            if latest is not None and latest.digest == digest:
+                return latest.id
+            previous = {}
+            if latest is not None:
+                for barcode, name, price in self.connection.execute(
+                        'SELECT barcode, name, price FROM items '
+                        'WHERE version = ? ORDER BY item_id', (latest.id,)):
+                    previous.setdefault(barcode, (name, price))
+            # Items sold by barcode are the first ones using it
+            current = {}
+            for item_id in item_ids:
+                current.setdefault(catalog.barcodes[item_id],
+                                   (catalog.names[item_id],
+                                    catalog.prices[item_id]))
+            self.connection.execute('BEGIN')
+            try:
+                version = self.connection.execute(
+                    'INSERT INTO versions (menu, digest, loaded, size) '
+                    'VALUES (?, ?, ?, ?)',
+                    (menu, digest, timestamp, len(item_ids))).lastrowid
+                self.connection.executemany(
+                    'INSERT INTO items (version, item_id, name, price, '
+                    'barcode, category, shortcut) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((version, item_id) + catalog.row(item_id)
+                     for item_id in item_ids))
+                changes = [(barcode, fields)
+                           for barcode, fields in current.items()
+                           if previous.get(barcode) != fields]
+                changes.extend((barcode, (None, None))
+                               for barcode in previous
+                               if barcode not in current)
+                self.connection.executemany(
+                    'INSERT INTO prices (menu, barcode, start, version, '
+                    'name, price) VALUES (?, ?, ?, ?, ?, ?)',
+                    ((menu, barcode, timestamp, version) + fields
+                     for barcode, fields in changes))
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+            return version
+
+    def versions(self, menu=None):
+        """Returns the recorded versions, from oldest to newest.
+
+        Parameters
+        ----------
+        menu : :class:`str`, optional
+            Only return this menu's versions. Defaults to ``None``.
+
+        """
+        if menu is None:
+            rows = self.connection.execute(
+                'SELECT {} FROM versions ORDER BY id'.format(
+                    _VERSION_COLUMNS))
+        else:
+            rows = self.connection.execute(
+                'SELECT {} FROM versions WHERE menu = ? ORDER BY id'.format(
+                    _VERSION_COLUMNS), (menu,))
+        return [CatalogVersion(*row) for row in rows]
+
+    def version_at(self, timestamp, menu):
+        """Returns the version of a menu in use at a time, ``None`` if none.
+
+        Parameters
+        ----------
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+        menu : :class:`str`
+            Name of the menu.
+
+        """
+        rows = self.connection.execute(
+            'SELECT {} FROM versions WHERE menu = ? AND loaded <= ? '
+            'ORDER BY loaded DESC, id DESC LIMIT 1'.format(_VERSION_COLUMNS),
+            (menu, timestamp)).fetchall()
+        return CatalogVersion(*rows[0]) if rows else None
+
+    def item(self, version, item_id):
+        """Returns an item of a version.
+
+        Parameters
+        ----------
+        version : :class:`int`
+            Version number.
+        item_id : :class:`int`
+            Item id within that version.
+
+        Raises
+        ------
+        ValueError
+            If the version has no such item.
+
+        """
+        rows = self.connection.execute(
+            'SELECT name, price, barcode, category, shortcut FROM items '
+            'WHERE version = ? AND item_id = ?',
+            (version, item_id)).fetchall()
+        if not rows:
+            raise ValueError('catalog version {} has no item {}'.format(
+                version, item_id))
+        return Item(*rows[0])
+
+    def price_at(self, barcode, timestamp, menu):
+        """Returns the price of a barcode at a time.
+
+        Parameters
+        ----------
+        barcode : :class:`str`
+            Item barcode.
+        timestamp : :class:`float`
+            Time in seconds since the epoch.
+        menu : :class:`str`
+            Name of the menu.
+
+        Returns
+        -------
+        price : :class:`float`
+            Price of the item, ``None`` if it was not on the menu then.
+
+        """
+        rows = self.connection.execute(
+            'SELECT price FROM prices WHERE menu = ? AND barcode = ? '
+            'AND start <= ? ORDER BY start DESC, version DESC LIMIT 1',
+            (menu, barcode, timestamp)).fetchall()
+        return rows[0][0] if rows else None
+
+    def close(self):
+        """Closes the database."""
+        self.connection.close()
+
+    def _latest(self, menu):
+        """Returns the latest version of a menu, ``None`` if none."""
+        rows = self.connection.execute(
+            'SELECT {} FROM versions WHERE menu = ? '
+            'ORDER BY id DESC LIMIT 1'.format(_VERSION_COLUMNS),
+            (menu,)).fetchall()
+        return CatalogVersion(*rows[0]) if rows else None